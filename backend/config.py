@@ -18,18 +18,61 @@ class Settings(BaseSettings):
     dashscope_model: str = "qwen3-max"
     dashscope_base_url: str = "https://dashscope.aliyuncs.com/compatible-mode/v1"
 
+    # 大模型 HTTP 连接池配置
+    llm_max_connections: int = 20  # 连接池最大连接数
+    llm_max_keepalive_connections: int = 10  # 保持的空闲长连接数
+    llm_keepalive_expiry: float = 60.0  # 空闲连接保持时间（秒）
+    llm_timeout: float = 120.0  # 单次请求超时（秒）
+    llm_connect_timeout: float = 10.0  # 建立连接超时（秒）
+    llm_http_retries: int = 2  # 网络错误时 SDK 自动重试次数
+
     # 文件配置
     max_file_size: int = 10 * 1024 * 1024  # 10MB
     allowed_extensions: list = [".docx"]
+    docx_stream_parse_threshold: int = 5 * 1024 * 1024  # 不小于该大小（字节）的文档流式解析，0 表示总是流式解析，-1 表示不使用
+    max_batch_files: int = 500  # 批量上传的合同数上限（zip 按其中的文件计）
+    max_batch_upload_size: int = 500 * 1024 * 1024  # 批量上传请求（含 zip）的大小上限（500MB）
     upload_dir: str = "uploads"
     storage_dir: str = "storage"
 
     # 审核配置
     max_retries: int = 3
-    max_tokens_per_section: int = 4000
+    max_tokens_per_section: int = 4000  # 每个分段的 Token 预算，相邻的小章节合并到同一分段
+    section_overlap_tokens: int = 0  # 分段间重叠的前文上下文 Token 数（0 表示不重叠）
+    review_prompt_style: str = "full"  # 审核说明样式：full（含完整输出示例）、compact（精简说明，输入 Token 更少）
+
+    # Token 计数配置
+    tokenizer_path: str = ""  # 本地 tokenizer.json 路径（需安装 tokenizers），为空时在 tokenizer_dir 中按模型名查找
+    tokenizer_dir: str = "tokenizers"  # 查找 {模型名}/tokenizer.json 或 {模型名}.json 的目录
+    token_calibration_enabled: bool = True  # 没有 tokenizer 文件时，是否根据接口返回的用量校准估算权重
+    max_concurrent_sections: int = 4  # 分段审核时同时进行的 AI 请求数上限
+
+    # 文档处理进程池配置（解析、定位、写批注、生成 Word 文档）
+    cpu_workers: int = 0  # 进程数，0 表示按 CPU 核数，-1 表示不使用进程池（在线程池中执行）
+
+    # 审查结果文件配置
+    eager_artifacts: bool = False  # 审查完成前即生成带批注文档和审查报告（默认在首次下载时生成）
+
+    # 审核缓存配置
+    review_cache_enabled: bool = True
+    review_cache_ttl_hours: int = 24 * 7  # 缓存有效期（小时）
+    review_cache_max_entries: int = 10000  # 缓存条目上限，超出时淘汰最久未访问的条目
+
+    # 审查任务队列配置
+    review_worker_embedded: bool = True  # 是否在 API 进程内启动 Worker（独立部署 Worker 时设为 False）
+    review_worker_concurrency: int = 2  # 每个 Worker 进程同时处理的任务数
+    review_job_lease_seconds: int = 300  # 任务租约时长（秒）
+    review_job_heartbeat_seconds: int = 30  # 续约间隔（秒）
+    review_job_max_attempts: int = 3  # 最大执行次数
+    review_job_retry_base_seconds: float = 10.0  # 重试退避基数（秒），按 2 的幂次增长
+    review_job_retry_max_seconds: float = 600.0  # 重试退避上限（秒）
+    review_job_poll_interval: float = 1.0  # 队列为空时的轮询间隔（秒）
+    review_job_sweep_interval: float = 30.0  # 每个 Worker 检查租约过期且重试次数用尽的任务的间隔（秒）
+    review_progress_poll_seconds: float = 5.0  # 独立部署 Worker 时，进度推送接口查询审查状态的间隔（秒）
 
     # 数据库配置
     database_url: str = "sqlite+aiosqlite:///./contract_review.db"
+    sqlite_busy_timeout_ms: int = 5000  # SQLite 写锁等待时间（毫秒）
 
     class Config:
         env_file = ".env"
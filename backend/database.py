@@ -1,12 +1,31 @@
 """
 数据库连接配置
 """
+import logging
+from sqlalchemy import event, inspect, text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.asyncio import async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 from backend.config import get_settings
 
 settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# 已有表上新增的列 (表名, 列名)：create_all 只创建不存在的表，不会给已有的表加列，
+# 启动时检查已有数据库，缺少的列用 ALTER TABLE 补上（列定义取自模型）
+ADDED_COLUMNS = [
+    ("contracts", "file_hash"),
+    ("contracts", "parsed_document"),
+    ("review_records", "issue_locations"),
+    ("review_records", "sections"),
+    ("review_records", "batch_id"),
+]
+
+# 已有表上新增的索引名（随新增的列一起补建）
+ADDED_INDEXES = [
+    "ix_contracts_file_hash",
+    "ix_review_records_batch_id",
+]
 
 # 创建异步引擎
 engine = create_async_engine(
@@ -14,6 +33,19 @@ engine = create_async_engine(
     echo=False,
 )
 
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragma(dbapi_connection, connection_record):
+        """
+        SQLite 连接参数：WAL 模式下读写互不阻塞，写锁冲突时等待而不是立即报错
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
+
 # 创建会话工厂
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -37,6 +69,37 @@ async def get_db():
 
 
 async def init_db():
-    """初始化数据库表"""
+    """初始化数据库表，并为旧版本创建的数据库补齐新增的列"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+
+
+def upgrade_schema(conn):
+    """
+    为已有的表补齐新增的列和索引（可重复执行，已存在的跳过）
+
+    Args:
+        conn: 同步数据库连接（通过 run_sync 调用）
+    """
+    inspector = inspect(conn)
+    for table_name, column_name in ADDED_COLUMNS:
+        table = Base.metadata.tables.get(table_name)
+        if table is None or not inspector.has_table(table_name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table_name)}
+        if column_name in existing:
+            continue
+
+        # 只加列定义和外键引用（可为空、无默认值），旧记录的该列为 NULL
+        column = table.c[column_name]
+        definition = f"{column_name} {column.type.compile(dialect=conn.dialect)}"
+        for foreign_key in column.foreign_keys:
+            definition += f" REFERENCES {foreign_key.column.table.name} ({foreign_key.column.name})"
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {definition}"))
+        logger.info(f"数据库升级: {table_name} 新增列 {column_name}")
+
+    for table in Base.metadata.tables.values():
+        for index in table.indexes:
+            if index.name in ADDED_INDEXES:
+                index.create(conn, checkfirst=True)
@@ -14,9 +14,14 @@ from contextlib import asynccontextmanager
 
 from backend.config import get_settings
 from backend.database import init_db
-from backend.routers import reviews, contract_writing
+from backend.services.llm_client import close_llm_client
+from backend.worker import ReviewWorker
+from backend.routers import reviews, contract_writing, search
+from backend.services.search_service import ensure_search_index
+from backend.utils.executor import init_executor, shutdown_executor
+from backend.utils.upload_limit import UploadSizeLimitMiddleware
 # 导入模型以确保表创建
-from backend.models import review, contract_writing as contract_writing_models
+from backend.models import review, contract_writing as contract_writing_models, search as search_models
 
 
 settings = get_settings()
@@ -27,8 +32,21 @@ async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     # 启动时初始化数据库
     await init_db()
+    await ensure_search_index()
+    init_executor()
+
+    # 内置审查 Worker（独立部署 Worker 时关闭）
+    worker = None
+    if settings.review_worker_embedded:
+        worker = ReviewWorker()
+        worker.start()
+
     yield
     # 关闭时的清理工作
+    if worker:
+        await worker.stop()
+    await close_llm_client()
+    shutdown_executor()
 
 
 # 创建应用
@@ -39,6 +57,16 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# 上传请求体大小限制（在读取请求体之前检查，超限时直接返回 413）
+# 后添加的中间件在外层，这里先于 CORS 添加，413 响应才会带上 CORS 头
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    limits={
+        "/api/reviews/upload": settings.max_file_size,
+        "/api/reviews/batch": settings.max_batch_upload_size,
+    }
+)
+
 # 配置 CORS - 允许所有源以支持本地文件访问
 app.add_middleware(
     CORSMiddleware,
@@ -59,6 +87,7 @@ app.add_middleware(
 # 注册路由
 app.include_router(reviews.router)
 app.include_router(contract_writing.router)
+app.include_router(search.router)
 
 
 @app.get("/")
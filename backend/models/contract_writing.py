@@ -1,7 +1,7 @@
 """
 合同撰写相关的数据模型
 """
-from sqlalchemy import Column, String, Integer, Boolean, Text, DateTime, JSON
+from sqlalchemy import Column, String, Integer, Boolean, Text, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.database import Base
@@ -11,6 +11,10 @@ from backend.models.review import generate_id
 class ContractTemplate(Base):
     """合同模板表"""
     __tablename__ = "contract_templates"
+    __table_args__ = (
+        # 列表按使用次数和创建时间游标分页
+        Index("ix_contract_templates_usage_created", "usage_count", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_id)
     name = Column(String(255), nullable=False)
@@ -31,6 +35,10 @@ class ContractTemplate(Base):
 class ContractDraft(Base):
     """合同草稿表"""
     __tablename__ = "contract_drafts"
+    __table_args__ = (
+        # 列表按用户和创建时间游标分页
+        Index("ix_contract_drafts_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_id)
     user_id = Column(String(36), nullable=False, default="default_user")
@@ -54,6 +62,10 @@ class ContractDraft(Base):
 class ContractClause(Base):
     """合同条款库"""
     __tablename__ = "contract_clauses"
+    __table_args__ = (
+        # 列表按使用次数和创建时间游标分页
+        Index("ix_contract_clauses_usage_created", "usage_count", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_id)
     title = Column(String(255), nullable=False)
@@ -1,7 +1,7 @@
 """
 审查相关的数据模型
 """
-from sqlalchemy import Column, String, Integer, ForeignKey, Text, DateTime, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Text, DateTime, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -16,13 +16,19 @@ def generate_id():
 class Contract(Base):
     """合同表"""
     __tablename__ = "contracts"
+    __table_args__ = (
+        # 列表按用户和创建时间游标分页
+        Index("ix_contracts_user_created", "user_id", "created_at", "id"),
+    )
 
     id = Column(String(36), primary_key=True, default=generate_id)
     user_id = Column(String(36), nullable=False, default="default_user")
     title = Column(String(255), nullable=False)
     original_filename = Column(String(255))
     file_path = Column(String(500))
+    file_hash = Column(String(64), index=True)  # 文件内容的 SHA-256（上传时边写入边计算）
     content_text = Column(Text)  # 提取的文本内容
+    parsed_document = Column(JSON)  # 上传时生成的解析结果（段落、表格、结构、Token 估算）
     status = Column(String(20), default="pending")  # pending, reviewing, completed
     source = Column(String(20))  # upload, from_contract
 
@@ -40,6 +46,7 @@ class ReviewRecord(Base):
     id = Column(String(36), primary_key=True, default=generate_id)
     contract_id = Column(String(36), ForeignKey("contracts.id"), nullable=False)
     user_id = Column(String(36), nullable=False, default="default_user")
+    batch_id = Column(String(36), ForeignKey("review_batches.id"), index=True)  # 所属批量审查（单个审查为空）
 
     # 审查结果
     issues = Column(JSON, nullable=False, default=list)
@@ -47,6 +54,8 @@ class ReviewRecord(Base):
     high_risk_count = Column(Integer, default=0)
     medium_risk_count = Column(Integer, default=0)
     low_risk_count = Column(Integer, default=0)
+    issue_locations = Column(JSON, default=list)  # 与 issues 一一对应的定位结果
+    sections = Column(JSON, default=list)  # 分段记录（摘要、段落范围、问题及段落偏移），用于增量审核
 
     # 文件路径
     reviewed_file_path = Column(String(500))  # 带批注的文件
@@ -60,3 +69,60 @@ class ReviewRecord(Base):
 
     # 关联合同
     contract = relationship("Contract", back_populates="review_records")
+
+
+class ReviewBatch(Base):
+    """批量审查表"""
+    __tablename__ = "review_batches"
+
+    id = Column(String(36), primary_key=True, default=generate_id)
+    user_id = Column(String(36), nullable=False, default="default_user")
+    title = Column(String(255))
+    total_files = Column(Integer, default=0)  # 收到的文件数（zip 按其中的文件计）
+    rejected_files = Column(JSON, default=list)  # 未能导入的文件 [{filename, error}]
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ReviewCacheEntry(Base):
+    """审核结果缓存表（按文本内容寻址）"""
+    __tablename__ = "review_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256(模型 + Prompt 版本 + 规范化文本)
+    kind = Column(String(20), nullable=False)  # contract, section
+    model = Column(String(100))
+    prompt_version = Column(String(50))
+    result = Column(JSON, nullable=False)  # AI 原始审核结果 {issues, summary}
+    hit_count = Column(Integer, default=0)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class ReviewJob(Base):
+    """审查任务队列表"""
+    __tablename__ = "review_jobs"
+    __table_args__ = (
+        Index("ix_review_jobs_dispatch", "status", "priority", "available_at"),
+    )
+
+    id = Column(String(36), primary_key=True, default=generate_id)
+    review_id = Column(String(36), ForeignKey("review_records.id"), nullable=False, index=True)
+    contract_id = Column(String(36), nullable=False)
+    payload = Column(JSON, default=dict)  # 任务参数（如 incremental）
+
+    status = Column(String(20), default="queued")  # queued, running, completed, failed
+    priority = Column(Integer, default=0)  # 数值越大越优先
+    attempts = Column(Integer, default=0)  # 已执行次数
+    max_attempts = Column(Integer, default=3)
+    last_error = Column(Text)
+
+    # 租约：Worker 领取任务后需定期续约，租约过期的任务会被其他 Worker 重新领取
+    lease_owner = Column(String(100))
+    lease_expires_at = Column(DateTime)
+    heartbeat_at = Column(DateTime)
+    available_at = Column(DateTime, default=datetime.utcnow)  # 重试退避：此时间之后才可被领取
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime)
@@ -0,0 +1,39 @@
+"""
+全文检索相关的数据模型
+"""
+from sqlalchemy import Column, String, Integer, DateTime, UniqueConstraint, DDL, event
+from datetime import datetime
+from backend.database import Base
+
+
+class SearchDocument(Base):
+    """检索文档表（每个被索引的合同、草稿、条款一行，行ID即 FTS 索引的 rowid）"""
+    __tablename__ = "search_documents"
+    __table_args__ = (
+        UniqueConstraint("doc_type", "doc_id", name="uq_search_documents_doc"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    doc_type = Column(String(20), nullable=False)  # contract, draft, clause
+    doc_id = Column(String(36), nullable=False)
+    user_id = Column(String(36))  # 所属用户（条款库为空，所有用户可见）
+    title = Column(String(255))
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# FTS5 倒排索引（仅 SQLite）：正文预先切分为二元组（bigram），由 unicode61 分词器按空格索引。
+# 切分方式变化时更换表名中的版本，启动时删除旧表并按新的切分方式回填
+SEARCH_FTS_VERSION = 2
+SEARCH_FTS_TABLE = f"search_fts_v{SEARCH_FTS_VERSION}"
+# 之前版本使用过的表名
+SEARCH_FTS_LEGACY_TABLES = ("search_fts",)
+
+event.listen(
+    SearchDocument.__table__,
+    "after_create",
+    DDL(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} "
+        "USING fts5(title, body, tokenize='unicode61')"
+    ).execute_if(dialect="sqlite")
+)
@@ -1,25 +1,28 @@
 """
 合同撰写相关路由
 """
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Response
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
-from typing import List, Optional
+from typing import Callable, List, Optional, Set
 from datetime import datetime
 import os
 
 logger = logging.getLogger(__name__)
 
-from backend.database import get_db
+from backend.database import get_db, AsyncSessionLocal
 from backend.models.contract_writing import ContractDraft, ContractTemplate, ContractClause
 from backend.models.review import Contract, generate_id
 from backend.schemas.contract_writing import (
     ContractDraftCreate,
     ContractDraftUpdate,
     ContractDraftResponse,
+    ContractDraftSummary,
     ContractTemplateResponse,
+    ContractTemplateSummary,
     ContractClauseResponse,
     GenerateRequest,
     GenerateResponse,
@@ -28,39 +31,54 @@ from backend.schemas.contract_writing import (
     SuggestClausesResponse
 )
 from backend.services.contract_writing_service import ContractGenerator
+from backend.services.search_service import index_document, index_draft, remove_document
 from backend.utils.document_builder import create_contract_document
+from backend.utils import document_tasks
+from backend.utils.executor import run_cpu
+from backend.utils.pagination import paginate, split_page, InvalidCursorError, NEXT_CURSOR_HEADER
+from backend.utils.sse import stream_queue, SSE_HEADERS
 from backend.config import get_settings
 import shutil
 
 router = APIRouter(prefix="/api/writing", tags=["合同撰写"])
 settings = get_settings()
 
+# 流式生成任务（客户端断开后任务继续执行并保存结果，这里持有引用防止被回收）
+_streaming_tasks: Set[asyncio.Task] = set()
+
+# 流式生成的结束事件
+STREAM_TERMINAL_EVENTS = ("done", "error")
+
 
 # ============ 模板管理 API ============
 
-@router.get("/templates", response_model=List[ContractTemplateResponse])
+@router.get("/templates", response_model=List[ContractTemplateSummary])
 async def list_templates(
+    response: Response,
     category: Optional[str] = None,
     is_active: bool = True,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    获取模板列表
+    获取模板列表（按使用次数、创建时间倒序，游标分页）
 
     Args:
+        response: 响应对象（下一页游标通过 X-Next-Cursor 响应头返回）
         category: 模板类别筛选
         is_active: 是否只显示启用的模板
-        skip: 跳过数量
+        cursor: 上一页返回的游标
+        skip: 跳过数量（兼容旧客户端，建议使用 cursor）
         limit: 限制数量
         db: 数据库会话
 
     Returns:
-        模板列表
+        模板列表（不含模板内容）
     """
-    # 构建查询
-    query = select(ContractTemplate)
+    # 只查询列表需要的列
+    query = select(*[getattr(ContractTemplate, name) for name in ContractTemplateSummary.model_fields])
 
     if is_active:
         query = query.where(ContractTemplate.is_active == True)
@@ -68,13 +86,50 @@ async def list_templates(
     if category:
         query = query.where(ContractTemplate.category == category)
 
-    query = query.order_by(ContractTemplate.usage_count.desc(), ContractTemplate.created_at.desc())
-    query = query.offset(skip).limit(limit)
+    rows = await _fetch_page(
+        db,
+        query,
+        [ContractTemplate.usage_count, ContractTemplate.created_at, ContractTemplate.id],
+        cursor,
+        skip,
+        limit,
+        response
+    )
+
+    return rows
+
+
+async def _fetch_page(db: AsyncSession, query, columns, cursor, skip, limit, response: Response):
+    """
+    执行游标分页查询，并通过响应头返回下一页游标
+
+    Args:
+        db: 数据库会话
+        query: 列表查询
+        columns: 排序列（降序，最后一列为 id）
+        cursor: 上一页返回的游标
+        skip: 跳过数量（仅在未提供游标时生效）
+        limit: 每页数量
+        response: 响应对象
+
+    Returns:
+        本页数据
+    """
+    try:
+        query = paginate(query, columns, cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if skip and not cursor:
+        query = query.offset(skip)
 
     result = await db.execute(query)
-    templates = result.scalars().all()
+    rows, next_cursor = split_page(result.all(), [column.key for column in columns], limit)
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-    return templates
+    return rows
 
 
 @router.get("/templates/{template_id}", response_model=ContractTemplateResponse)
@@ -171,34 +226,44 @@ async def create_draft(
     return draft
 
 
-@router.get("/drafts", response_model=List[ContractDraftResponse])
+@router.get("/drafts", response_model=List[ContractDraftSummary])
 async def list_drafts(
+    response: Response,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 20,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    获取草稿列表
+    获取草稿列表（按创建时间倒序，游标分页）
 
     Args:
-        skip: 跳过数量
+        response: 响应对象（下一页游标通过 X-Next-Cursor 响应头返回）
+        cursor: 上一页返回的游标
+        skip: 跳过数量（兼容旧客户端，建议使用 cursor）
         limit: 限制数量
         db: 数据库会话
 
     Returns:
-        草稿列表
+        草稿列表（不含合同正文）
     """
-    # 查询草稿列表（按创建时间倒序）
-    result = await db.execute(
-        select(ContractDraft)
+    # 只查询列表需要的列，不加载生成内容等大字段
+    query = (
+        select(*[getattr(ContractDraft, name) for name in ContractDraftSummary.model_fields])
         .where(ContractDraft.user_id == "default_user")  # TODO: 从认证系统获取
-        .order_by(ContractDraft.created_at.desc())
-        .offset(skip)
-        .limit(limit)
     )
-    drafts = result.scalars().all()
 
-    return drafts
+    rows = await _fetch_page(
+        db,
+        query,
+        [ContractDraft.created_at, ContractDraft.id],
+        cursor,
+        skip,
+        limit,
+        response
+    )
+
+    return rows
 
 
 @router.get("/drafts/{draft_id}", response_model=ContractDraftResponse)
@@ -270,6 +335,9 @@ async def update_draft_content(
 
     draft.updated_at = datetime.utcnow()
 
+    if draft_update.title is not None or draft_update.final_content is not None:
+        await index_draft(db, draft)
+
     await db.commit()
     await db.refresh(draft)
 
@@ -304,8 +372,9 @@ async def delete_draft(
     if draft.user_id != "default_user":  # TODO: 从认证系统获取
         raise HTTPException(status_code=403, detail="无权访问此草稿")
 
-    # 删除草稿
+    # 删除草稿及其检索索引
     await db.delete(draft)
+    await remove_document(db, "draft", draft_id)
     await db.commit()
 
     return {"success": True, "message": "草稿已删除"}
@@ -356,8 +425,7 @@ async def generate_contract(
         _process_generation,
         draft_id,
         draft.user_requirement,
-        draft.template_id,
-        db
+        draft.template_id
     )
 
     return GenerateResponse(
@@ -367,90 +435,207 @@ async def generate_contract(
     )
 
 
+@router.post("/drafts/{draft_id}/generate/stream")
+async def generate_contract_stream(
+    draft_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    流式生成合同内容（SSE）
+
+    事件依次为 status（阶段）、delta（增量文本）、done 或 error；
+    生成完成后全文保存到草稿，客户端无需轮询草稿状态。
+
+    Args:
+        draft_id: 草稿ID
+        db: 数据库会话
+
+    Returns:
+        text/event-stream 响应
+    """
+    # 查询草稿
+    result = await db.execute(
+        select(ContractDraft).where(ContractDraft.id == draft_id)
+    )
+    draft = result.scalar_one_or_none()
+
+    if not draft:
+        raise HTTPException(status_code=404, detail="草稿不存在")
+
+    # 权限验证
+    if draft.user_id != "default_user":  # TODO: 从认证系统获取
+        raise HTTPException(status_code=403, detail="无权访问此草稿")
+
+    # 检查是否有需求描述
+    if not draft.user_requirement:
+        raise HTTPException(status_code=400, detail="请先提供合同需求描述")
+
+    # 更新状态为生成中
+    draft.status = "generating"
+    await db.commit()
+
+    user_requirement, template_id = draft.user_requirement, draft.template_id
+
+    return _stream_task(
+        lambda emit: _process_generation(draft_id, user_requirement, template_id, emit)
+    )
+
+
 async def _process_generation(
     draft_id: str,
     user_requirement: str,
     template_id: Optional[str],
-    db: AsyncSession
+    emit: Optional[Callable[[str, dict], None]] = None
 ):
     """
     处理合同生成任务（后台执行）
 
+    后台任务在响应返回后执行，不能使用请求作用域的数据库会话；
+    AI 调用期间不持有会话，只在写入结果时开启短事务。
+    使用模型的流式接口生成，边生成边通过 emit 推送增量文本，完成后保存全文。
+
     Args:
         draft_id: 草稿ID
         user_requirement: 用户需求
         template_id: 模板ID
-        db: 数据库会话
+        emit: 事件回调 (事件类型, 数据)，流式接口使用
     """
+    emit = emit or _ignore_event
+
     try:
         generator = ContractGenerator()
 
         # 1. 分析需求
+        emit("status", {"stage": "analyzing"})
         analysis_result = await generator.analyze_requirement(user_requirement)
 
         if not analysis_result.get("success"):
             # 分析失败
-            await db.execute(
-                update(ContractDraft)
-                .where(ContractDraft.id == draft_id)
-                .values(
-                    status="failed",
-                    generation_metadata={"error": analysis_result.get("error")}
-                )
-            )
-            await db.commit()
+            await _fail_draft(draft_id, analysis_result.get("error"), emit)
             return
 
-        # 2. 生成合同
-        generation_result = await generator.generate_from_requirement(
+        # 2. 生成合同（流式）
+        emit("status", {"stage": "generating", "contract_type": analysis_result["contract_type"]})
+        parts = []
+        async for text in generator.stream_from_requirement(
             user_requirement=user_requirement,
             contract_type=analysis_result["contract_type"],
             elements=analysis_result["key_elements"],
             template_context=""  # TODO: 如果有模板ID，加载模板内容
-        )
+        ):
+            parts.append(text)
+            emit("delta", {"text": text})
 
-        if not generation_result.get("success"):
+        content = "".join(parts)
+        if not content:
             # 生成失败
-            await db.execute(
-                update(ContractDraft)
-                .where(ContractDraft.id == draft_id)
-                .values(
-                    status="failed",
-                    generation_metadata={"error": generation_result.get("error")}
-                )
-            )
-            await db.commit()
+            await _fail_draft(draft_id, "合同生成失败: 模型未返回内容", emit)
             return
 
         # 3. 更新草稿
-        await db.execute(
-            update(ContractDraft)
-            .where(ContractDraft.id == draft_id)
-            .values(
-                contract_type=analysis_result["contract_type"],
-                elements=analysis_result["key_elements"],
-                generated_content=generation_result["content"],
-                final_content=generation_result["content"],
-                status="generated",
-                generation_metadata={
-                    "model": settings.dashscope_model,
-                    "contract_type": analysis_result["contract_type"],
-                    "generated_at": datetime.utcnow().isoformat()
-                }
-            )
+        await _update_draft(
+            draft_id,
+            contract_type=analysis_result["contract_type"],
+            elements=analysis_result["key_elements"],
+            generated_content=content,
+            final_content=content,
+            status="generated",
+            generation_metadata={
+                "model": settings.dashscope_model,
+                "contract_type": analysis_result["contract_type"],
+                "generated_at": datetime.utcnow().isoformat()
+            }
         )
-        await db.commit()
+        emit("done", {"draft_id": draft_id, "status": "generated", "length": len(content)})
 
     except Exception as e:
         logger.error(f"合同生成失败: {str(e)}")
+        await _fail_draft(draft_id, f"合同生成失败: {str(e)}", emit)
+
+
+def _ignore_event(event: str, data: dict):
+    """非流式调用时忽略进度事件"""
+    pass
+
+
+async def _fail_draft(draft_id: str, error: Optional[str], emit: Callable[[str, dict], None]):
+    """
+    推送错误事件并将草稿标记为失败
+
+    先推送事件：保存失败状态时数据库出错也不会让流式客户端一直等待。
+    """
+    emit("error", {"draft_id": draft_id, "message": error or "生成失败"})
+    try:
+        await _update_draft(
+            draft_id,
+            status="failed",
+            generation_metadata={"error": error}
+        )
+    except Exception as e:
+        logger.error(f"保存草稿失败状态失败: {draft_id}: {str(e)}")
+
+
+def _stream_task(job) -> StreamingResponse:
+    """
+    启动生成任务并以 SSE 推送其事件
+
+    任务独立于响应执行：客户端中途断开时任务继续运行并保存结果，
+    之后仍可通过草稿详情接口获取。
+
+    Args:
+        job: 接收 emit 回调的协程函数
+
+    Returns:
+        SSE 流式响应
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    finished = False
+
+    def emit(event: str, data: dict):
+        nonlocal finished
+        if event in STREAM_TERMINAL_EVENTS:
+            finished = True
+        queue.put_nowait((event, data))
+
+    def on_done(done: asyncio.Task):
+        _streaming_tasks.discard(done)
+        # 任务异常退出或被取消而未推送结束事件时补发错误事件，避免流一直保持
+        if not finished:
+            if not done.cancelled() and done.exception() is not None:
+                logger.error(f"生成任务异常结束: {str(done.exception())}")
+            emit("error", {"message": "生成任务异常结束"})
+
+    task = asyncio.create_task(job(emit))
+    _streaming_tasks.add(task)
+    task.add_done_callback(on_done)
+
+    return StreamingResponse(
+        stream_queue(queue, STREAM_TERMINAL_EVENTS),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS
+    )
+
+
+async def _update_draft(draft_id: str, **values):
+    """
+    在独立的短事务中更新草稿（供后台任务使用），内容变化时同步更新检索索引
+
+    Args:
+        draft_id: 草稿ID
+        **values: 要更新的字段
+    """
+    async with AsyncSessionLocal() as db:
         await db.execute(
             update(ContractDraft)
             .where(ContractDraft.id == draft_id)
-            .values(
-                status="failed",
-                generation_metadata={"error": str(e)}
-            )
+            .values(**values)
         )
+
+        if "final_content" in values:
+            draft = await db.get(ContractDraft, draft_id)
+            if draft:
+                await index_draft(db, draft)
+
         await db.commit()
 
 
@@ -500,8 +685,7 @@ async def regenerate_contract(
         _process_generation,
         draft_id,
         draft.user_requirement,
-        draft.template_id,
-        db
+        draft.template_id
     )
 
     return GenerateResponse(
@@ -557,8 +741,7 @@ async def refine_contract(
         _process_refinement,
         draft_id,
         current_content,
-        refine_data.user_feedback,
-        db
+        refine_data.user_feedback
     )
 
     return GenerateResponse(
@@ -568,11 +751,55 @@ async def refine_contract(
     )
 
 
+@router.post("/drafts/{draft_id}/refine/stream")
+async def refine_contract_stream(
+    draft_id: str,
+    refine_data: RefineRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    流式优化合同内容（SSE，事件格式同流式生成）
+
+    Args:
+        draft_id: 草稿ID
+        refine_data: 优化请求数据
+        db: 数据库会话
+
+    Returns:
+        text/event-stream 响应
+    """
+    # 查询草稿
+    result = await db.execute(
+        select(ContractDraft).where(ContractDraft.id == draft_id)
+    )
+    draft = result.scalar_one_or_none()
+
+    if not draft:
+        raise HTTPException(status_code=404, detail="草稿不存在")
+
+    # 权限验证
+    if draft.user_id != "default_user":  # TODO: 从认证系统获取
+        raise HTTPException(status_code=403, detail="无权访问此草稿")
+
+    # 检查是否有当前内容
+    current_content = draft.final_content or draft.generated_content
+    if not current_content:
+        raise HTTPException(status_code=400, detail="没有可优化的内容")
+
+    # 更新状态为生成中
+    draft.status = "refining"
+    await db.commit()
+
+    return _stream_task(
+        lambda emit: _process_refinement(draft_id, current_content, refine_data.user_feedback, emit)
+    )
+
+
 async def _process_refinement(
     draft_id: str,
     current_content: str,
     user_feedback: str,
-    db: AsyncSession
+    emit: Optional[Callable[[str, dict], None]] = None
 ):
     """
     处理合同优化任务（后台执行）
@@ -581,53 +808,41 @@ async def _process_refinement(
         draft_id: 草稿ID
         current_content: 当前内容
         user_feedback: 用户反馈
-        db: 数据库会话
+        emit: 事件回调 (事件类型, 数据)，流式接口使用
     """
+    emit = emit or _ignore_event
+
     try:
         generator = ContractGenerator()
 
-        # 调用优化服务
-        refined_content = await generator.refine_contract(
+        # 调用优化服务（流式）
+        emit("status", {"stage": "refining"})
+        parts = []
+        async for text in generator.stream_refinement(
             current_content=current_content,
             user_feedback=user_feedback
-        )
+        ):
+            parts.append(text)
+            emit("delta", {"text": text})
 
-        if not refined_content:
+        content = "".join(parts)
+        if not content:
             # 优化失败
-            await db.execute(
-                update(ContractDraft)
-                .where(ContractDraft.id == draft_id)
-                .values(
-                    status="failed",
-                    generation_metadata={"error": "优化失败"}
-                )
-            )
-            await db.commit()
+            await _fail_draft(draft_id, "优化失败", emit)
             return
 
         # 更新草稿
-        await db.execute(
-            update(ContractDraft)
-            .where(ContractDraft.id == draft_id)
-            .values(
-                final_content=refined_content,
-                status="generated",
-                updated_at=datetime.utcnow()
-            )
+        await _update_draft(
+            draft_id,
+            final_content=content,
+            status="generated",
+            updated_at=datetime.utcnow()
         )
-        await db.commit()
+        emit("done", {"draft_id": draft_id, "status": "generated", "length": len(content)})
 
     except Exception as e:
         logger.error(f"合同优化失败: {str(e)}")
-        await db.execute(
-            update(ContractDraft)
-            .where(ContractDraft.id == draft_id)
-            .values(
-                status="failed",
-                generation_metadata={"error": str(e)}
-            )
-        )
-        await db.commit()
+        await _fail_draft(draft_id, f"合同优化失败: {str(e)}", emit)
 
 
 @router.post("/drafts/{draft_id}/suggest-clauses", response_model=SuggestClausesResponse)
@@ -724,7 +939,8 @@ async def download_contract(
             output_path = os.path.join(output_dir, f"{draft.title}.docx")
 
             # 生成文档
-            file_path = create_contract_document(
+            file_path = await run_cpu(
+                create_contract_document,
                 content=content,
                 title=draft.title,
                 metadata={
@@ -856,7 +1072,8 @@ async def convert_to_review(
 
             draft_file_path = os.path.join(draft_dir, f"{draft.title}.docx")
 
-            create_contract_document(
+            await run_cpu(
+                create_contract_document,
                 content=content,
                 title=draft.title,
                 metadata={
@@ -879,13 +1096,16 @@ async def convert_to_review(
         review_file_path = os.path.join(review_dir, f"original_{contract.id}.docx")
         shutil.copy(draft_file_path, review_file_path)
 
-        # 3. 更新 Contract 的文件路径
+        # 3. 更新 Contract 的文件路径和解析结果
         contract.file_path = review_file_path
+        contract.parsed_document = await run_cpu(document_tasks.parse_document, review_file_path)
 
         # 更新草稿状态
         draft.status = "converted_to_review"
         draft.updated_at = datetime.utcnow()
 
+        await index_document(db, "contract", contract.id, contract.title, contract.content_text, contract.user_id)
+
         await db.commit()
         await db.refresh(contract)
 
@@ -906,27 +1126,31 @@ async def convert_to_review(
 
 @router.get("/clauses", response_model=List[ContractClauseResponse])
 async def list_clauses(
+    response: Response,
     category: Optional[str] = None,
     contract_type: Optional[str] = None,
+    cursor: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    获取条款列表
+    获取条款列表（按使用次数、创建时间倒序，游标分页）
 
     Args:
+        response: 响应对象（下一页游标通过 X-Next-Cursor 响应头返回）
         category: 条款类别筛选
         contract_type: 合同类型筛选
-        skip: 跳过数量
+        cursor: 上一页返回的游标
+        skip: 跳过数量（兼容旧客户端，建议使用 cursor）
         limit: 限制数量
         db: 数据库会话
 
     Returns:
         条款列表
     """
-    # 构建查询
-    query = select(ContractClause)
+    # 构建查询（条款内容即列表展示内容，只投影响应需要的列）
+    query = select(*[getattr(ContractClause, name) for name in ContractClauseResponse.model_fields])
 
     if category:
         query = query.where(ContractClause.category == category)
@@ -934,13 +1158,17 @@ async def list_clauses(
     if contract_type:
         query = query.where(ContractClause.contract_type == contract_type)
 
-    query = query.order_by(ContractClause.usage_count.desc(), ContractClause.created_at.desc())
-    query = query.offset(skip).limit(limit)
-
-    result = await db.execute(query)
-    clauses = result.scalars().all()
+    rows = await _fetch_page(
+        db,
+        query,
+        [ContractClause.usage_count, ContractClause.created_at, ContractClause.id],
+        cursor,
+        skip,
+        limit,
+        response
+    )
 
-    return clauses
+    return rows
 
 
 @router.get("/clauses/{clause_id}", response_model=ContractClauseResponse)
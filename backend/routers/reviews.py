@@ -1,25 +1,34 @@
 """
 审查相关路由
 """
+import asyncio
 import logging
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import List, Optional
 import os
 
 logger = logging.getLogger(__name__)
 
-from backend.database import get_db
+from backend.database import get_db, AsyncSessionLocal
 from backend.models.review import Contract, ReviewRecord
 from backend.schemas.review import (
     ContractCreate, ContractResponse, ReviewResponse,
-    ReviewCreate, UploadResponse
+    ReviewCreate, UploadResponse, BatchUploadResponse, BatchStatusResponse
 )
-from backend.services.review_service import AIReviewer
-from backend.utils.file_utils import FileManager
-from backend.utils.document_parser import DocumentParser
-from backend.utils.location_matcher import LocationMatcher
-from backend.utils.comment_generator import CommentGenerator
+from backend.services.batch_service import create_review_batch, get_batch_status
+from backend.services.review_cache import ReviewCache
+from backend.services.job_queue import enqueue_review_job
+from backend.services.progress import progress_broker, report_progress, TERMINAL_EVENTS
+from backend.services.search_service import index_document
+from backend.services import report_service
+from backend.utils.file_utils import FileManager, FileTooLargeError
+from backend.utils import document_tasks, report_renderer
+from backend.utils.executor import run_cpu, get_executor_stats
+from backend.utils.tokenizer import get_tokenizer
+from backend.utils.pagination import paginate, split_page, InvalidCursorError, NEXT_CURSOR_HEADER
+from backend.utils.sse import stream_queue, SSE_HEADERS, KEEPALIVE_INTERVAL
 from backend.config import get_settings
 
 router = APIRouter(prefix="/api/reviews", tags=["审查"])
@@ -48,14 +57,10 @@ async def upload_contract(
     if not file.filename:
         raise HTTPException(status_code=400, detail="文件名不能为空")
 
-    file_size = 0
-    content = await file.read()
-    file_size = len(content)
-
-    # 验证文件格式和大小
+    # 验证文件格式（大小在写入时检查）
     valid, error_msg = file_manager.validate_file(
         file.filename,
-        file_size,
+        0,
         settings.max_file_size,
         settings.allowed_extensions
     )
@@ -63,24 +68,33 @@ async def upload_contract(
     if not valid:
         raise HTTPException(status_code=400, detail=error_msg)
 
-    # 保存文件
-    file_path = await file_manager.save_upload_file(content, file.filename)
+    # 分块写入文件，超过大小限制时中止
+    try:
+        file_path, file_hash = await file_manager.save_upload_stream(file, file.filename, settings.max_file_size)
+    except FileTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    # 解析文档内容
-    parser = DocumentParser()
-    parsed_doc = parser.parse_document(str(file_path))
+    # 解析文档内容（在进程池中执行）
+    parsed_doc = await run_cpu(document_tasks.parse_document, str(file_path))
 
     # 创建数据库记录
     contract = Contract(
         title=title or os.path.splitext(file.filename)[0],
         original_filename=file.filename,
         file_path=str(file_path),
+        file_hash=file_hash,
         content_text=parsed_doc["full_text"],
+        parsed_document=parsed_doc,
         source="upload",
         status="pending"
     )
 
     db.add(contract)
+    await db.flush()
+
+    # 写入检索索引（与合同记录同一事务提交）
+    await index_document(db, "contract", contract.id, contract.title, contract.content_text, contract.user_id)
+
     await db.commit()
     await db.refresh(contract)
 
@@ -91,10 +105,162 @@ async def upload_contract(
     )
 
 
+@router.post("/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    title: Optional[str] = None,
+    priority: int = 0,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    批量上传合同并开始审查
+
+    文件逐个分块写入磁盘（zip 解压其中的 .docx），在进程池中并行解析，
+    所有合同、审查记录和审查任务在同一个事务中创建。单个文件不合格时计入未导入列表，不影响其他文件。
+
+    Args:
+        files: .docx 文件或包含 .docx 的 zip 文件（可混合）
+        title: 批次标题（可选）
+        priority: 审查任务优先级，数值越大越优先
+        db: 数据库会话
+
+    Returns:
+        批量上传响应（批次ID、合同ID、审查ID、未导入的文件）
+    """
+    saved: List[tuple] = []
+    rejected: List[dict] = []
+
+    for upload in files:
+        filename = os.path.basename(upload.filename or "")
+        if not filename:
+            rejected.append({"filename": "", "error": "文件名不能为空"})
+            continue
+
+        remaining = settings.max_batch_files - len(saved)
+
+        if filename.lower().endswith(".zip"):
+            try:
+                zip_path, _ = await file_manager.save_upload_stream(upload, filename, settings.max_batch_upload_size)
+            except FileTooLargeError as e:
+                rejected.append({"filename": filename, "error": str(e)})
+                continue
+            try:
+                members, member_rejected = await asyncio.to_thread(
+                    file_manager.extract_zip,
+                    zip_path,
+                    settings.max_file_size,
+                    settings.allowed_extensions,
+                    remaining
+                )
+            finally:
+                zip_path.unlink(missing_ok=True)
+            saved.extend(members)
+            rejected.extend({"filename": name, "error": error} for name, error in member_rejected)
+            continue
+
+        valid, error_msg = file_manager.validate_file(filename, 0, settings.max_file_size, settings.allowed_extensions)
+        if not valid:
+            rejected.append({"filename": filename, "error": error_msg})
+            continue
+        if remaining <= 0:
+            rejected.append({"filename": filename, "error": f"超过批量文件数上限 {settings.max_batch_files}"})
+            continue
+        try:
+            saved.append((filename, *await file_manager.save_upload_stream(upload, filename, settings.max_file_size)))
+        except FileTooLargeError as e:
+            rejected.append({"filename": filename, "error": str(e)})
+
+    # 在进程池中并行解析
+    parsed_results = await asyncio.gather(
+        *(run_cpu(document_tasks.parse_document, str(path)) for _, path, _ in saved),
+        return_exceptions=True
+    )
+
+    contracts = []
+    for (filename, path, file_hash), parsed_doc in zip(saved, parsed_results):
+        if isinstance(parsed_doc, Exception):
+            logger.warning(f"批量上传解析失败 {filename}: {parsed_doc}")
+            rejected.append({"filename": filename, "error": "文档解析失败，请确认是有效的 Word 文档"})
+            path.unlink(missing_ok=True)
+            continue
+        contracts.append({
+            "title": os.path.splitext(filename)[0],
+            "original_filename": filename,
+            "file_path": str(path),
+            "file_hash": file_hash,
+            "parsed_document": parsed_doc
+        })
+
+    if not contracts:
+        reasons = "；".join(f"{item['filename']}: {item['error']}" for item in rejected[:10])
+        raise HTTPException(status_code=400, detail=f"没有可审查的文件（{reasons}）")
+
+    batch, contract_ids, review_ids = await create_review_batch(
+        db,
+        contracts,
+        rejected,
+        title=title,
+        priority=priority
+    )
+    await db.commit()
+
+    for review_id in review_ids:
+        report_progress(review_id, "queued")
+
+    return BatchUploadResponse(
+        batch_id=batch.id,
+        total_files=batch.total_files,
+        accepted=len(contract_ids),
+        rejected=rejected,
+        contract_ids=contract_ids,
+        review_ids=review_ids
+    )
+
+
+@router.get("/batches/{batch_id}", response_model=BatchStatusResponse)
+async def get_batch(
+    batch_id: str,
+    items: bool = False,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取批量审查状态
+
+    Args:
+        batch_id: 批次ID
+        items: 是否返回每个审查的状态
+        db: 数据库会话
+
+    Returns:
+        批次进度、各状态审查数和风险数量汇总
+    """
+    status = await get_batch_status(db, batch_id, include_items=items)
+    if status is None:
+        raise HTTPException(status_code=404, detail="批次不存在")
+    return status
+
+
+@router.get("/metrics")
+async def get_review_metrics():
+    """
+    获取审核服务运行指标
+
+    Returns:
+        审核缓存命中统计、Token 估算误差、文档处理耗时等指标
+    """
+    return {
+        "review_cache": ReviewCache.get_stats(),
+        "progress_subscribers": progress_broker.subscriber_count(),
+        "tokenizer": get_tokenizer().get_stats(),
+        "cpu_executor": get_executor_stats()
+    }
+
+
 @router.post("/{contract_id}/start", response_model=ReviewResponse)
 async def start_review(
     contract_id: str,
-    background_tasks: BackgroundTasks,
+    incremental: bool = True,
+    priority: int = 0,
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -102,7 +268,8 @@ async def start_review(
 
     Args:
         contract_id: 合同ID
-        background_tasks: 后台任务
+        incremental: 是否增量审核（复用上次审核中未修改分段的结果）
+        priority: 任务优先级，数值越大越优先
         db: 数据库会话
 
     Returns:
@@ -124,18 +291,22 @@ async def start_review(
     )
 
     db.add(review)
-    await db.commit()
-    await db.refresh(review)
+    await db.flush()
 
-    # 异步执行审核
-    background_tasks.add_task(
-        _process_review,
-        contract.file_path,
+    # 加入审查任务队列（与审查记录同一事务提交），由 Worker 执行
+    enqueue_review_job(
+        db,
         review.id,
         contract_id,
-        db
+        priority=priority,
+        payload={"incremental": incremental}
     )
 
+    await db.commit()
+    await db.refresh(review)
+
+    report_progress(review.id, "queued")
+
     return ReviewResponse(
         id=review.id,
         contract_id=contract_id,
@@ -144,111 +315,81 @@ async def start_review(
     )
 
 
-async def _process_review(
-    file_path: str,
-    review_id: str,
-    contract_id: str,
-    db: AsyncSession
+@router.get("/contracts", response_model=list[ContractResponse])
+async def get_user_contracts(
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_db)
 ):
     """
-    处理审查任务（后台执行）
+    获取用户的合同列表（按创建时间倒序，游标分页）
 
     Args:
-        file_path: 文件路径
-        review_id: 审查记录ID
-        contract_id: 合同ID
+        response: 响应对象（下一页游标通过 X-Next-Cursor 响应头返回）
+        cursor: 上一页返回的游标
+        limit: 每页数量
         db: 数据库会话
+
+    Returns:
+        合同列表
     """
-    from sqlalchemy import select, update
-    from datetime import datetime
+    from sqlalchemy import select
+
+    # 只查询列表需要的列，不加载合同正文和解析结果
+    query = (
+        select(*[getattr(Contract, name) for name in ContractResponse.model_fields])
+        .where(Contract.user_id == "default_user")  # TODO: 从认证系统获取
+    )
 
     try:
-        logger.info(f"[Review {review_id}] 开始处理审查任务")
-
-        # 创建 AI 审核器
-        reviewer = AIReviewer()
-
-        # 执行审核
-        logger.info(f"[Review {review_id}] 调用AI审核服务")
-        review_result = reviewer.review_contract(file_path)
-        logger.info(f"[Review {review_id}] AI审核结果: success={review_result.get('success')}, "
-                   f"issues={len(review_result.get('issues', []))}")
-
-        if not review_result.get("success"):
-            # 审核失败
-            error_msg = review_result.get("error", "未知错误")
-            logger.error(f"[Review {review_id}] 审核失败: {error_msg}")
-            await db.execute(
-                update(ReviewRecord)
-                .where(ReviewRecord.id == review_id)
-                .values(status="failed", error_message=error_msg)
-            )
-            await db.commit()
-            return
-
-        # 定位问题位置
-        issues = review_result.get("issues", [])
-        issues_with_location = reviewer.locate_issues(file_path, issues)
-
-        # 生成带批注的文档
-        comment_gen = CommentGenerator(file_path)
-        added_count = comment_gen.add_issues_as_comments(issues_with_location)
-
-        # 保存带批注的文档（直接保存到目标路径）
-        reviewed_file_name = f"reviewed_{os.path.basename(file_path)}"
-        reviewed_file_path = file_manager.get_storage_path(contract_id, reviewed_file_name)
-        comment_gen.save(str(reviewed_file_path))
-
-        # 生成审查报告
-        report_text = comment_gen.create_review_report(
-            issues,
-            review_result.get("summary", "")
-        )
+        query = paginate(query, [Contract.created_at, Contract.id], cursor, limit)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        # 保存报告
-        report_path = await file_manager.save_reviewed_file(
-            contract_id,
-            "review_report.txt",
-            report_text.encode("utf-8")
-        )
+    result = await db.execute(query)
+    contracts, next_cursor = split_page(result.all(), ["created_at", "id"], limit)
 
-        # 更新审查记录
-        await db.execute(
-            update(ReviewRecord)
-            .where(ReviewRecord.id == review_id)
-            .values(
-                status="completed",
-                issues=issues,
-                summary=review_result.get("summary", ""),
-                high_risk_count=review_result.get("high_risk_count", 0),
-                medium_risk_count=review_result.get("medium_risk_count", 0),
-                low_risk_count=review_result.get("low_risk_count", 0),
-                reviewed_file_path=str(reviewed_file_path),
-                report_path=str(report_path),
-                completed_at=datetime.utcnow()
-            )
-        )
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
-        # 更新合同状态
-        await db.execute(
-            update(Contract)
-            .where(Contract.id == contract_id)
-            .values(status="completed")
-        )
+    return [ContractResponse.model_validate(c) for c in contracts]
 
-        await db.commit()
-
-    except Exception as e:
-        # 发生错误
-        import traceback
-        error_msg = f"{str(e)}\n{traceback.format_exc()}"
-        logger.error(f"[Review {review_id}] 处理异常: {error_msg}")
-        await db.execute(
-            update(ReviewRecord)
-            .where(ReviewRecord.id == review_id)
-            .values(status="failed", error_message=str(e))
-        )
-        await db.commit()
+
+@router.get("/contracts/{contract_id}", response_model=ContractResponse)
+async def get_contract(
+    contract_id: str,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取合同详情
+
+    Args:
+        contract_id: 合同ID
+        db: 数据库会话
+
+    Returns:
+        合同详情
+    """
+    from sqlalchemy import select
+
+    result = await db.execute(
+        select(Contract).where(Contract.id == contract_id)
+    )
+    contract = result.scalar_one_or_none()
+
+    if not contract:
+        raise HTTPException(status_code=404, detail="合同不存在")
+
+    return ContractResponse(
+        id=contract.id,
+        title=contract.title,
+        original_filename=contract.original_filename,
+        status=contract.status,
+        source=contract.source,
+        created_at=contract.created_at,
+        updated_at=contract.updated_at
+    )
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
@@ -294,13 +435,109 @@ async def get_review(
     )
 
 
+@router.get("/{review_id}/events")
+async def stream_review_events(review_id: str):
+    """
+    订阅审查进度（SSE）
+
+    事件类型：progress（阶段进度，data.stage 为 queued/started/parsed/section_reviewed/
+    located/comments_written/report_saved/retrying）、completed、failed。
+    收到 completed 后再请求一次审查详情获取完整结果。
+
+    Args:
+        review_id: 审查记录ID
+
+    Returns:
+        text/event-stream 响应
+    """
+    queue = progress_broker.subscribe(review_id)
+
+    try:
+        # 本进程没有该审查的进度时，查询一次状态（审查可能已结束或由其他进程处理）
+        if progress_broker.latest(review_id) is None:
+            status_event = await _review_status_event(review_id)
+            if status_event is None:
+                raise HTTPException(status_code=404, detail="审查记录不存在")
+            if status_event[0] in TERMINAL_EVENTS:
+                queue.put_nowait(status_event)
+    except BaseException:
+        progress_broker.unsubscribe(review_id, queue)
+        raise
+
+    # 独立部署 Worker 时本进程收不到进度事件，改为低频查询状态
+    on_idle = None
+    keepalive = KEEPALIVE_INTERVAL
+    if not settings.review_worker_embedded:
+        keepalive = settings.review_progress_poll_seconds
+
+        async def on_idle():
+            status_event = await _review_status_event(review_id)
+            if status_event and status_event[0] in TERMINAL_EVENTS:
+                return status_event
+            return None
+
+    async def events():
+        try:
+            async for chunk in stream_queue(queue, TERMINAL_EVENTS, keepalive, on_idle):
+                yield chunk
+        finally:
+            progress_broker.unsubscribe(review_id, queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+async def _review_status_event(review_id: str):
+    """
+    查询审查状态并转换为进度事件（只读取状态列）
+
+    Returns:
+        (事件类型, 数据)，审查不存在时返回 None
+    """
+    from sqlalchemy import select
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(
+                ReviewRecord.status,
+                ReviewRecord.error_message,
+                ReviewRecord.high_risk_count,
+                ReviewRecord.medium_risk_count,
+                ReviewRecord.low_risk_count
+            ).where(ReviewRecord.id == review_id)
+        )
+        row = result.first()
+
+    if row is None:
+        return None
+
+    status, error_message, high, medium, low = row
+    if status == "completed":
+        return "completed", {
+            "review_id": review_id,
+            "stage": "completed",
+            "percent": 100,
+            "total_issues": (high or 0) + (medium or 0) + (low or 0),
+            "high_risk_count": high or 0,
+            "medium_risk_count": medium or 0,
+            "low_risk_count": low or 0
+        }
+    if status == "failed":
+        return "failed", {
+            "review_id": review_id,
+            "stage": "failed",
+            "percent": 0,
+            "error_message": error_message
+        }
+    return "progress", {"review_id": review_id, "stage": status, "percent": 0}
+
+
 @router.get("/{review_id}/download")
 async def download_reviewed_file(
     review_id: str,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    下载带批注的文档
+    下载带批注的文档（审查时未生成的，首次下载时生成）
 
     Args:
         review_id: 审查ID
@@ -323,19 +560,41 @@ async def download_reviewed_file(
     if review.status != "completed":
         raise HTTPException(status_code=400, detail="审查尚未完成")
 
-    if not review.reviewed_file_path:
-        raise HTTPException(status_code=404, detail="文件不存在")
+    contract = await db.get(Contract, review.contract_id)
+    if contract is None:
+        raise HTTPException(status_code=404, detail="合同不存在")
+
+    # 审查时已生成的文件直接返回，否则首次下载时生成
+    if review.reviewed_file_path and os.path.exists(review.reviewed_file_path):
+        file_path = review.reviewed_file_path
+    else:
+        if not contract.file_path or not os.path.exists(contract.file_path):
+            raise HTTPException(status_code=404, detail="文件不存在")
+        try:
+            file_path = await report_service.get_reviewed_document(
+                file_manager,
+                review.id,
+                contract.id,
+                contract.file_path,
+                contract.parsed_document,
+                report_service.issues_with_locations(review),
+                review.summary or ""
+            )
+        except Exception as e:
+            logger.error(f"[Review {review_id}] 生成带批注文档失败: {e}")
+            raise HTTPException(status_code=500, detail="生成带批注文档失败")
 
     return FileResponse(
-        review.reviewed_file_path,
+        file_path,
         media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        filename=f"reviewed_{os.path.basename(review.reviewed_file_path)}"
+        filename=f"reviewed_{os.path.basename(contract.original_filename or contract.file_path)}"
     )
 
 
 @router.get("/{review_id}/report")
 async def download_review_report(
     review_id: str,
+    report_format: str = Query("txt", alias="format", description="报告格式：txt、json、csv、md、html、docx"),
     db: AsyncSession = Depends(get_db)
 ):
     """
@@ -343,14 +602,21 @@ async def download_review_report(
 
     Args:
         review_id: 审查ID
+        report_format: 报告格式（查询参数 format）
         db: 数据库会话
 
     Returns:
-        报告文件响应
+        报告文件响应（首次请求的文本格式以流式响应边渲染边输出）
     """
     from fastapi.responses import FileResponse
     from sqlalchemy import select
 
+    if report_format not in report_renderer.REPORT_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"不支持的报告格式，可选：{'、'.join(report_renderer.REPORT_FORMATS)}"
+        )
+
     result = await db.execute(
         select(ReviewRecord).where(ReviewRecord.id == review_id)
     )
@@ -362,82 +628,32 @@ async def download_review_report(
     if review.status != "completed":
         raise HTTPException(status_code=400, detail="审查尚未完成")
 
-    if not review.report_path:
-        raise HTTPException(status_code=404, detail="报告不存在")
-
-    return FileResponse(
-        review.report_path,
-        media_type="text/plain",
-        filename="review_report.txt"
-    )
-
-
-@router.get("/contracts", response_model=list[ContractResponse])
-async def get_user_contracts(
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    获取用户的所有合同
-
-    Args:
-        db: 数据库会话
-
-    Returns:
-        合同列表
-    """
-    from sqlalchemy import select
-
-    result = await db.execute(
-        select(Contract)
-        .order_by(Contract.created_at.desc())
-    )
-    contracts = result.scalars().all()
-
-    return [
-        ContractResponse(
-            id=c.id,
-            title=c.title,
-            original_filename=c.original_filename,
-            status=c.status,
-            source=c.source,
-            created_at=c.created_at,
-            updated_at=c.updated_at
-        )
-        for c in contracts
-    ]
-
-
-@router.get("/contracts/{contract_id}", response_model=ContractResponse)
-async def get_contract(
-    contract_id: str,
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    获取合同详情
-
-    Args:
-        contract_id: 合同ID
-        db: 数据库会话
-
-    Returns:
-        合同详情
-    """
-    from sqlalchemy import select
-
-    result = await db.execute(
-        select(Contract).where(Contract.id == contract_id)
-    )
-    contract = result.scalar_one_or_none()
-
-    if not contract:
-        raise HTTPException(status_code=404, detail="合同不存在")
-
-    return ContractResponse(
-        id=contract.id,
-        title=contract.title,
-        original_filename=contract.original_filename,
-        status=contract.status,
-        source=contract.source,
-        created_at=contract.created_at,
-        updated_at=contract.updated_at
+    media_type, extension = report_renderer.REPORT_FORMATS[report_format]
+    filename = f"review_report.{extension}"
+
+    # 审查时保存的纯文本报告
+    if report_format == "txt" and review.report_path and os.path.exists(review.report_path):
+        return FileResponse(review.report_path, media_type=media_type, filename=filename)
+
+    cache_path = report_service.report_cache_path(file_manager, review.contract_id, review.id, report_format)
+    if cache_path.exists():
+        return FileResponse(cache_path, media_type=media_type, filename=filename)
+
+    title = (await db.execute(
+        select(Contract.title).where(Contract.id == review.contract_id)
+    )).scalar_one_or_none()
+    report = report_service.build_review_report(review, title or "")
+
+    if report_format == "docx":
+        try:
+            cache_path = await report_service.get_docx_report(file_manager, review, report)
+        except Exception as e:
+            logger.error(f"[Review {review_id}] 生成 Word 报告失败: {e}")
+            raise HTTPException(status_code=500, detail="生成报告失败")
+        return FileResponse(cache_path, media_type=media_type, filename=filename)
+
+    return StreamingResponse(
+        report_service.stream_and_cache(report_renderer.TEXT_RENDERERS[report_format](report), cache_path),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
     )
@@ -0,0 +1,47 @@
+"""
+全文检索路由
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from backend.database import get_db
+from backend.schemas.search import SearchResponse
+from backend.services.search_service import search, DOC_TYPES
+
+router = APIRouter(prefix="/api/search", tags=["检索"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search_documents(
+    q: str = Query(..., min_length=1, description="查询文本，空格分隔的多个词需同时匹配"),
+    types: Optional[str] = Query(None, description="文档类型，逗号分隔：contract,draft,clause"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    检索合同、草稿和条款库
+
+    Args:
+        q: 查询文本
+        types: 限定文档类型
+        limit: 最大返回数量
+        db: 数据库会话
+
+    Returns:
+        按相关度排序的检索结果及摘要
+    """
+    doc_types = None
+    if types:
+        doc_types = [t.strip() for t in types.split(",") if t.strip()]
+        invalid = [t for t in doc_types if t not in DOC_TYPES]
+        if invalid:
+            raise HTTPException(status_code=400, detail=f"不支持的文档类型: {', '.join(invalid)}")
+
+    return await search(
+        db,
+        q,
+        doc_types=doc_types,
+        user_id="default_user",  # TODO: 从认证系统获取
+        limit=limit
+    )
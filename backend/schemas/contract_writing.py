@@ -58,6 +58,23 @@ class ContractTemplateResponse(BaseModel):
         from_attributes = True
 
 
+class ContractTemplateSummary(BaseModel):
+    """合同模板列表项（不含模板内容，详情通过模板详情接口获取）"""
+    id: str
+    name: str
+    category: Optional[str] = None
+    description: Optional[str] = None
+    is_system: bool
+    is_active: bool
+    usage_count: int
+    created_by: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 # ============ 草稿相关 Schemas ============
 
 class ContractDraftCreate(BaseModel):
@@ -96,6 +113,23 @@ class ContractDraftResponse(BaseModel):
         from_attributes = True
 
 
+class ContractDraftSummary(BaseModel):
+    """合同草稿列表项（不含合同正文，详情通过草稿详情接口获取）"""
+    id: str
+    user_id: str
+    template_id: Optional[str] = None
+    title: str
+    contract_type: Optional[str] = None
+    status: str
+    version: int
+    created_at: datetime
+    updated_at: datetime
+    finalized_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
 # ============ 生成相关 Schemas ============
 
 class GenerateRequest(BaseModel):
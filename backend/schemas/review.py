@@ -2,7 +2,7 @@
 Pydantic 数据模型
 """
 from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from typing import Dict, List, Optional, Literal
 from datetime import datetime
 from enum import Enum
 
@@ -78,3 +78,47 @@ class UploadResponse(BaseModel):
     success: bool
     message: str
     contract_id: Optional[str] = None
+
+
+class BatchRejectedFile(BaseModel):
+    """批量上传中未能导入的文件"""
+    filename: str
+    error: str
+
+
+class BatchUploadResponse(BaseModel):
+    """批量上传响应"""
+    batch_id: str
+    total_files: int = Field(..., description="收到的文件数（zip 按其中的文件计）")
+    accepted: int = Field(..., description="已创建审查的合同数")
+    rejected: List[BatchRejectedFile] = Field(default_factory=list, description="未能导入的文件")
+    contract_ids: List[str] = Field(default_factory=list)
+    review_ids: List[str] = Field(default_factory=list)
+
+
+class BatchReviewItem(BaseModel):
+    """批量审查中的单个审查"""
+    review_id: str
+    contract_id: str
+    title: Optional[str] = None
+    status: str
+    high_risk_count: int = 0
+    medium_risk_count: int = 0
+    low_risk_count: int = 0
+    error_message: Optional[str] = None
+
+
+class BatchStatusResponse(BaseModel):
+    """批量审查状态"""
+    batch_id: str
+    title: Optional[str] = None
+    status: str = Field(..., description="processing/completed/failed（全部失败时为 failed）")
+    percent: int = Field(..., description="整体进度百分比")
+    total: int = Field(..., description="审查数")
+    status_counts: Dict[str, int] = Field(default_factory=dict, description="各状态的审查数")
+    high_risk_count: int = 0
+    medium_risk_count: int = 0
+    low_risk_count: int = 0
+    rejected: List[BatchRejectedFile] = Field(default_factory=list)
+    created_at: datetime
+    items: Optional[List[BatchReviewItem]] = None
@@ -0,0 +1,22 @@
+"""
+全文检索相关的 Pydantic 模型
+"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class SearchHit(BaseModel):
+    """检索结果"""
+    doc_type: str = Field(..., description="文档类型：contract/draft/clause")
+    doc_id: str = Field(..., description="文档ID")
+    title: Optional[str] = Field(None, description="标题")
+    snippet: str = Field("", description="匹配位置附近的摘要，匹配词以 <mark> 标出")
+    score: float = Field(..., description="相关度（越大越相关）")
+
+
+class SearchResponse(BaseModel):
+    """检索响应"""
+    query: str
+    total: int
+    took_ms: float
+    hits: List[SearchHit] = Field(default_factory=list)
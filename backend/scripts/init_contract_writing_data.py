@@ -17,6 +17,7 @@ from sqlalchemy import select
 from backend.database import AsyncSessionLocal
 from backend.models.contract_writing import ContractTemplate, ContractClause
 from backend.models.review import generate_id
+from backend.services.search_service import index_document
 
 
 # ============ 模板数据 ============
@@ -308,6 +309,7 @@ async def init_clauses(session):
             updated_at=datetime.utcnow()
         )
         session.add(clause)
+        await index_document(session, "clause", clause.id, clause.title, clause.content)
         print(f"  [OK] 创建条款: {clause_data['title']}")
 
     await session.commit()
@@ -0,0 +1,197 @@
+"""
+批量审查
+
+一次导入多份合同：所有合同、审查记录和审查任务在同一个事务中创建，审查记录带批次ID，
+批次状态按审查记录汇总（各状态数量、风险数量），进行中的审查取进度推送的最近进度。
+"""
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.models.review import Contract, ReviewRecord, ReviewBatch
+from backend.services.job_queue import enqueue_review_job
+from backend.services.progress import progress_broker
+from backend.services.search_service import index_document
+
+logger = logging.getLogger(__name__)
+
+# 已结束的审查状态
+FINISHED_STATUSES = ("completed", "failed")
+
+
+async def create_review_batch(
+    db: AsyncSession,
+    contracts: List[Dict[str, Any]],
+    rejected: List[Dict[str, str]],
+    title: Optional[str] = None,
+    user_id: str = "default_user",
+    priority: int = 0
+) -> Tuple[ReviewBatch, List[str], List[str]]:
+    """
+    创建批次、合同、审查记录并入队（在调用方的事务中执行，由调用方提交）
+
+    Args:
+        db: 数据库会话
+        contracts: 已解析的合同 [{title, original_filename, file_path, file_hash, parsed_document}]
+        rejected: 未能导入的文件 [{filename, error}]
+        title: 批次标题
+        user_id: 用户ID
+        priority: 审查任务优先级
+
+    Returns:
+        (批次, 合同ID列表, 审查ID列表)
+    """
+    batch = ReviewBatch(
+        user_id=user_id,
+        title=title,
+        total_files=len(contracts) + len(rejected),
+        rejected_files=rejected
+    )
+    db.add(batch)
+
+    contract_rows = [
+        Contract(
+            user_id=user_id,
+            title=item["title"],
+            original_filename=item["original_filename"],
+            file_path=item["file_path"],
+            file_hash=item.get("file_hash"),
+            content_text=item["parsed_document"]["full_text"],
+            parsed_document=item["parsed_document"],
+            source="upload",
+            status="pending"
+        )
+        for item in contracts
+    ]
+    db.add_all(contract_rows)
+    await db.flush()
+
+    review_rows = [
+        ReviewRecord(
+            contract_id=contract.id,
+            user_id=user_id,
+            batch_id=batch.id,
+            status="processing"
+        )
+        for contract in contract_rows
+    ]
+    db.add_all(review_rows)
+    await db.flush()
+
+    for contract, review in zip(contract_rows, review_rows):
+        await index_document(db, "contract", contract.id, contract.title, contract.content_text, user_id)
+        enqueue_review_job(db, review.id, contract.id, priority=priority, payload={"incremental": False})
+
+    logger.info(f"[Batch {batch.id}] 创建 {len(review_rows)} 个审查，{len(rejected)} 个文件未导入")
+    return batch, [contract.id for contract in contract_rows], [review.id for review in review_rows]
+
+
+async def get_batch_status(
+    db: AsyncSession,
+    batch_id: str,
+    include_items: bool = False
+) -> Optional[Dict[str, Any]]:
+    """
+    汇总批次状态
+
+    Args:
+        db: 数据库会话
+        batch_id: 批次ID
+        include_items: 是否返回每个审查的状态
+
+    Returns:
+        批次状态，批次不存在时返回 None
+    """
+    batch = await db.get(ReviewBatch, batch_id)
+    if batch is None:
+        return None
+
+    result = await db.execute(
+        select(
+            ReviewRecord.status,
+            func.count(),
+            func.coalesce(func.sum(ReviewRecord.high_risk_count), 0),
+            func.coalesce(func.sum(ReviewRecord.medium_risk_count), 0),
+            func.coalesce(func.sum(ReviewRecord.low_risk_count), 0)
+        )
+        .where(ReviewRecord.batch_id == batch_id)
+        .group_by(ReviewRecord.status)
+    )
+
+    status_counts: Dict[str, int] = {}
+    high = medium = low = 0
+    for status, count, status_high, status_medium, status_low in result.all():
+        status_counts[status] = count
+        # 风险数量只统计已完成的审查（失败或进行中的审查没有结果）
+        if status == "completed":
+            high, medium, low = status_high, status_medium, status_low
+
+    total = sum(status_counts.values())
+    finished = sum(status_counts.get(status, 0) for status in FINISHED_STATUSES)
+
+    # 进行中的审查按进度推送的最近进度计入（独立部署 Worker 时没有进度事件，按 0 计）
+    progress = 100.0 * finished
+    if finished < total:
+        pending = await db.execute(
+            select(ReviewRecord.id)
+            .where(ReviewRecord.batch_id == batch_id)
+            .where(ReviewRecord.status.not_in(FINISHED_STATUSES))
+        )
+        for review_id in pending.scalars():
+            latest = progress_broker.latest(review_id)
+            if latest:
+                progress += latest[1].get("percent", 0)
+
+    if finished < total:
+        batch_status = "processing"
+    elif total and status_counts.get("failed", 0) == total:
+        batch_status = "failed"
+    else:
+        batch_status = "completed"
+
+    status = {
+        "batch_id": batch.id,
+        "title": batch.title,
+        "status": batch_status,
+        "percent": int(progress / total) if total else 100,
+        "total": total,
+        "status_counts": status_counts,
+        "high_risk_count": high,
+        "medium_risk_count": medium,
+        "low_risk_count": low,
+        "rejected": batch.rejected_files or [],
+        "created_at": batch.created_at,
+        "items": None
+    }
+
+    if include_items:
+        rows = await db.execute(
+            select(
+                ReviewRecord.id,
+                ReviewRecord.contract_id,
+                Contract.title,
+                ReviewRecord.status,
+                ReviewRecord.high_risk_count,
+                ReviewRecord.medium_risk_count,
+                ReviewRecord.low_risk_count,
+                ReviewRecord.error_message
+            )
+            .join(Contract, Contract.id == ReviewRecord.contract_id)
+            .where(ReviewRecord.batch_id == batch_id)
+            .order_by(ReviewRecord.created_at, ReviewRecord.id)
+        )
+        status["items"] = [
+            {
+                "review_id": review_id,
+                "contract_id": contract_id,
+                "title": title,
+                "status": item_status,
+                "high_risk_count": item_high or 0,
+                "medium_risk_count": item_medium or 0,
+                "low_risk_count": item_low or 0,
+                "error_message": error_message
+            }
+            for review_id, contract_id, title, item_status, item_high, item_medium, item_low, error_message in rows.all()
+        ]
+
+    return status
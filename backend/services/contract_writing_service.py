@@ -2,9 +2,9 @@
 合同撰写服务
 """
 import json
-from typing import Dict, List, Any, Optional
-from openai import OpenAI
+from typing import Dict, List, Any, Optional, AsyncIterator
 from backend.config import get_settings
+from backend.services.llm_client import get_llm_client
 from backend.utils.contract_prompts import (
     build_requirement_analysis_prompt,
     build_contract_generation_prompt,
@@ -19,10 +19,7 @@ class ContractGenerator:
 
     def __init__(self):
         settings = get_settings()
-        self.client = OpenAI(
-            api_key=settings.dashscope_api_key,
-            base_url=settings.dashscope_base_url
-        )
+        self.client = get_llm_client()
         self.model = settings.dashscope_model
         self.max_retries = settings.max_retries
 
@@ -37,7 +34,7 @@ class ContractGenerator:
             需求分析结果字典
         """
         prompt = build_requirement_analysis_prompt(user_requirement)
-        ai_result = self._call_ai_with_retry(prompt)
+        ai_result = await self._call_ai_with_retry(prompt)
 
         if "error" in ai_result:
             return {
@@ -60,15 +57,15 @@ class ContractGenerator:
             "suggested_clauses": ai_result.get("suggested_clauses", [])
         }
 
-    async def generate_from_requirement(
+    async def stream_from_requirement(
         self,
         user_requirement: str,
         contract_type: str,
         elements: Dict[str, Any],
         template_context: str = ""
-    ) -> Dict[str, Any]:
+    ) -> AsyncIterator[str]:
         """
-        基于用户需求生成合同
+        基于用户需求流式生成合同，模型每输出一段文本即返回
 
         Args:
             user_requirement: 用户需求描述
@@ -76,9 +73,21 @@ class ContractGenerator:
             elements: 关键要素
             template_context: 模板上下文（可选）
 
-        Returns:
-            生成结果字典
+        Yields:
+            增量文本
         """
+        messages = self._generation_messages(user_requirement, contract_type, elements, template_context)
+        async for text in self._stream_completion(messages):
+            yield text
+
+    def _generation_messages(
+        self,
+        user_requirement: str,
+        contract_type: str,
+        elements: Dict[str, Any],
+        template_context: str
+    ) -> List[Dict[str, str]]:
+        """构建合同生成的对话消息"""
         # 将 elements 转换为字符串格式
         elements_str = json.dumps(elements, ensure_ascii=False, indent=2)
 
@@ -89,71 +98,61 @@ class ContractGenerator:
             template_context=template_context
         )
 
-        # 对于合同生成，不使用 JSON 格式，直接返回文本
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位资深的合同起草专家，精通中国合同法和各类商业合同。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-            )
-
-            content = response.choices[0].message.content
-
-            return {
-                "success": True,
-                "content": content
-            }
-
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"合同生成失败: {str(e)}",
-                "content": ""
-            }
+        return [
+            {"role": "system", "content": "你是一位资深的合同起草专家，精通中国合同法和各类商业合同。"},
+            {"role": "user", "content": prompt}
+        ]
 
-    async def refine_contract(
+    async def stream_refinement(
         self,
         current_content: str,
         user_feedback: str
-    ) -> Dict[str, Any]:
+    ) -> AsyncIterator[str]:
         """
-        根据用户反馈优化合同
+        根据用户反馈流式优化合同，模型每输出一段文本即返回
 
         Args:
             current_content: 当前合同内容
             user_feedback: 用户反馈
 
-        Returns:
-            优化结果字典
+        Yields:
+            增量文本
         """
+        messages = self._refinement_messages(current_content, user_feedback)
+        async for text in self._stream_completion(messages):
+            yield text
+
+    def _refinement_messages(self, current_content: str, user_feedback: str) -> List[Dict[str, str]]:
+        """构建合同优化的对话消息"""
         prompt = build_contract_refinement_prompt(current_content, user_feedback)
+        return [
+            {"role": "system", "content": "你是一位合同修改专家。"},
+            {"role": "user", "content": prompt}
+        ]
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "你是一位合同修改专家。"},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-            )
+    async def _stream_completion(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        调用模型的流式接口
 
-            content = response.choices[0].message.content
+        Args:
+            messages: 对话消息
 
-            return {
-                "success": True,
-                "content": content
-            }
+        Yields:
+            增量文本（跳过空片段）
+        """
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=0.3,
+            stream=True,
+        )
 
-        except Exception as e:
-            return {
-                "success": False,
-                "error": f"合同优化失败: {str(e)}",
-                "content": current_content  # 失败时返回原内容
-            }
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                yield text
 
     async def suggest_clauses(
         self,
@@ -180,7 +179,7 @@ class ContractGenerator:
             elements=elements_str
         )
 
-        ai_result = self._call_ai_with_retry(prompt)
+        ai_result = await self._call_ai_with_retry(prompt)
 
         if "error" in ai_result:
             return {
@@ -198,7 +197,7 @@ class ContractGenerator:
             "optimization_suggestions": ai_result.get("optimization_suggestions", [])
         }
 
-    def _call_ai_with_retry(self, prompt: str, retry_count: int = 0) -> Dict[str, Any]:
+    async def _call_ai_with_retry(self, prompt: str, retry_count: int = 0) -> Dict[str, Any]:
         """
         调用 AI 并带重试机制
 
@@ -210,7 +209,7 @@ class ContractGenerator:
             AI 响应的 JSON 字典
         """
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "你是一位专业的合同法律顾问和合同起草专家。"},
@@ -227,7 +226,7 @@ class ContractGenerator:
             # JSON 解析失败，重试
             if retry_count < self.max_retries:
                 enhanced_prompt = build_retry_prompt(prompt)
-                return self._call_ai_with_retry(enhanced_prompt, retry_count + 1)
+                return await self._call_ai_with_retry(enhanced_prompt, retry_count + 1)
 
             # 重试用尽，返回错误信息
             return {
@@ -0,0 +1,286 @@
+"""
+审查任务队列
+
+基于数据库表的持久化任务队列：任务随审查记录一起入队，Worker 通过
+条件更新（compare-and-set）领取租约，定期续约，失败后按指数退避重试。
+进程重启或 Worker 崩溃后，租约过期的任务会被重新领取。
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Any, List, Optional
+from sqlalchemy import select, update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.config import get_settings
+from backend.database import AsyncSessionLocal
+from backend.models.review import ReviewJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_review_job(
+    db: AsyncSession,
+    review_id: str,
+    contract_id: str,
+    priority: int = 0,
+    payload: Optional[Dict[str, Any]] = None
+) -> ReviewJob:
+    """
+    将审查任务加入队列（与审查记录在同一事务中提交）
+
+    Args:
+        db: 数据库会话
+        review_id: 审查记录ID
+        contract_id: 合同ID
+        priority: 优先级，数值越大越优先
+        payload: 任务参数
+
+    Returns:
+        任务记录
+    """
+    settings = get_settings()
+    job = ReviewJob(
+        review_id=review_id,
+        contract_id=contract_id,
+        priority=priority,
+        payload=payload or {},
+        status="queued",
+        max_attempts=settings.review_job_max_attempts,
+        available_at=datetime.utcnow()
+    )
+    db.add(job)
+    return job
+
+
+class ReviewJobQueue:
+    """审查任务队列"""
+
+    def __init__(self, session_factory=None):
+        settings = get_settings()
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.lease_duration = timedelta(seconds=settings.review_job_lease_seconds)
+        self.retry_base_seconds = settings.review_job_retry_base_seconds
+        self.retry_max_seconds = settings.review_job_retry_max_seconds
+
+    async def lease(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        领取一个任务
+
+        按优先级从高到低、入队时间从早到晚选择可执行的任务
+        （排队中且已过退避时间，或执行中但租约已过期且未达最大执行次数），
+        通过条件更新抢占，多个 Worker 并发领取时只有一个会成功。
+
+        Args:
+            worker_id: Worker 标识
+
+        Returns:
+            任务信息，队列为空时返回 None
+        """
+        for _ in range(5):
+            now = datetime.utcnow()
+
+            async with self.session_factory() as session:
+                # 租约过期的任务只在未达最大执行次数时重新领取（已达上限的由 fail_exhausted 标记失败）
+                dispatchable = or_(
+                    and_(ReviewJob.status == "queued", ReviewJob.available_at <= now),
+                    and_(
+                        ReviewJob.status == "running",
+                        ReviewJob.lease_expires_at < now,
+                        ReviewJob.attempts < ReviewJob.max_attempts
+                    )
+                )
+
+                result = await session.execute(
+                    select(ReviewJob.id, ReviewJob.status, ReviewJob.lease_owner)
+                    .where(dispatchable)
+                    .order_by(ReviewJob.priority.desc(), ReviewJob.created_at.asc())
+                    .limit(1)
+                )
+                candidate = result.first()
+                if candidate is None:
+                    return None
+
+                job_id, status, previous_owner = candidate
+                if status == "running":
+                    logger.warning(f"[Job {job_id}] Worker {previous_owner} 租约过期，重新分配")
+
+                claimed = await session.execute(
+                    update(ReviewJob)
+                    .where(ReviewJob.id == job_id)
+                    .where(dispatchable)
+                    .values(
+                        status="running",
+                        lease_owner=worker_id,
+                        lease_expires_at=now + self.lease_duration,
+                        heartbeat_at=now,
+                        attempts=ReviewJob.attempts + 1,
+                        updated_at=now
+                    )
+                )
+                await session.commit()
+
+                if claimed.rowcount != 1:
+                    # 被其他 Worker 抢先领取，重新选择
+                    continue
+
+                job = await session.get(ReviewJob, job_id, populate_existing=True)
+                return {
+                    "id": job.id,
+                    "review_id": job.review_id,
+                    "contract_id": job.contract_id,
+                    "payload": job.payload or {},
+                    "priority": job.priority,
+                    "attempts": job.attempts,
+                    "max_attempts": job.max_attempts
+                }
+
+        return None
+
+    async def heartbeat(self, job_id: str, worker_id: str) -> bool:
+        """
+        续约
+
+        Returns:
+            是否仍持有租约（False 表示任务已被其他 Worker 接管）
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            result = await session.execute(
+                update(ReviewJob)
+                .where(ReviewJob.id == job_id)
+                .where(ReviewJob.lease_owner == worker_id)
+                .where(ReviewJob.status == "running")
+                .values(
+                    lease_expires_at=now + self.lease_duration,
+                    heartbeat_at=now
+                )
+            )
+            await session.commit()
+            return result.rowcount == 1
+
+    async def complete(self, job_id: str, worker_id: str):
+        """标记任务完成"""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(ReviewJob)
+                .where(ReviewJob.id == job_id)
+                .where(ReviewJob.lease_owner == worker_id)
+                .values(
+                    status="completed",
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    completed_at=now,
+                    updated_at=now
+                )
+            )
+            await session.commit()
+
+    async def release(self, job_id: str, worker_id: str):
+        """归还未执行完的任务（Worker 正常停止时调用，不计入执行次数）"""
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            await session.execute(
+                update(ReviewJob)
+                .where(ReviewJob.id == job_id)
+                .where(ReviewJob.lease_owner == worker_id)
+                .where(ReviewJob.status == "running")
+                .values(
+                    status="queued",
+                    attempts=ReviewJob.attempts - 1,
+                    lease_owner=None,
+                    lease_expires_at=None,
+                    available_at=now,
+                    updated_at=now
+                )
+            )
+            await session.commit()
+
+    async def fail_exhausted(self) -> List[Dict[str, str]]:
+        """
+        将租约过期且已达最大执行次数的任务标记为失败
+
+        执行期间 Worker 进程崩溃（如内存不足）的任务没有机会调用 fail，只能等租约过期；
+        每次崩溃都计入执行次数，达到上限后不再重新领取。
+
+        Returns:
+            本次标记失败的任务 [{id, review_id, contract_id, error}]
+        """
+        now = datetime.utcnow()
+        error = "任务执行中断（Worker 异常退出）次数已达上限"
+        exhausted = and_(
+            ReviewJob.status == "running",
+            ReviewJob.lease_expires_at < now,
+            ReviewJob.attempts >= ReviewJob.max_attempts
+        )
+
+        failed = []
+        async with self.session_factory() as session:
+            result = await session.execute(
+                select(ReviewJob.id, ReviewJob.review_id, ReviewJob.contract_id).where(exhausted)
+            )
+            for job_id, review_id, contract_id in result.all():
+                updated = await session.execute(
+                    update(ReviewJob)
+                    .where(ReviewJob.id == job_id)
+                    .where(exhausted)
+                    .values(
+                        status="failed",
+                        last_error=error,
+                        lease_owner=None,
+                        lease_expires_at=None,
+                        completed_at=now,
+                        updated_at=now
+                    )
+                )
+                if updated.rowcount == 1:
+                    logger.error(f"[Job {job_id}] {error}，任务失败")
+                    failed.append({"id": job_id, "review_id": review_id, "contract_id": contract_id, "error": error})
+            await session.commit()
+        return failed
+
+    async def fail(self, job_id: str, worker_id: str, error: str, retryable: bool = True) -> bool:
+        """
+        标记任务执行失败，未达到最大次数时按指数退避重新排队
+
+        Args:
+            job_id: 任务ID
+            worker_id: Worker 标识
+            error: 错误信息
+            retryable: 是否可以重试（False 时直接标记失败）
+
+        Returns:
+            任务是否还会继续执行（重新排队，或租约已被其他 Worker 接管）；
+            False 表示任务最终失败
+        """
+        now = datetime.utcnow()
+        async with self.session_factory() as session:
+            job = await session.get(ReviewJob, job_id)
+            if job is None:
+                return False
+            if job.lease_owner != worker_id:
+                return True
+
+            will_retry = retryable and job.attempts < job.max_attempts
+            if will_retry:
+                delay = min(
+                    self.retry_base_seconds * (2 ** (job.attempts - 1)),
+                    self.retry_max_seconds
+                )
+                job.status = "queued"
+                job.available_at = now + timedelta(seconds=delay)
+                logger.warning(
+                    f"[Job {job_id}] 第 {job.attempts} 次执行失败，{delay:.0f}s 后重试: {error}"
+                )
+            else:
+                job.status = "failed"
+                job.completed_at = now
+                logger.error(
+                    f"[Job {job_id}] 第 {job.attempts} 次执行失败"
+                    f"{'，已达最大执行次数' if retryable else '（不可重试）'}，任务失败: {error}"
+                )
+
+            job.last_error = error
+            job.lease_owner = None
+            job.lease_expires_at = None
+            await session.commit()
+            return will_retry
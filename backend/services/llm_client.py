@@ -0,0 +1,50 @@
+"""
+大模型客户端
+
+进程内共享一个 AsyncOpenAI 客户端，底层 httpx 连接池保持长连接，
+审核服务和撰写服务都通过它调用模型，避免在事件循环中执行阻塞请求。
+"""
+from typing import Optional
+import httpx
+from openai import AsyncOpenAI
+from backend.config import get_settings
+
+_client: Optional[AsyncOpenAI] = None
+
+
+def get_llm_client() -> AsyncOpenAI:
+    """获取进程级共享的异步大模型客户端（首次调用时创建）"""
+    global _client
+
+    if _client is None:
+        settings = get_settings()
+
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.llm_max_connections,
+                max_keepalive_connections=settings.llm_max_keepalive_connections,
+                keepalive_expiry=settings.llm_keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                settings.llm_timeout,
+                connect=settings.llm_connect_timeout,
+            ),
+        )
+
+        _client = AsyncOpenAI(
+            api_key=settings.dashscope_api_key,
+            base_url=settings.dashscope_base_url,
+            http_client=http_client,
+            max_retries=settings.llm_http_retries,
+        )
+
+    return _client
+
+
+async def close_llm_client():
+    """关闭共享客户端，释放连接池（应用关闭时调用）"""
+    global _client
+
+    if _client is not None:
+        await _client.close()
+        _client = None
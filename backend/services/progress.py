@@ -0,0 +1,113 @@
+"""
+审查进度推送
+
+进程内的发布/订阅：审查流程在各阶段发布进度事件，SSE 连接订阅对应审查的事件。
+每个订阅者一个队列，发布时扇出到所有队列，等待中的客户端不产生数据库查询。
+每个审查保留最近一条事件，新订阅者连接后立即收到当前进度。
+
+事件只在当前进程内传递：独立部署 Worker 时，API 进程收不到 Worker 发布的事件，
+SSE 接口会改为低频查询审查状态（见 routers/reviews.py）。
+"""
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 终止事件：审查完成或最终失败
+TERMINAL_EVENTS = ("completed", "failed")
+
+# 各阶段对应的大致进度百分比
+STAGE_PERCENT = {
+    "queued": 0,
+    "started": 5,
+    "parsed": 10,
+    "located": 85,
+    "comments_written": 92,
+    "report_saved": 97,
+    "completed": 100,
+}
+
+
+class ReviewProgressBroker:
+    """审查进度发布/订阅（单事件循环内使用）"""
+
+    def __init__(self, max_tracked: int = 10000):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        # 每个审查的最近一条事件（按发布顺序淘汰最旧的记录）
+        self._latest: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self.max_tracked = max_tracked
+
+    def publish(self, review_id: str, event: str, data: Dict[str, Any]):
+        """
+        发布事件
+
+        Args:
+            review_id: 审查ID
+            event: 事件类型（progress/completed/failed）
+            data: 事件数据
+        """
+        payload = {"review_id": review_id, **data}
+
+        self._latest[review_id] = (event, payload)
+        self._latest.move_to_end(review_id)
+        while len(self._latest) > self.max_tracked:
+            self._latest.popitem(last=False)
+
+        for queue in self._subscribers.get(review_id, ()):
+            queue.put_nowait((event, payload))
+
+    def subscribe(self, review_id: str) -> asyncio.Queue:
+        """
+        订阅审查事件（已有进度时先放入最近一条事件）
+
+        Returns:
+            事件队列，元素为 (事件类型, 数据)
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        latest = self._latest.get(review_id)
+        if latest:
+            queue.put_nowait(latest)
+
+        self._subscribers.setdefault(review_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, review_id: str, queue: asyncio.Queue):
+        """取消订阅"""
+        subscribers = self._subscribers.get(review_id)
+        if not subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[review_id]
+
+    def latest(self, review_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """获取审查最近一条事件"""
+        return self._latest.get(review_id)
+
+    def subscriber_count(self, review_id: Optional[str] = None) -> int:
+        """当前订阅数（不指定审查时为全部）"""
+        if review_id is not None:
+            return len(self._subscribers.get(review_id, ()))
+        return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+progress_broker = ReviewProgressBroker()
+
+
+def report_progress(review_id: str, stage: str, percent: Optional[int] = None, **data):
+    """
+    发布审查阶段进度
+
+    Args:
+        review_id: 审查ID
+        stage: 阶段名称
+        percent: 进度百分比（默认按阶段取值）
+        **data: 附加数据
+    """
+    if percent is None:
+        percent = STAGE_PERCENT.get(stage, 0)
+
+    event = stage if stage in TERMINAL_EVENTS else "progress"
+    progress_broker.publish(review_id, event, {"stage": stage, "percent": percent, **data})
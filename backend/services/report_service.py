@@ -0,0 +1,217 @@
+"""
+审查结果文件（带批注文档和审查报告）
+
+审查完成时只保存问题和定位结果，带批注的文档和各格式报告在首次下载时生成（eager_artifacts
+开启时由审查流程在完成前生成），生成后保存到合同的存储目录，之后的下载直接返回该文件。
+审查完成后结果不再变化，文件按 审查ID + 版本 + 格式 区分；写批注或报告的逻辑变化时增加对应版本，
+旧版本文件不再使用。
+
+- 带批注文档和 Word 报告在进程池中生成，同一文件同时被多次请求时只生成一次，其余请求等待该次结果
+- 文本格式报告边渲染边输出到响应，同时写入缓存文件，写完后改名为正式文件（中途断开时丢弃）；
+  文本渲染只读取内存中的问题列表，同时到达的请求各自输出，不合并
+"""
+import asyncio
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+import aiofiles
+from backend.models.review import ReviewRecord
+from backend.utils import document_tasks, report_renderer
+from backend.utils.executor import run_cpu
+from backend.utils.file_utils import FileManager
+
+logger = logging.getLogger(__name__)
+
+# 带批注文档的版本（缓存文件名的一部分）
+REVIEWED_DOCUMENT_VERSION = 1
+
+# 正在生成的文件路径 -> 生成任务
+_building: Dict[str, asyncio.Task] = {}
+
+
+def report_cache_path(file_manager: FileManager, contract_id: str, review_id: str, fmt: str) -> Path:
+    """报告缓存文件路径"""
+    extension = report_renderer.REPORT_FORMATS[fmt][1]
+    return file_manager.get_storage_path(
+        contract_id,
+        f"report_{review_id}_v{report_renderer.REPORT_VERSION}.{extension}"
+    )
+
+
+def reviewed_document_path(file_manager: FileManager, contract_id: str, review_id: str) -> Path:
+    """带批注文档的缓存文件路径"""
+    return file_manager.get_storage_path(
+        contract_id,
+        f"reviewed_{review_id}_v{REVIEWED_DOCUMENT_VERSION}.docx"
+    )
+
+
+def issues_with_locations(review: ReviewRecord) -> List[Dict[str, Any]]:
+    """审查记录中的问题和定位结果（同 document_tasks.locate_issues 的返回格式）"""
+    locations = review.issue_locations or []
+    return [
+        {
+            "issue": issue,
+            "location": locations[i] if i < len(locations) else None,
+            "located": i < len(locations) and locations[i] is not None
+        }
+        for i, issue in enumerate(review.issues or [])
+    ]
+
+
+def build_review_report(review: ReviewRecord, title: str = ""):
+    """审查记录的报告结构"""
+    return report_renderer.build_report(
+        review.issues or [],
+        review.issue_locations or [],
+        summary=review.summary or "",
+        title=title,
+        review_id=review.id,
+        completed_at=review.completed_at
+    )
+
+
+async def build_once(path: Path, build: Callable[[str], Awaitable[Any]]) -> Path:
+    """
+    生成文件（已存在时直接返回，正在生成时等待该次生成）
+
+    Args:
+        path: 文件路径
+        build: 生成函数，参数为临时文件路径，完成后临时文件改名为 path
+
+    Returns:
+        文件路径
+
+    Raises:
+        生成函数抛出的异常（所有等待的请求都会收到）
+    """
+    if path.exists():
+        return path
+
+    key = str(path)
+    task = _building.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_build_file(path, build))
+        _building[key] = task
+        task.add_done_callback(lambda done: _build_finished(key, done))
+    else:
+        logger.info(f"等待正在生成的文件: {path.name}")
+
+    # 请求被取消（客户端断开）时不取消生成任务，其他请求仍在等待
+    await asyncio.shield(task)
+    return path
+
+
+async def _build_file(path: Path, build: Callable[[str], Awaitable[Any]]):
+    """生成到临时文件后改名，中途失败时不留下不完整的文件"""
+    partial_path = path.with_name(f"{path.name}.{uuid.uuid4().hex[:8]}.part")
+    try:
+        await build(str(partial_path))
+        os.replace(partial_path, path)
+    finally:
+        if partial_path.exists():
+            partial_path.unlink()
+
+
+def _build_finished(key: str, task: asyncio.Task):
+    """生成任务结束后移除登记（并取出异常，避免无人等待时记录未处理异常）"""
+    if _building.get(key) is task:
+        del _building[key]
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"生成文件失败: {os.path.basename(key)}: {task.exception()}")
+
+
+async def get_reviewed_document(
+    file_manager: FileManager,
+    review_id: str,
+    contract_id: str,
+    file_path: str,
+    parsed_doc: Optional[Dict[str, Any]],
+    issues_with_location: List[Dict[str, Any]],
+    summary: str = ""
+) -> Path:
+    """
+    获取带批注的文档（不存在时生成）
+
+    Args:
+        file_manager: 文件管理器
+        review_id: 审查ID
+        contract_id: 合同ID
+        file_path: 原始文件路径
+        parsed_doc: 原始文件的解析结果（可选）
+        issues_with_location: 问题和定位结果
+        summary: 审查摘要
+
+    Returns:
+        文件路径
+    """
+    async def build(output_path: str):
+        written = await run_cpu(
+            document_tasks.write_reviewed_document,
+            file_path,
+            parsed_doc,
+            issues_with_location,
+            output_path,
+            summary
+        )
+        logger.info(f"[Review {review_id}] 生成带批注文档，写入 {written['comments']} 条批注")
+
+    return await build_once(reviewed_document_path(file_manager, contract_id, review_id), build)
+
+
+async def get_docx_report(file_manager: FileManager, review: ReviewRecord, report: Dict[str, Any]) -> Path:
+    """获取 Word 报告（不存在时生成）"""
+    async def build(output_path: str):
+        content = await run_cpu(report_renderer.render_docx, report)
+        async with aiofiles.open(output_path, "wb") as f:
+            await f.write(content)
+
+    return await build_once(report_cache_path(file_manager, review.contract_id, review.id, "docx"), build)
+
+
+async def save_report(
+    file_manager: FileManager,
+    contract_id: str,
+    review_id: str,
+    report: Dict[str, Any],
+    fmt: str = "txt"
+) -> Path:
+    """
+    一次生成文本格式报告并保存（审查流程预先生成报告时使用）
+
+    Returns:
+        文件路径
+    """
+    async def build(output_path: str):
+        async with aiofiles.open(output_path, "wb") as f:
+            await f.write(report_renderer.render_report(report, fmt))
+
+    return await build_once(report_cache_path(file_manager, contract_id, review_id, fmt), build)
+
+
+async def stream_and_cache(chunks: Iterator[str], cache_path: Path) -> AsyncIterator[bytes]:
+    """
+    输出渲染结果并写入缓存文件
+
+    Args:
+        chunks: 渲染函数生成的文本片段
+        cache_path: 缓存文件路径
+
+    Yields:
+        UTF-8 编码的片段
+    """
+    partial_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex[:8]}.part")
+    completed = False
+    try:
+        async with aiofiles.open(partial_path, "wb") as f:
+            for chunk in chunks:
+                data = chunk.encode("utf-8")
+                await f.write(data)
+                yield data
+        os.replace(partial_path, cache_path)
+        completed = True
+    finally:
+        if not completed and partial_path.exists():
+            partial_path.unlink()
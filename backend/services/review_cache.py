@@ -0,0 +1,155 @@
+"""
+审核结果缓存服务
+
+以 模型名 + Prompt 版本 + 规范化文本 的哈希为键持久化 AI 审核结果，
+整份合同和单个分段分别缓存，相同合同或未修改的分段可直接复用结果。
+"""
+import hashlib
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Any, Optional
+from sqlalchemy import select, delete, func
+from backend.config import get_settings
+from backend.database import AsyncSessionLocal
+from backend.models.review import ReviewCacheEntry
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """规范化文本：合并连续空白，去除首尾空白"""
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+class ReviewCache:
+    """审核结果缓存"""
+
+    # 进程内命中统计（所有实例共享）
+    stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "errors": 0}
+
+    def __init__(self, session_factory=None):
+        settings = get_settings()
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.model = settings.dashscope_model
+        self.ttl = timedelta(hours=settings.review_cache_ttl_hours)
+        self.max_entries = settings.review_cache_max_entries
+
+    def make_key(self, text: str, prompt_version: str) -> str:
+        """生成缓存键"""
+        raw = f"{self.model}\n{prompt_version}\n{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, text: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+
+        Args:
+            text: 审核文本（整份合同或单个分段）
+            prompt_version: Prompt 模板版本
+
+        Returns:
+            缓存的 AI 审核结果，未命中或已过期时返回 None
+        """
+        key = self.make_key(text, prompt_version)
+
+        try:
+            async with self.session_factory() as session:
+                entry = await session.get(ReviewCacheEntry, key)
+
+                if entry is None or entry.created_at < datetime.utcnow() - self.ttl:
+                    ReviewCache.stats["misses"] += 1
+                    return None
+
+                entry.hit_count = (entry.hit_count or 0) + 1
+                entry.last_accessed_at = datetime.utcnow()
+                result = entry.result
+                await session.commit()
+
+        except Exception as e:
+            # 缓存故障不影响审核，按未命中处理
+            logger.warning(f"审核缓存读取失败: {e}")
+            ReviewCache.stats["errors"] += 1
+            ReviewCache.stats["misses"] += 1
+            return None
+
+        ReviewCache.stats["hits"] += 1
+        return result
+
+    async def set(self, text: str, prompt_version: str, kind: str, result: Dict[str, Any]):
+        """
+        写入缓存
+
+        Args:
+            text: 审核文本
+            prompt_version: Prompt 模板版本
+            kind: 缓存类别（contract/section）
+            result: AI 审核结果
+        """
+        key = self.make_key(text, prompt_version)
+
+        try:
+            async with self.session_factory() as session:
+                entry = await session.get(ReviewCacheEntry, key)
+                now = datetime.utcnow()
+
+                if entry is None:
+                    session.add(ReviewCacheEntry(
+                        key=key,
+                        kind=kind,
+                        model=self.model,
+                        prompt_version=prompt_version,
+                        result=result,
+                        created_at=now,
+                        last_accessed_at=now
+                    ))
+                else:
+                    entry.result = result
+                    entry.created_at = now
+                    entry.last_accessed_at = now
+
+                await session.commit()
+                ReviewCache.stats["writes"] += 1
+
+                await self._evict(session)
+
+        except Exception as e:
+            logger.warning(f"审核缓存写入失败: {e}")
+            ReviewCache.stats["errors"] += 1
+
+    async def _evict(self, session):
+        """淘汰过期条目，并在超出容量时淘汰最久未访问的条目"""
+        evicted = 0
+
+        expired = await session.execute(
+            delete(ReviewCacheEntry)
+            .where(ReviewCacheEntry.created_at < datetime.utcnow() - self.ttl)
+        )
+        evicted += expired.rowcount or 0
+
+        total = await session.scalar(select(func.count()).select_from(ReviewCacheEntry))
+        overflow = (total or 0) - self.max_entries
+
+        if overflow > 0:
+            oldest_keys = select(ReviewCacheEntry.key).order_by(
+                ReviewCacheEntry.last_accessed_at.asc()
+            ).limit(overflow)
+            overflowed = await session.execute(
+                delete(ReviewCacheEntry).where(ReviewCacheEntry.key.in_(oldest_keys))
+            )
+            evicted += overflowed.rowcount or 0
+
+        if evicted:
+            await session.commit()
+            ReviewCache.stats["evictions"] += evicted
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, Any]:
+        """获取命中统计"""
+        lookups = cls.stats["hits"] + cls.stats["misses"]
+        return {
+            **cls.stats,
+            "hit_rate": round(cls.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
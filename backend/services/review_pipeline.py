@@ -0,0 +1,251 @@
+"""
+审查流程
+
+审查任务的完整处理流程：解析 → AI 审核 → 定位 → 写回结果（带批注文档和报告默认在首次下载时生成）。
+由审查任务 Worker 调用，不依赖请求上下文：流程自行管理数据库会话，
+AI 调用和文档处理期间不持有会话，只在读取输入和写回结果时开启短事务。
+各阶段通过 report_progress 发布进度事件，供 SSE 接口推送给客户端。
+解析和定位在共享进程池中执行（见 utils/executor.py），不阻塞事件循环。
+"""
+import logging
+from datetime import datetime
+from sqlalchemy import select, update
+from backend.config import get_settings
+from backend.database import AsyncSessionLocal
+from backend.models.review import Contract, ReviewRecord
+from backend.services import report_service
+from backend.services.progress import report_progress
+from backend.services.review_service import AIReviewer
+from backend.utils import document_tasks, report_renderer
+from backend.utils.document_parser import DocumentParser
+from backend.utils.executor import run_cpu
+from backend.utils.file_utils import FileManager
+
+logger = logging.getLogger(__name__)
+
+file_manager = FileManager()
+
+
+class ReviewProcessingError(Exception):
+    """审查处理失败（可重试）"""
+    pass
+
+
+class ReviewAbortedError(Exception):
+    """审查无法执行（如合同已删除），重试也不会成功"""
+    pass
+
+
+async def process_review(
+    review_id: str,
+    contract_id: str,
+    incremental: bool = True,
+    session_factory=None
+):
+    """
+    处理审查任务
+
+    Args:
+        review_id: 审查记录ID
+        contract_id: 合同ID
+        incremental: 是否增量审核（复用上次审核中未修改分段的结果）
+        session_factory: 会话工厂（默认 AsyncSessionLocal）
+
+    Raises:
+        ReviewProcessingError: 审核失败，由调用方决定重试或标记失败
+        ReviewAbortedError: 审查无法执行，调用方应直接标记失败
+    """
+    session_factory = session_factory or AsyncSessionLocal
+    logger.info(f"[Review {review_id}] 开始处理审查任务")
+    report_progress(review_id, "started")
+
+    # 1. 读取输入并标记合同为审核中（短事务，提交后即释放连接）
+    async with session_factory() as db:
+        result = await db.execute(
+            select(Contract.file_path, Contract.parsed_document)
+            .where(Contract.id == contract_id)
+        )
+        contract_row = result.first()
+        if not contract_row:
+            raise ReviewAbortedError("合同不存在")
+
+        file_path, parsed_doc = contract_row
+
+        # 增量审核：取该合同最近一次完成的审查记录的分段结果
+        previous_sections = None
+        if incremental:
+            previous_result = await db.execute(
+                select(ReviewRecord.sections)
+                .where(ReviewRecord.contract_id == contract_id)
+                .where(ReviewRecord.status == "completed")
+                .where(ReviewRecord.id != review_id)
+                .order_by(ReviewRecord.completed_at.desc())
+                .limit(1)
+            )
+            previous_sections = previous_result.scalar_one_or_none() or None
+
+        await db.execute(
+            update(Contract)
+            .where(Contract.id == contract_id)
+            .values(status="reviewing")
+        )
+        await db.commit()
+
+    # 创建 AI 审核器
+    reviewer = AIReviewer()
+
+    # 解析结果缺失或版本过期时重新解析一次，并回写到合同记录
+    if not DocumentParser.is_current(parsed_doc):
+        parsed_doc = await run_cpu(document_tasks.parse_document, file_path)
+        async with session_factory() as db:
+            await db.execute(
+                update(Contract)
+                .where(Contract.id == contract_id)
+                .values(parsed_document=parsed_doc)
+            )
+            await db.commit()
+
+    report_progress(
+        review_id,
+        "parsed",
+        total_paragraphs=parsed_doc.get("total_paragraphs", 0),
+        total_tokens=parsed_doc.get("total_tokens", 0)
+    )
+
+    def on_section_reviewed(progress: dict):
+        # 分段审核占 10% ~ 80% 的进度
+        percent = 10 + int(70 * progress["completed"] / max(progress["total"], 1))
+        report_progress(review_id, "section_reviewed", percent=percent, **progress)
+
+    # 执行审核
+    logger.info(f"[Review {review_id}] 调用AI审核服务")
+    review_result = await reviewer.review_contract(
+        file_path,
+        previous_sections,
+        parsed_doc,
+        on_progress=on_section_reviewed
+    )
+    logger.info(f"[Review {review_id}] AI审核结果: success={review_result.get('success')}, "
+               f"issues={len(review_result.get('issues', []))}")
+
+    if not review_result.get("success"):
+        raise ReviewProcessingError(review_result.get("error", "未知错误"))
+
+    # 定位问题位置
+    issues = review_result.get("issues", [])
+    issues_with_location = await run_cpu(
+        document_tasks.locate_issues,
+        file_path,
+        issues,
+        review_result.get("location_hints"),
+        parsed_doc
+    )
+    section_records = reviewer.build_section_records(review_result, issues_with_location)
+    report_progress(
+        review_id,
+        "located",
+        issues=len(issues),
+        located=sum(1 for item in issues_with_location if item["located"])
+    )
+
+    # 带批注的文档和审查报告默认在首次下载时生成（见 report_service），配置为预先生成时在此生成
+    reviewed_file_path = report_path = None
+    if get_settings().eager_artifacts:
+        reviewed_file_path = await report_service.get_reviewed_document(
+            file_manager,
+            review_id,
+            contract_id,
+            file_path,
+            parsed_doc,
+            issues_with_location,
+            review_result.get("summary", "")
+        )
+        report_progress(review_id, "comments_written")
+
+        report = report_renderer.build_report(
+            issues,
+            [item["location"] for item in issues_with_location],
+            summary=review_result.get("summary", ""),
+            review_id=review_id
+        )
+        report_path = await report_service.save_report(file_manager, contract_id, review_id, report)
+        report_progress(review_id, "report_saved")
+
+    # 2. 写回结果（审查记录和合同状态在同一个短事务中提交）
+    async with session_factory() as db:
+        await db.execute(
+            update(ReviewRecord)
+            .where(ReviewRecord.id == review_id)
+            .values(
+                status="completed",
+                issues=issues,
+                issue_locations=[item["location"] for item in issues_with_location],
+                sections=section_records,
+                summary=review_result.get("summary", ""),
+                high_risk_count=review_result.get("high_risk_count", 0),
+                medium_risk_count=review_result.get("medium_risk_count", 0),
+                low_risk_count=review_result.get("low_risk_count", 0),
+                reviewed_file_path=str(reviewed_file_path) if reviewed_file_path else None,
+                report_path=str(report_path) if report_path else None,
+                error_message=None,
+                completed_at=datetime.utcnow()
+            )
+        )
+
+        # 更新合同状态
+        await db.execute(
+            update(Contract)
+            .where(Contract.id == contract_id)
+            .values(status="completed")
+        )
+
+        await db.commit()
+
+    logger.info(f"[Review {review_id}] 审查完成")
+    report_progress(
+        review_id,
+        "completed",
+        total_issues=len(issues),
+        high_risk_count=review_result.get("high_risk_count", 0),
+        medium_risk_count=review_result.get("medium_risk_count", 0),
+        low_risk_count=review_result.get("low_risk_count", 0)
+    )
+
+
+async def mark_review_failed(review_id: str, error_message: str, session_factory=None):
+    """
+    将审查记录标记为失败，并恢复合同状态（与审查记录在同一事务中更新）
+
+    Args:
+        review_id: 审查记录ID
+        error_message: 错误信息
+        session_factory: 会话工厂（默认 AsyncSessionLocal）
+    """
+    async with (session_factory or AsyncSessionLocal)() as db:
+        await db.execute(
+            update(ReviewRecord)
+            .where(ReviewRecord.id == review_id)
+            .values(status="failed", error_message=error_message)
+        )
+
+        # 合同不再停留在审核中：有已完成的审查时恢复为已完成，否则恢复为待审核
+        contract_id = (await db.execute(
+            select(ReviewRecord.contract_id).where(ReviewRecord.id == review_id)
+        )).scalar_one_or_none()
+        if contract_id is not None:
+            has_completed = (await db.execute(
+                select(ReviewRecord.id)
+                .where(ReviewRecord.contract_id == contract_id)
+                .where(ReviewRecord.status == "completed")
+                .limit(1)
+            )).first() is not None
+            await db.execute(
+                update(Contract)
+                .where(Contract.id == contract_id)
+                .where(Contract.status == "reviewing")
+                .values(status="completed" if has_completed else "pending")
+            )
+
+        await db.commit()
+
+    report_progress(review_id, "failed", error_message=error_message)
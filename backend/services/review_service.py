@@ -1,62 +1,119 @@
 """
 AI 审核服务
 """
+import asyncio
+import hashlib
 import json
-from typing import Dict, List, Any
-from openai import OpenAI
+import logging
+import time
+from typing import Callable, Dict, List, Any, Optional
 from backend.config import get_settings
+from backend.services.llm_client import get_llm_client
+from backend.services.review_cache import ReviewCache, normalize_text
 from backend.utils.prompts import (
+    CONTRACT_REVIEW_PROMPT,
+    SECTION_REVIEW_PROMPT,
+    SECTION_CONTEXT_PROMPT,
+    get_prompt_version,
+    get_review_system_prompt,
     build_contract_review_prompt,
     build_section_review_prompt,
     build_retry_prompt
 )
 from backend.utils.document_parser import DocumentParser
-from backend.utils.location_matcher import LocationMatcher
+from backend.utils.document_tasks import locate_issues
 from backend.schemas.review import ReviewResult, IssueInfo
 
+logger = logging.getLogger(__name__)
+
 
 class AIReviewer:
     """AI 审核器"""
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
         settings = get_settings()
-        self.client = OpenAI(
-            api_key=settings.dashscope_api_key,
-            base_url=settings.dashscope_base_url
-        )
+        self.client = get_llm_client()
         self.model = settings.dashscope_model
         self.max_retries = settings.max_retries
         self.max_tokens = settings.max_tokens_per_section
+        self.overlap_tokens = max(0, settings.section_overlap_tokens)
+        self.max_concurrent_sections = max(1, settings.max_concurrent_sections)
+
+        # 审核说明（所有审核请求相同的系统消息）
+        self.system_prompt = get_review_system_prompt(settings.review_prompt_style)
+
+        # 审核结果缓存
+        self.cache: Optional[ReviewCache] = (
+            ReviewCache() if use_cache and settings.review_cache_enabled else None
+        )
 
         # 初始化文档解析器
         self.parser = DocumentParser()
-
-    def review_contract(self, file_path: str) -> Dict[str, Any]:
+        self.prefix_tokens = self.parser.tokenizer.count(self.system_prompt)
+
+    async def review_contract(
+        self,
+        file_path: str,
+        previous_sections: Optional[List[Dict]] = None,
+        parsed_doc: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
         """
         审核合同（主入口）
 
         Args:
             file_path: 合同文件路径
+            previous_sections: 上一次审核的分段记录（增量审核时提供），
+                内容未变化的分段直接复用上次的问题，不再调用 AI
+            parsed_doc: 上传时生成的解析结果（可选，提供时不再重复解析）
+            on_progress: 分段进度回调，每完成一个分段调用一次，
+                参数为 {completed, total, section_number, reused, cached}
 
         Returns:
             审核结果字典
         """
         # 1. 解析文档
-        parsed_doc = self.parser.parse_document(file_path)
+        parsed_doc = self.parser.load_or_parse(file_path, parsed_doc)
 
         # 2. 判断是否需要分段
         if self.parser.should_split(parsed_doc, self.max_tokens):
             # 分段审核
-            sections = self.parser.split_by_sections(parsed_doc, self.max_tokens)
-            return self._review_sections(sections)
-        else:
-            # 一次性审核
-            return self._review_single(parsed_doc["full_text"])
-
-    def _review_single(self, contract_text: str) -> Dict[str, Any]:
+            sections = self.parser.split_by_sections(parsed_doc, self.max_tokens, self.overlap_tokens)
+            return await self._review_sections(sections, previous_sections, on_progress)
+
+        # 一次性审核（整份合同视为一个分段，便于增量复用）
+        whole_section = {
+            "section_number": 1,
+            "text": parsed_doc["full_text"],
+            "paragraphs": parsed_doc["paragraphs"]
+        }
+        previous = self._match_previous_sections([whole_section], previous_sections)[0]
+        if previous is not None:
+            result = self._combine_section_results([self._reuse_section(whole_section, previous)])
+            _notify(on_progress, completed=1, total=1, section_number=1, reused=True, cached=False)
+            return result
+
+        result = await self._review_single(parsed_doc["full_text"])
+        if result.get("success"):
+            result["sections"] = [
+                self._section_meta(whole_section, result["total_issues"], reused=False)
+            ]
+            result["location_hints"] = [None] * result["total_issues"]
+            _notify(on_progress, completed=1, total=1, section_number=1, reused=False, cached=False)
+        return result
+
+    async def _review_single(self, contract_text: str) -> Dict[str, Any]:
         """单次审核"""
-        prompt = build_contract_review_prompt(contract_text)
-        ai_result = self._call_ai_with_retry(prompt)
+        prompt_version = get_prompt_version(self.system_prompt + CONTRACT_REVIEW_PROMPT)
+        ai_result = await self._get_cached(contract_text, prompt_version)
+        usage: Dict[str, int] = {}
+        estimated_tokens = None
+
+        if ai_result is None:
+            prompt = build_contract_review_prompt(contract_text)
+            estimated_tokens = self.parser.tokenizer.count_prompt(self._full_prompt(prompt))
+            ai_result = await self._call_ai_with_retry(prompt, usage=usage)
+            await self._set_cached(contract_text, prompt_version, "contract", ai_result)
 
         if "error" in ai_result:
             return {
@@ -67,40 +124,362 @@ class AIReviewer:
             }
 
         # 转换为标准格式
-        return self._parse_ai_result(ai_result)
+        result = self._parse_ai_result(ai_result)
+        result["token_usage"] = self._summarize_token_usage([self._usage_stats(estimated_tokens, usage)])
+        return result
+
+    async def _review_sections(
+        self,
+        sections: List[Dict],
+        previous_sections: Optional[List[Dict]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        分段审核（并发执行）
+
+        所有分段同时派发，由信号量限制同时进行的 AI 请求数，
+        结果按分段顺序合并，总耗时取决于最慢的分段而非各分段之和。
+        与上次审核内容相同的分段直接复用上次结果。
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_sections)
+        total = len(sections)
+        started_at = time.perf_counter()
+        previous_matches = self._match_previous_sections(sections, previous_sections)
+        completed = 0
+
+        async def review(section: Dict, previous: Optional[Dict]) -> Dict[str, Any]:
+            nonlocal completed
+            if previous is not None:
+                section_result = self._reuse_section(section, previous)
+            else:
+                section_result = await self._review_one_section(section, total, semaphore)
+
+            # 分段按完成顺序上报进度
+            completed += 1
+            _notify(
+                on_progress,
+                completed=completed,
+                total=total,
+                section_number=section["section_number"],
+                reused=section_result["stats"].get("reused", False),
+                cached=section_result["stats"].get("cached", False)
+            )
+            return section_result
+
+        section_results = await asyncio.gather(*[
+            review(section, previous)
+            for section, previous in zip(sections, previous_matches)
+        ])
+
+        # gather 按传入顺序返回，保证合并结果与分段顺序一致
+        result = self._combine_section_results(section_results)
+        result["elapsed_seconds"] = round(time.perf_counter() - started_at, 3)
+
+        failed = sum(1 for r in section_results if not r["stats"]["success"])
+        reused = sum(1 for r in section_results if r["stats"].get("reused"))
+        token_usage = result["token_usage"]
+        logger.info(
+            f"分段审核完成: {total} 个分段, 复用 {reused} 个, 失败 {failed} 个, "
+            f"并发上限 {self.max_concurrent_sections}, 耗时 {result['elapsed_seconds']}s, "
+            f"Prompt Token 估算 {token_usage['estimated_prompt_tokens']} / 实际 {token_usage['prompt_tokens']}"
+            f"（误差 {token_usage['estimate_error']}，命中缓存 {token_usage['cached_prompt_tokens']}）"
+        )
+        return result
 
-    def _review_sections(self, sections: List[Dict]) -> Dict[str, Any]:
-        """分段审核"""
+    def _combine_section_results(self, section_results: List[Dict]) -> Dict[str, Any]:
+        """按分段顺序合并各分段结果"""
         all_issues = []
+        location_hints = []
+        for section_result in section_results:
+            all_issues.extend(section_result["issues"])
+            location_hints.extend(section_result["location_hints"])
+
+        # 合并结果
+        result = self._merge_issues(all_issues)
+        result["section_stats"] = [r["stats"] for r in section_results]
+        result["token_usage"] = self._summarize_token_usage(result["section_stats"])
+        result["sections"] = [r["section"] for r in section_results]
+        result["location_hints"] = location_hints
+
+        # 有分段审核失败时整体视为失败（由调用方重试，已成功的分段命中审核缓存，不会重复调用 AI）
+        failed = [r["stats"] for r in section_results if not r["stats"]["success"]]
+        if failed:
+            result["success"] = False
+            result["failed_sections"] = [stats["section_number"] for stats in failed]
+            result["error"] = (
+                f"{len(failed)}/{len(section_results)} 个分段审核失败"
+                f"（分段 {', '.join(str(n) for n in result['failed_sections'])}）: {failed[0].get('error')}"
+            )
+        return result
+
+    def _full_prompt(self, prompt: str) -> str:
+        """一次调用发送的全部文本（审核说明 + 用户消息），用于估算和校准 Token 数"""
+        return f"{self.system_prompt}\n{prompt}"
+
+    @staticmethod
+    def _format_usage(estimated_tokens: Optional[int], usage: Dict[str, int]) -> str:
+        """单次调用的 Token 用量（日志用，没有调用接口时为空）"""
+        if estimated_tokens is None:
+            return ""
+        text = f", Prompt Token 估算 {estimated_tokens} / 实际 {usage.get('prompt_tokens')}"
+        if usage.get("cached_tokens") is not None:
+            text += f"（命中缓存 {usage['cached_tokens']}）"
+        return text
+
+    @staticmethod
+    def _usage_stats(estimated_tokens: Optional[int], usage: Dict[str, int]) -> Dict[str, Any]:
+        """单次调用的 Token 估算与接口返回的实际用量"""
+        return {
+            "estimated_tokens": estimated_tokens,
+            "prompt_tokens": usage.get("prompt_tokens"),
+            "cached_tokens": usage.get("cached_tokens"),
+            "completion_tokens": usage.get("completion_tokens")
+        }
+
+    def _summarize_token_usage(self, stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        汇总 Token 用量，并计算估算值相对实际用量的误差
+
+        只统计接口返回了用量的调用（缓存命中和复用的分段没有实际用量）。
+        estimate_error = (估算 - 实际) / 实际，正数表示高估。
+        cached_prompt_tokens 为命中模型服务端上下文缓存的部分，prefix_tokens 为每次调用相同的审核说明的估算 Token 数。
+        """
+        measured = [
+            item for item in stats
+            if item.get("prompt_tokens") is not None and item.get("estimated_tokens") is not None
+        ]
+        estimated = sum(item["estimated_tokens"] for item in measured)
+        actual = sum(item["prompt_tokens"] for item in measured)
 
+        return {
+            "calls": len(measured),
+            "estimated_prompt_tokens": estimated,
+            "prompt_tokens": actual,
+            "cached_prompt_tokens": sum(item.get("cached_tokens") or 0 for item in measured),
+            "completion_tokens": sum(item.get("completion_tokens") or 0 for item in measured),
+            "estimate_error": round((estimated - actual) / actual, 4) if actual else None,
+            "prefix_tokens": self.prefix_tokens
+        }
+
+    def _section_digest(self, text: str) -> str:
+        """计算分段内容摘要（用于识别未修改的分段）"""
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _section_meta(self, section: Dict, issue_count: int, reused: bool) -> Dict[str, Any]:
+        """生成分段元信息"""
+        paragraphs = section.get("paragraphs") or []
+        return {
+            "section_number": section["section_number"],
+            "digest": self._section_digest(section["text"]),
+            "start_index": paragraphs[0]["index"] if paragraphs else 0,
+            "end_index": paragraphs[-1]["index"] if paragraphs else 0,
+            "issue_count": issue_count,
+            "reused": reused
+        }
+
+    def _match_previous_sections(
+        self,
+        sections: List[Dict],
+        previous_sections: Optional[List[Dict]]
+    ) -> List[Optional[Dict]]:
+        """为每个新分段查找内容相同的历史分段，未找到时为 None"""
+        if not previous_sections:
+            return [None] * len(sections)
+
+        candidates: Dict[str, List[Dict]] = {}
+        for previous in previous_sections:
+            candidates.setdefault(previous["digest"], []).append(previous)
+
+        matches = []
         for section in sections:
+            same_digest = candidates.get(self._section_digest(section["text"]))
+            matches.append(same_digest.pop(0) if same_digest else None)
+        return matches
+
+    def _reuse_section(self, section: Dict, previous: Dict) -> Dict[str, Any]:
+        """复用历史分段的审核结果，按段落偏移重新定位问题"""
+        meta = self._section_meta(section, len(previous["issues"]), reused=True)
+        location_hints = [
+            meta["start_index"] + offset if offset is not None else None
+            for offset in previous.get("issue_offsets", [None] * len(previous["issues"]))
+        ]
+
+        return {
+            "issues": previous["issues"],
+            "location_hints": location_hints,
+            "section": meta,
+            "stats": {
+                "section_number": section["section_number"],
+                "success": True,
+                "issue_count": len(previous["issues"]),
+                "cached": False,
+                "reused": True,
+                "elapsed_seconds": 0.0,
+                "error": None,
+                **self._usage_stats(None, {})
+            }
+        }
+
+    def build_section_records(
+        self,
+        review_result: Dict[str, Any],
+        issues_with_location: List[Dict]
+    ) -> List[Dict[str, Any]]:
+        """
+        生成用于持久化的分段记录（供下次增量审核复用）
+
+        Args:
+            review_result: review_contract 的返回结果
+            issues_with_location: locate_issues 的返回结果
+
+        Returns:
+            [{digest, start_index, end_index, issues, issue_offsets}, ...]（不含审核失败的分段）
+        """
+        records = []
+        cursor = 0
+        succeeded = {
+            stats["section_number"]: stats["success"]
+            for stats in review_result.get("section_stats") or []
+        }
+
+        for section in review_result.get("sections", []):
+            count = section["issue_count"]
+            located = issues_with_location[cursor:cursor + count]
+            cursor += count
+
+            # 审核失败的分段不记录，下次审核时重新调用 AI（否则会被当作没有问题的分段复用）
+            if not succeeded.get(section["section_number"], True):
+                continue
+
+            records.append({
+                "digest": section["digest"],
+                "start_index": section["start_index"],
+                "end_index": section["end_index"],
+                "issues": [item["issue"] for item in located],
+                "issue_offsets": [
+                    item["location"]["index"] - section["start_index"]
+                    if item["located"] and item["location"].get("type") == "paragraph" else None
+                    for item in located
+                ]
+            })
+
+        return records
+
+    async def _review_one_section(
+        self,
+        section: Dict,
+        total: int,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, Any]:
+        """审核单个分段，返回问题列表和计时信息"""
+        context = section.get("context", "")
+        if context:
+            # 带前文上下文的结果与上下文相关，缓存键同时包含上下文
+            prompt_version = get_prompt_version(self.system_prompt + SECTION_REVIEW_PROMPT + SECTION_CONTEXT_PROMPT)
+            cache_text = f"{context}\n{section['text']}"
+        else:
+            prompt_version = get_prompt_version(self.system_prompt + SECTION_REVIEW_PROMPT)
+            cache_text = section["text"]
+
+        started_at = time.perf_counter()
+        ai_result = await self._get_cached(cache_text, prompt_version)
+        cached = ai_result is not None
+        usage: Dict[str, int] = {}
+        estimated_tokens = None
+
+        if cached:
+            elapsed = time.perf_counter() - started_at
+        else:
             prompt = build_section_review_prompt(
                 section["text"],
                 section["section_number"],
-                len(sections)
+                total,
+                context
             )
-            ai_result = self._call_ai_with_retry(prompt)
+            estimated_tokens = self.parser.tokenizer.count_prompt(self._full_prompt(prompt))
 
-            if "error" not in ai_result:
-                issues = ai_result.get("issues", [])
-                all_issues.extend(issues)
+            async with semaphore:
+                started_at = time.perf_counter()
+                ai_result = await self._call_ai_with_retry(prompt, usage=usage)
+                elapsed = time.perf_counter() - started_at
 
-        # 合并结果
-        return self._merge_issues(all_issues)
+            await self._set_cached(cache_text, prompt_version, "section", ai_result)
+
+        success = "error" not in ai_result
+        issues = self._validate_issues(ai_result.get("issues", [])) if success else []
 
-    def _call_ai_with_retry(self, prompt: str, retry_count: int = 0) -> Dict[str, Any]:
-        """调用 AI 并带重试机制"""
+        logger.info(
+            f"分段 {section['section_number']}/{total} 审核"
+            f"{'完成' if success else '失败'}: 问题 {len(issues)} 个, 耗时 {elapsed:.2f}s"
+            f"{'（缓存命中）' if cached else ''}"
+            f"{self._format_usage(estimated_tokens, usage)}"
+        )
+
+        return {
+            "issues": issues,
+            "location_hints": [None] * len(issues),
+            "section": self._section_meta(section, len(issues), reused=False),
+            "stats": {
+                "section_number": section["section_number"],
+                "success": success,
+                "issue_count": len(issues),
+                "cached": cached,
+                "reused": False,
+                "elapsed_seconds": round(elapsed, 3),
+                "error": ai_result.get("error") if not success else None,
+                **self._usage_stats(estimated_tokens, usage)
+            }
+        }
+
+    async def _get_cached(self, text: str, prompt_version: str) -> Optional[Dict[str, Any]]:
+        """查询审核缓存"""
+        if self.cache is None:
+            return None
+        return await self.cache.get(text, prompt_version)
+
+    async def _set_cached(self, text: str, prompt_version: str, kind: str, ai_result: Dict[str, Any]):
+        """写入审核缓存（失败结果不缓存）"""
+        if self.cache is None or "error" in ai_result:
+            return
+        await self.cache.set(text, prompt_version, kind, ai_result)
+
+    async def _call_ai_with_retry(
+        self,
+        prompt: str,
+        retry_count: int = 0,
+        usage: Optional[Dict[str, int]] = None
+    ) -> Dict[str, Any]:
+        """
+        调用 AI 并带重试机制
+
+        Args:
+            prompt: Prompt
+            retry_count: 已重试次数
+            usage: 提供时写入最后一次调用的实际 Token 用量（prompt_tokens/completion_tokens）
+        """
         try:
-            response = self.client.chat.completions.create(
+            response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "你是一位专业的合同审核专家。"},
+                    {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"},
                 temperature=0.3,
             )
 
+            if getattr(response, "usage", None) is not None:
+                # 实际用量用于校准 Token 估算
+                self.parser.tokenizer.observe(self._full_prompt(prompt), response.usage.prompt_tokens)
+                if usage is not None:
+                    usage["prompt_tokens"] = response.usage.prompt_tokens
+                    usage["completion_tokens"] = response.usage.completion_tokens
+                    # 命中服务端上下文缓存的 Prompt Token 数（接口未返回时为空）
+                    details = getattr(response.usage, "prompt_tokens_details", None)
+                    cached_tokens = getattr(details, "cached_tokens", None)
+                    if cached_tokens is not None:
+                        usage["cached_tokens"] = cached_tokens
+
             content = response.choices[0].message.content
             return json.loads(content)
 
@@ -108,7 +487,7 @@ class AIReviewer:
             # JSON 解析失败，重试
             if retry_count < self.max_retries:
                 enhanced_prompt = build_retry_prompt(prompt)
-                return self._call_ai_with_retry(enhanced_prompt, retry_count + 1)
+                return await self._call_ai_with_retry(enhanced_prompt, retry_count + 1, usage)
 
             # 重试用尽，返回错误信息
             return {
@@ -159,6 +538,16 @@ class AIReviewer:
             "low_risk_count": low_count
         }
 
+    def _validate_issues(self, issues_data: List[Dict]) -> List[Dict]:
+        """校验问题数据，跳过无效条目"""
+        issues = []
+        for issue_data in issues_data:
+            try:
+                issues.append(IssueInfo(**issue_data).model_dump(mode="json"))
+            except Exception:
+                continue
+        return issues
+
     def _merge_issues(self, all_issues: List[Dict]) -> Dict:
         """合并多个段落的审核结果"""
         issues = []
@@ -197,31 +586,35 @@ class AIReviewer:
             "low_risk_count": low_count
         }
 
-    def locate_issues(self, file_path: str, issues: List[Dict]) -> List[Dict]:
+    def locate_issues(
+        self,
+        file_path: str,
+        issues: List[Dict],
+        location_hints: Optional[List[Optional[int]]] = None,
+        parsed_doc: Optional[Dict[str, Any]] = None
+    ) -> List[Dict]:
         """
         为问题定位位置
 
         Args:
             file_path: 文件路径
             issues: 问题列表
+            location_hints: 与 issues 对应的段落索引提示（增量审核复用的问题），
+                提示段落仍包含原文时直接采用，否则重新匹配
+            parsed_doc: 已有的解析结果（可选）
 
         Returns:
             带位置信息的问题列表
         """
-        # 解析文档
-        parsed_doc = self.parser.parse_document(file_path)
-
-        # 创建位置匹配器
-        matcher = LocationMatcher(parsed_doc)
-
-        # 为每个问题定位
-        issues_with_location = []
-        for issue in issues:
-            location = matcher.locate_issue(issue)
-            issues_with_location.append({
-                "issue": issue,
-                "location": location,
-                "located": location is not None
-            })
-
-        return issues_with_location
+        parsed_doc = self.parser.load_or_parse(file_path, parsed_doc)
+        return locate_issues(file_path, issues, location_hints, parsed_doc)
+
+
+def _notify(on_progress: Optional[Callable[[Dict[str, Any]], None]], **progress):
+    """调用进度回调（回调异常不影响审核）"""
+    if on_progress is None:
+        return
+    try:
+        on_progress(progress)
+    except Exception as e:
+        logger.warning(f"进度回调失败: {e}")
@@ -0,0 +1,397 @@
+"""
+全文检索服务
+
+对合同正文（Contract.content_text）、合同草稿（ContractDraft.final_content）和条款库
+（ContractClause.content）建立倒排索引。SQLite 下使用 FTS5：中文按二元组（bigram）
+切分后写入索引，查询词同样切分为二元组并按短语匹配，结果按 BM25 排序；
+其他数据库退化为 LIKE 查询。
+
+索引在内容写入的同一事务中增量维护（index_document / remove_document），
+启动时若索引为空（包括切分方式变化后新建的索引表）则从现有数据回填一次。
+"""
+import logging
+import re
+import time
+from typing import Dict, Any, List, Optional, Sequence
+from sqlalchemy import select, delete, func, text, or_, null
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import AsyncSessionLocal
+from backend.models.contract_writing import ContractDraft, ContractClause
+from backend.models.review import Contract
+from backend.models.search import SearchDocument, SEARCH_FTS_TABLE, SEARCH_FTS_LEGACY_TABLES
+
+logger = logging.getLogger(__name__)
+
+DOC_TYPES = ("contract", "draft", "clause")
+
+# 中日韩文字按二元组切分，字母数字按单词切分
+_TOKEN_RE = re.compile(r"([\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+)|([0-9A-Za-z]+)")
+
+# 标题在排序中的权重（相对正文）
+_TITLE_WEIGHT = 5.0
+# 摘要窗口（匹配位置前后的字符数）
+_SNIPPET_RADIUS = 40
+# 回填时每批处理的文档数
+_BACKFILL_BATCH = 500
+
+
+def tokenize(text_value: Optional[str], query: bool = False) -> List[str]:
+    """
+    将文本切分为索引词
+
+    中文连续片段切分为重叠二元组，片段末尾再补一个单字（末尾的字只出现在二元组的后半，
+    单字查询按前缀匹配时靠它命中）；单字片段保留单字。字母数字按单词小写。
+
+    Args:
+        text_value: 原始文本
+        query: 是否为查询词。查询词的最后一个中文片段不补单字：查询词的结尾在原文中
+            不一定是片段的结尾，补上会使短语匹配失败
+
+    Returns:
+        索引词列表（保持原文顺序，相邻词在原文中相邻）
+    """
+    tokens = []
+    matches = list(_TOKEN_RE.finditer(text_value or ""))
+    for position, match in enumerate(matches):
+        cjk, word = match.groups()
+        if word:
+            tokens.append(word.lower())
+        elif len(cjk) == 1:
+            tokens.append(cjk)
+        else:
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+            if not (query and position == len(matches) - 1):
+                tokens.append(cjk[-1])
+    return tokens
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    将用户查询转换为 FTS5 MATCH 表达式
+
+    查询按空白拆分为多个词，词之间为 AND 关系；每个词切分为二元组后作为短语匹配，
+    即要求原文中连续出现。以单个汉字结尾的词，最后一个字按前缀匹配（同时命中以它开头的
+    二元组和片段末尾补的单字）。
+
+    Returns:
+        MATCH 表达式，查询中没有可检索的内容时返回 None
+    """
+    phrases = []
+    for term in query.split():
+        tokens = tokenize(term, query=True)
+        if not tokens:
+            continue
+        phrase = '"' + " ".join(tokens) + '"'
+        if len(tokens[-1]) == 1 and not tokens[-1].isascii():
+            phrase += "*"
+        phrases.append(phrase)
+    return " AND ".join(phrases) if phrases else None
+
+
+def make_snippet(content: Optional[str], query: str, radius: int = _SNIPPET_RADIUS) -> str:
+    """
+    从原文生成摘要：截取第一个匹配位置附近的文本，并用 <mark> 标出匹配的查询词
+
+    Args:
+        content: 原文
+        query: 用户查询
+        radius: 匹配位置前后保留的字符数
+
+    Returns:
+        摘要文本
+    """
+    content = re.sub(r"\s+", " ", content or "").strip()
+    terms = sorted({term for term in query.split() if term}, key=len, reverse=True)
+    if not content:
+        return ""
+
+    lowered = content.lower()
+    positions = [lowered.find(term.lower()) for term in terms]
+    positions = [pos for pos in positions if pos >= 0]
+    first = min(positions) if positions else 0
+
+    start = max(0, first - radius)
+    end = min(len(content), first + radius * 2)
+    window = content[start:end]
+
+    if terms:
+        pattern = re.compile("|".join(re.escape(term) for term in terms), re.IGNORECASE)
+        window = pattern.sub(lambda m: f"<mark>{m.group(0)}</mark>", window)
+
+    return ("…" if start > 0 else "") + window + ("…" if end < len(content) else "")
+
+
+def _is_sqlite(db: AsyncSession) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+async def index_document(
+    db: AsyncSession,
+    doc_type: str,
+    doc_id: str,
+    title: Optional[str],
+    content: Optional[str],
+    user_id: Optional[str] = None
+):
+    """
+    写入或更新一篇文档的索引（在调用方的事务中执行，随业务数据一起提交）
+
+    Args:
+        db: 数据库会话
+        doc_type: 文档类型（contract/draft/clause）
+        doc_id: 文档ID
+        title: 标题
+        content: 正文
+        user_id: 所属用户（条款库为空）
+    """
+    result = await db.execute(
+        select(SearchDocument)
+        .where(SearchDocument.doc_type == doc_type)
+        .where(SearchDocument.doc_id == doc_id)
+    )
+    document = result.scalar_one_or_none()
+
+    if document is None:
+        document = SearchDocument(doc_type=doc_type, doc_id=doc_id)
+        db.add(document)
+
+    document.title = title
+    document.user_id = user_id
+    await db.flush()
+
+    if _is_sqlite(db):
+        await db.execute(
+            text(f"DELETE FROM {SEARCH_FTS_TABLE} WHERE rowid = :rowid"),
+            {"rowid": document.id}
+        )
+        await db.execute(
+            text(f"INSERT INTO {SEARCH_FTS_TABLE} (rowid, title, body) VALUES (:rowid, :title, :body)"),
+            {
+                "rowid": document.id,
+                "title": " ".join(tokenize(title)),
+                "body": " ".join(tokenize(content))
+            }
+        )
+
+
+async def remove_document(db: AsyncSession, doc_type: str, doc_id: str):
+    """
+    删除一篇文档的索引（在调用方的事务中执行）
+
+    Args:
+        db: 数据库会话
+        doc_type: 文档类型
+        doc_id: 文档ID
+    """
+    result = await db.execute(
+        select(SearchDocument.id)
+        .where(SearchDocument.doc_type == doc_type)
+        .where(SearchDocument.doc_id == doc_id)
+    )
+    rowid = result.scalar_one_or_none()
+    if rowid is None:
+        return
+
+    if _is_sqlite(db):
+        await db.execute(
+            text(f"DELETE FROM {SEARCH_FTS_TABLE} WHERE rowid = :rowid"),
+            {"rowid": rowid}
+        )
+    await db.execute(delete(SearchDocument).where(SearchDocument.id == rowid))
+
+
+async def index_draft(db: AsyncSession, draft: ContractDraft):
+    """写入草稿索引（以用户编辑后的内容为准，没有时使用 AI 生成的内容）"""
+    await index_document(
+        db,
+        "draft",
+        draft.id,
+        draft.title,
+        draft.final_content or draft.generated_content,
+        draft.user_id
+    )
+
+
+def _source_query(doc_type: str):
+    """各类文档的 (ID, 标题, 正文, 所属用户) 查询"""
+    if doc_type == "contract":
+        return select(Contract.id, Contract.title, Contract.content_text, Contract.user_id)
+    if doc_type == "draft":
+        return select(
+            ContractDraft.id,
+            ContractDraft.title,
+            func.coalesce(ContractDraft.final_content, ContractDraft.generated_content),
+            ContractDraft.user_id
+        )
+    return select(ContractClause.id, ContractClause.title, ContractClause.content, null())
+
+
+def _source_id_column(doc_type: str):
+    return {"contract": Contract.id, "draft": ContractDraft.id, "clause": ContractClause.id}[doc_type]
+
+
+async def _load_contents(db: AsyncSession, hits: List[Dict[str, Any]]) -> Dict[tuple, str]:
+    """按类型批量读取命中文档的原文（用于生成摘要）"""
+    contents = {}
+    for doc_type in DOC_TYPES:
+        ids = [hit["doc_id"] for hit in hits if hit["doc_type"] == doc_type]
+        if not ids:
+            continue
+        result = await db.execute(
+            _source_query(doc_type).where(_source_id_column(doc_type).in_(ids))
+        )
+        for doc_id, _, content, _ in result.all():
+            contents[(doc_type, doc_id)] = content or ""
+    return contents
+
+
+async def search(
+    db: AsyncSession,
+    query: str,
+    doc_types: Optional[Sequence[str]] = None,
+    user_id: Optional[str] = None,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    全文检索
+
+    Args:
+        db: 数据库会话
+        query: 查询文本（空白分隔的多个词为 AND 关系）
+        doc_types: 限定文档类型，默认全部
+        user_id: 当前用户（只返回该用户的合同、草稿以及公共条款）
+        limit: 最大返回数量
+
+    Returns:
+        {"query", "total", "took_ms", "hits": [{doc_type, doc_id, title, snippet, score}]}
+    """
+    started = time.perf_counter()
+    doc_types = [t for t in (doc_types or DOC_TYPES) if t in DOC_TYPES]
+    match_query = build_match_query(query)
+
+    hits = []
+    if match_query and doc_types:
+        if _is_sqlite(db):
+            hits = await _search_fts(db, match_query, doc_types, user_id, limit)
+        else:
+            hits = await _search_like(db, query, doc_types, user_id, limit)
+
+    contents = await _load_contents(db, hits)
+    for hit in hits:
+        hit["snippet"] = make_snippet(contents.get((hit["doc_type"], hit["doc_id"])), query)
+
+    return {
+        "query": query,
+        "total": len(hits),
+        "took_ms": round((time.perf_counter() - started) * 1000, 2),
+        "hits": hits
+    }
+
+
+async def _search_fts(
+    db: AsyncSession,
+    match_query: str,
+    doc_types: Sequence[str],
+    user_id: Optional[str],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """FTS5 检索，按 BM25 排序（分值越小越相关，返回时取反）"""
+    type_params = {f"type_{i}": doc_type for i, doc_type in enumerate(doc_types)}
+    type_clause = ", ".join(f":{name}" for name in type_params)
+    user_clause = "AND (d.user_id IS NULL OR d.user_id = :user_id)" if user_id else ""
+
+    result = await db.execute(
+        text(
+            f"SELECT d.doc_type, d.doc_id, d.title, "
+            f"bm25({SEARCH_FTS_TABLE}, {_TITLE_WEIGHT}, 1.0) AS rank "
+            f"FROM {SEARCH_FTS_TABLE} JOIN search_documents d ON d.id = {SEARCH_FTS_TABLE}.rowid "
+            f"WHERE {SEARCH_FTS_TABLE} MATCH :match "
+            f"AND d.doc_type IN ({type_clause}) {user_clause} "
+            f"ORDER BY rank LIMIT :limit"
+        ),
+        {"match": match_query, "user_id": user_id, "limit": limit, **type_params}
+    )
+
+    return [
+        {
+            "doc_type": doc_type,
+            "doc_id": doc_id,
+            "title": title,
+            "score": round(-rank, 4)
+        }
+        for doc_type, doc_id, title, rank in result.all()
+    ]
+
+
+async def _search_like(
+    db: AsyncSession,
+    query: str,
+    doc_types: Sequence[str],
+    user_id: Optional[str],
+    limit: int
+) -> List[Dict[str, Any]]:
+    """非 SQLite 数据库的退化实现：逐类型 LIKE 查询，不排序"""
+    hits = []
+    terms = query.split()
+
+    for doc_type in doc_types:
+        statement = _source_query(doc_type)
+        columns = list(statement.selected_columns)
+        for term in terms:
+            statement = statement.where(or_(columns[1].contains(term), columns[2].contains(term)))
+        if user_id and doc_type != "clause":
+            statement = statement.where(columns[3] == user_id)
+
+        result = await db.execute(statement.limit(limit - len(hits)))
+        for doc_id, title, _, _ in result.all():
+            hits.append({"doc_type": doc_type, "doc_id": doc_id, "title": title, "score": 0.0})
+
+        if len(hits) >= limit:
+            break
+
+    return hits
+
+
+async def ensure_search_index(session_factory=None):
+    """
+    确保检索索引可用：创建 FTS5 虚拟表（删除旧版本的表），索引为空时从现有数据回填
+
+    Args:
+        session_factory: 会话工厂（默认 AsyncSessionLocal）
+    """
+    async with (session_factory or AsyncSessionLocal)() as db:
+        if _is_sqlite(db):
+            for legacy_table in SEARCH_FTS_LEGACY_TABLES:
+                await db.execute(text(f"DROP TABLE IF EXISTS {legacy_table}"))
+            await db.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_FTS_TABLE} "
+                "USING fts5(title, body, tokenize='unicode61')"
+            ))
+            await db.commit()
+            indexed = await db.scalar(text(f"SELECT EXISTS (SELECT 1 FROM {SEARCH_FTS_TABLE})"))
+        else:
+            indexed = await db.scalar(select(func.count()).select_from(SearchDocument))
+        if indexed:
+            return
+
+        total = 0
+        for doc_type in DOC_TYPES:
+            id_column = _source_id_column(doc_type)
+            last_id = None
+            while True:
+                statement = _source_query(doc_type).order_by(id_column).limit(_BACKFILL_BATCH)
+                if last_id is not None:
+                    statement = statement.where(id_column > last_id)
+                rows = (await db.execute(statement)).all()
+                if not rows:
+                    break
+
+                for doc_id, title, content, user_id in rows:
+                    await index_document(db, doc_type, doc_id, title, content, user_id)
+                await db.commit()
+
+                total += len(rows)
+                last_id = rows[-1][0]
+
+        if total:
+            logger.info(f"检索索引回填完成，共 {total} 篇文档")
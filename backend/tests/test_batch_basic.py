@@ -0,0 +1,276 @@
+"""
+批量审查基本测试
+"""
+import sys
+import asyncio
+import hashlib
+import io
+import tempfile
+import zipfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.database import Base
+from backend.models import search as search_models
+from backend.models.review import ReviewJob, ReviewRecord
+from backend.services.batch_service import create_review_batch, get_batch_status
+from backend.utils.file_utils import FileManager, FileTooLargeError
+
+
+class _Upload:
+    """按块读取的上传文件"""
+
+    def __init__(self, content: bytes):
+        self.stream = io.BytesIO(content)
+
+    async def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+
+class TestBatchFiles:
+    """测试批量上传的文件处理"""
+
+    def test_extract_zip(self):
+        """测试解压 zip：忽略目录和元数据，检查格式、大小和数量上限"""
+        print("  [测试] 解压 zip...")
+
+        with tempfile.TemporaryDirectory() as directory:
+            manager = FileManager(f"{directory}/uploads", f"{directory}/storage")
+            zip_path = Path(directory) / "batch.zip"
+            with zipfile.ZipFile(zip_path, "w") as archive:
+                archive.writestr("合同/a.docx", b"a" * 10)
+                archive.writestr("b.docx", b"b" * 10)
+                archive.writestr("c.docx", b"c" * 10)
+                archive.writestr("big.docx", b"x" * 100)
+                archive.writestr("notes.txt", b"text")
+                archive.writestr("__MACOSX/._a.docx", b"meta")
+                archive.writestr("~$temp.docx", b"lock")
+                archive.writestr("采购合同.docx", b"d" * 10)
+
+            saved, rejected = manager.extract_zip(zip_path, 50, [".docx"], max_files=3)
+
+            names = [name for name, _, _ in saved]
+            assert names == ["a.docx", "b.docx", "c.docx"], f"解压结果错误: {names}"
+            assert all(path.read_bytes() == name[0].encode() * 10 for name, path, _ in saved), "解压内容错误"
+            assert saved[0][2] == hashlib.sha256(b"a" * 10).hexdigest(), "解压内容摘要错误"
+            reasons = dict(rejected)
+            assert "big.docx" in reasons and "notes.txt" in reasons, f"未拒绝不合格文件: {rejected}"
+            assert "采购合同.docx" in reasons and "上限" in reasons["采购合同.docx"], f"数量上限或文件名错误: {rejected}"
+            assert "._a.docx" not in reasons and "~$temp.docx" not in reasons, "未忽略元数据文件"
+
+            saved, rejected = manager.extract_zip(saved[0][1], 50, [".docx"], 3)
+            assert not saved and rejected, "无效 zip 未拒绝"
+
+        print("    [OK] zip 解压正确")
+
+    def test_stream_upload_limit(self):
+        """测试流式保存在超过大小限制时中止并删除已写入的部分"""
+        print("  [测试] 流式保存大小限制...")
+
+        async def scenario(directory: str):
+            manager = FileManager(f"{directory}/uploads", f"{directory}/storage")
+            path, file_hash = await manager.save_upload_stream(_Upload(b"ok" * 10), "a.docx", 100)
+            try:
+                await manager.save_upload_stream(_Upload(b"x" * (3 * 1024 * 1024)), "b.docx", 2 * 1024 * 1024)
+                too_large = False
+            except FileTooLargeError:
+                too_large = True
+            return path, file_hash, too_large, list(manager.upload_dir.iterdir())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path, file_hash, too_large, files = asyncio.run(scenario(directory))
+            assert path.read_bytes() == b"ok" * 10, "保存内容错误"
+            assert file_hash == hashlib.sha256(b"ok" * 10).hexdigest(), "内容摘要错误"
+            assert too_large, "超过大小限制未中止"
+            assert files == [path], f"未删除超限文件: {files}"
+
+        print("    [OK] 超限上传中止并清理")
+
+
+class TestUploadLimit:
+    """测试上传请求大小限制中间件"""
+
+    def test_reject_before_body(self):
+        """测试 Content-Length 超限和分块传输超限都返回 413，限制内的上传正常处理"""
+        print("  [测试] 上传大小限制...")
+
+        from fastapi import FastAPI, UploadFile, File
+        from fastapi.testclient import TestClient
+        from backend.utils.upload_limit import UploadSizeLimitMiddleware, MULTIPART_OVERHEAD
+
+        app = FastAPI()
+        app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": 1024})
+
+        @app.post("/upload")
+        async def upload(file: UploadFile = File(...)):
+            return {"size": len(await file.read())}
+
+        def chunks():
+            for _ in range(40):
+                yield b"x" * 4096
+
+        with TestClient(app) as client:
+            ok = client.post("/upload", files={"file": ("a.docx", b"x" * 1000)})
+            declared = client.post("/upload", files={"file": ("a.docx", b"x" * (MULTIPART_OVERHEAD + 2048))})
+            streamed = client.post(
+                "/upload",
+                content=chunks(),
+                headers={"content-type": "multipart/form-data; boundary=b"}
+            )
+
+        assert ok.status_code == 200 and ok.json()["size"] == 1000, f"限制内上传失败: {ok.text}"
+        assert declared.status_code == 413, f"Content-Length 超限未拒绝: {declared.status_code}"
+        assert "文件过大" in declared.json()["detail"], "413 响应缺少说明"
+        assert streamed.status_code == 413, f"分块传输超限未拒绝: {streamed.status_code}"
+
+        print("    [OK] 超限上传返回 413")
+
+    def test_rejection_has_cors_headers(self):
+        """测试应用的 413 响应带有 CORS 头（浏览器才能读取错误信息）"""
+        print("  [测试] 413 响应的 CORS 头...")
+
+        from fastapi.testclient import TestClient
+        from backend.main import app
+        from backend.config import get_settings
+
+        # 不进入 lifespan：请求在读取请求体之前就被拒绝
+        client = TestClient(app)
+        response = client.post(
+            "/api/reviews/upload",
+            content=b"x" * 16,
+            headers={
+                "origin": "http://localhost:3000",
+                "content-type": "multipart/form-data; boundary=b",
+                "content-length": str(get_settings().max_file_size * 2)
+            }
+        )
+
+        assert response.status_code == 413, f"超限未拒绝: {response.status_code}"
+        assert response.headers.get("access-control-allow-origin"), f"413 响应缺少 CORS 头: {response.headers}"
+
+        print("    [OK] 413 响应带有 CORS 头")
+
+
+class TestBatchStatus:
+    """测试批量审查的创建和状态汇总"""
+
+    def test_create_and_aggregate(self):
+        """测试批次在一个事务中创建合同、审查和任务，并按审查记录汇总进度和风险"""
+        print("  [测试] 批次状态汇总...")
+
+        async def scenario():
+            db_path = Path(tempfile.mkdtemp()) / "batch.db"
+            engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+            contracts = [
+                {
+                    "title": f"合同{i}",
+                    "original_filename": f"合同{i}.docx",
+                    "file_path": f"/tmp/合同{i}.docx",
+                    "parsed_document": {"full_text": f"第{i}份合同"}
+                }
+                for i in range(3)
+            ]
+            async with session_factory() as db:
+                batch, contract_ids, review_ids = await create_review_batch(
+                    db, contracts, [{"filename": "bad.txt", "error": "格式错误"}], title="尽调"
+                )
+                await db.commit()
+
+            async with session_factory() as db:
+                jobs = (await db.execute(select(ReviewJob.review_id))).scalars().all()
+                initial = await get_batch_status(db, batch.id)
+
+                await db.execute(
+                    update(ReviewRecord).where(ReviewRecord.id == review_ids[0])
+                    .values(status="completed", high_risk_count=2, medium_risk_count=1, low_risk_count=0)
+                )
+                await db.execute(
+                    update(ReviewRecord).where(ReviewRecord.id == review_ids[1])
+                    .values(status="completed", high_risk_count=1, medium_risk_count=0, low_risk_count=4)
+                )
+                await db.execute(
+                    update(ReviewRecord).where(ReviewRecord.id == review_ids[2])
+                    .values(status="failed", error_message="超时")
+                )
+                await db.commit()
+                final = await get_batch_status(db, batch.id, include_items=True)
+                missing = await get_batch_status(db, "missing")
+
+            await engine.dispose()
+            return batch, review_ids, jobs, initial, final, missing
+
+        batch, review_ids, jobs, initial, final, missing = asyncio.run(scenario())
+
+        assert batch.total_files == 4, f"文件数错误: {batch.total_files}"
+        assert sorted(jobs) == sorted(review_ids), "审查任务未全部入队"
+        assert initial["status"] == "processing" and initial["percent"] == 0, f"初始状态错误: {initial}"
+        assert initial["status_counts"] == {"processing": 3}, f"初始计数错误: {initial}"
+
+        assert final["status"] == "completed" and final["percent"] == 100, f"最终状态错误: {final}"
+        assert final["status_counts"] == {"completed": 2, "failed": 1}, f"最终计数错误: {final}"
+        assert (final["high_risk_count"], final["medium_risk_count"], final["low_risk_count"]) == (3, 1, 4), \
+            f"风险汇总错误: {final}"
+        assert final["rejected"] == [{"filename": "bad.txt", "error": "格式错误"}], "未导入文件丢失"
+        assert [item["review_id"] for item in final["items"]] == review_ids, "审查明细错误"
+        assert final["items"][2]["error_message"] == "超时", "失败原因丢失"
+        assert missing is None, "不存在的批次应返回 None"
+
+        print("    [OK] 批次创建和状态汇总正确")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("批量审查基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestBatchFiles(), TestUploadLimit(), TestBatchStatus()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
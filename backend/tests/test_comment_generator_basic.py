@@ -0,0 +1,272 @@
+"""
+批注生成基本测试
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.utils.document_parser import DocumentParser
+from backend.utils.location_matcher import LocationMatcher
+from backend.utils.comment_generator import CommentGenerator
+
+
+def _make_parsed_doc(texts):
+    """由段落文本构造解析结果"""
+    paragraphs = [{"text": text, "style": "Normal", "index": i} for i, text in enumerate(texts)]
+    return {
+        "paragraphs": paragraphs,
+        "structure": DocumentParser()._detect_structure(paragraphs)
+    }
+
+
+class TestCommentAnchor:
+    """测试批注锚定"""
+
+    def test_comment_wraps_span(self):
+        """测试批注范围标记包住问题原文"""
+        print("  [测试] 批注锚定...")
+
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        doc = Document()
+        paragraph = doc.add_paragraph()
+        paragraph.add_run("甲方应当")
+        paragraph.add_run("按时支付").bold = True
+        paragraph.add_run("全部货款。")
+        doc.add_paragraph("乙方应在收到货款后")
+        doc.add_paragraph("十日内交付货物。")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            doc.save(doc_path)
+            generator = CommentGenerator(doc_path)
+
+        matcher = LocationMatcher(_make_parsed_doc([p.text for p in generator.doc.paragraphs]))
+
+        inner = matcher.locate_issue({"original_text": "支付全部", "location_hint": ""})
+        across = matcher.locate_issue({"original_text": "货款后十日内", "location_hint": ""})
+        assert generator.add_comment(inner["index"], "问题一", span=inner["span"])
+        assert generator.add_comment(across["index"], "问题二", span=across["span"])
+
+        def commented_text(comment_id):
+            """commentRangeStart 与 commentRangeEnd 之间的文字"""
+            body = generator.doc.element.body
+            inside = False
+            text = ""
+            for element in body.iter():
+                if element.tag == qn("w:commentRangeStart") and element.get(qn("w:id")) == comment_id:
+                    inside = True
+                elif element.tag == qn("w:commentRangeEnd") and element.get(qn("w:id")) == comment_id:
+                    return text
+                elif inside and element.tag == qn("w:t"):
+                    text += element.text
+            return None
+
+        assert commented_text("0") == "支付全部", f"段内批注范围错误: {commented_text('0')}"
+        assert commented_text("1") == "货款后十日内", f"跨段落批注范围错误: {commented_text('1')}"
+        assert [p.text for p in generator.doc.paragraphs][0] == "甲方应当按时支付全部货款。", "拆分 run 改变了正文"
+        assert generator.doc.paragraphs[0].runs[1].bold, "拆分 run 丢失了原有格式"
+
+        print("    [OK] 批注锚定正确")
+
+    def test_comment_in_table_cell(self):
+        """测试批注锚定到表格单元格中的文字"""
+        print("  [测试] 表格批注...")
+
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        doc = Document()
+        table = doc.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = "品名"
+        table.cell(1, 1).text = "预付款为合同总价的百分之八十"
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            doc.save(doc_path)
+            generator = CommentGenerator(doc_path)
+
+        location = {
+            "type": "table_cell", "table": 0, "row": 1, "cell": 1,
+            "span": {"start": {"offset": 4}, "end": {"offset": 14}}
+        }
+        count = generator.add_issues_as_comments([{"issue": {"problem": "比例过高"}, "location": location}])
+
+        cell = generator.doc.tables[0].cell(1, 1)._tc
+        marked = []
+        inside = False
+        for element in cell.iter():
+            if element.tag == qn("w:commentRangeStart"):
+                inside = True
+            elif element.tag == qn("w:commentRangeEnd"):
+                inside = False
+            elif inside and element.tag == qn("w:t"):
+                marked.append(element.text)
+
+        assert count == 1, "表格批注未添加"
+        assert "".join(marked) == "合同总价的百分之八十", f"表格批注范围错误: {marked}"
+
+        print("    [OK] 表格批注锚定正确")
+
+    def test_comments_part_written(self):
+        """测试批量批注写入批注部分：ID 按文档顺序，正文使用批注引用，已有批注时 ID 接续"""
+        print("  [测试] 批注部分...")
+
+        import zipfile
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        doc = Document()
+        doc.add_paragraph("甲方应当按时支付全部货款。")
+        doc.add_paragraph("乙方应在收到货款后十日内交付货物。")
+
+        def located(index, start, end, problem):
+            return {
+                "issue": {"severity": "高", "problem": problem, "suggestion": "修改"},
+                "location": {"type": "paragraph", "index": index, "span": LocationMatcher.span(index, start, index, end)}
+            }
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            first_path = str(Path(tmp_dir) / "first.docx")
+            second_path = str(Path(tmp_dir) / "second.docx")
+            doc.save(doc_path)
+
+            # 问题顺序与文档顺序相反
+            generator = CommentGenerator(doc_path)
+            count = generator.add_issues_as_comments([
+                located(1, 8, 12, "交付期限过短"),
+                located(0, 4, 8, "付款时间不明确"),
+                located(0, 8, 12, "付款范围不明确"),
+            ])
+            generator.save(first_path)
+
+            with zipfile.ZipFile(first_path) as archive:
+                content_types = archive.read("[Content_Types].xml").decode("utf-8")
+                rels = archive.read("word/_rels/document.xml.rels").decode("utf-8")
+                comments_xml = archive.read("word/comments.xml").decode("utf-8")
+
+            reopened = CommentGenerator(first_path)
+            comments = reopened._comments_element()
+            texts = [
+                "\n".join("".join(t.text for t in p.iter(qn("w:t"))) for p in comment.iterchildren(qn("w:p")))
+                for comment in comments.iterchildren(qn("w:comment"))
+            ]
+            body = reopened.doc.element.body
+            references = [element.get(qn("w:id")) for element in body.iter(qn("w:commentReference"))]
+            annotation_refs = list(body.iter(qn("w:annotationRef")))
+            paragraph_texts = [p.text for p in reopened.doc.paragraphs]
+
+            reopened.add_comment(1, "补充意见")
+            reopened.save(second_path)
+            final = CommentGenerator(second_path)._comments_element()
+            final_ids = [comment.get(qn("w:id")) for comment in final.iterchildren(qn("w:comment"))]
+
+        assert count == 3, f"批注数错误: {count}"
+        assert "comments+xml" in content_types, "未注册批注部分的内容类型"
+        assert "relationships/comments" in rels, "正文未关联批注部分"
+        assert "CommentText" in comments_xml and "annotationRef" in comments_xml, "批注内容格式错误"
+        assert texts == [
+            "【高风险】付款时间不明确\n建议：修改", "【高风险】付款范围不明确\n建议：修改", "【高风险】交付期限过短\n建议：修改"
+        ], f"批注内容或顺序错误: {texts}"
+        assert sorted(references) == ["0", "1", "2"], f"正文批注引用错误: {references}"
+        assert not annotation_refs, "正文中不应出现 annotationRef"
+        assert paragraph_texts == ["甲方应当按时支付全部货款。", "乙方应在收到货款后十日内交付货物。"], \
+            f"批注改变了正文: {paragraph_texts}"
+        assert final_ids == ["0", "1", "2", "3"], f"已有批注时 ID 未接续: {final_ids}"
+
+        print("    [OK] 批注部分写入正确")
+
+    def test_comment_ids_follow_table_position(self):
+        """测试表格批注按表格在正文中的位置参与排序，批注ID与文档顺序一致"""
+        print("  [测试] 表格批注排序...")
+
+        from docx import Document
+        from docx.oxml.ns import qn
+
+        doc = Document()
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "预付款为合同总价的百分之八十"
+        doc.add_paragraph("甲方应当按时支付全部货款。")
+        doc.add_table(rows=1, cols=1).cell(0, 0).text = "交货地点为乙方仓库"
+        doc.add_paragraph("乙方应在收到货款后十日内交付货物。")
+
+        def cell(table, problem):
+            return {"issue": {"problem": problem}, "location": {"type": "table_cell", "table": table, "row": 0, "cell": 0}}
+
+        def paragraph(index, problem):
+            return {"issue": {"problem": problem}, "location": {"type": "paragraph", "index": index}}
+
+        issues = [paragraph(1, "交付期限"), cell(1, "交货地点"), paragraph(0, "付款时间"), cell(0, "预付比例")]
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            doc.save(doc_path)
+            orders = []
+            for parsed_doc in (None, DocumentParser().parse_document(doc_path)):
+                generator = CommentGenerator(doc_path, parsed_doc)
+                generator.add_issues_as_comments(issues)
+                comments = generator._comments_element()
+                orders.append([
+                    "".join(t.text for t in comment.iter(qn("w:t"))).split("】")[1].split("建议")[0]
+                    for comment in comments.iterchildren(qn("w:comment"))
+                ])
+
+        expected = ["预付比例", "付款时间", "交货地点", "交付期限"]
+        assert orders[0] == expected, f"批注顺序错误: {orders[0]}"
+        assert orders[1] == expected, f"使用解析结果时批注顺序错误: {orders[1]}"
+
+        print("    [OK] 表格批注按文档顺序编号")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("批注生成基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestCommentAnchor()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
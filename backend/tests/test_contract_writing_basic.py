@@ -2,6 +2,7 @@
 合同撰写功能基本测试
 """
 import sys
+import asyncio
 from pathlib import Path
 
 # 添加项目根目录到 Python 路径
@@ -15,6 +16,7 @@ from backend.utils.contract_prompts import (
     build_contract_refinement_prompt,
     build_clause_suggestion_prompt
 )
+from backend.routers import contract_writing
 
 
 class TestDocumentBuilder:
@@ -140,6 +142,46 @@ class TestContractPrompts:
         print("    [OK] Prompt 构建正确")
 
 
+class TestGenerationStream:
+    """测试流式生成的事件"""
+
+    def test_stream_ends_on_failure(self):
+        """测试保存失败状态出错或任务异常退出时流仍以 error 事件结束"""
+        print("  [测试] 失败时结束流...")
+
+        async def broken_update(draft_id, **values):
+            raise RuntimeError("database is locked")
+
+        async def fail_job(emit):
+            await contract_writing._fail_draft("d1", "合同生成失败: 超时", emit)
+
+        async def crash_job(emit):
+            emit("status", {"stage": "analyzing"})
+            raise RuntimeError("unexpected")
+
+        async def collect(job):
+            response = contract_writing._stream_task(job)
+            return [chunk async for chunk in response.body_iterator]
+
+        async def scenario():
+            original = contract_writing._update_draft
+            contract_writing._update_draft = broken_update
+            try:
+                return (
+                    await asyncio.wait_for(collect(fail_job), 5),
+                    await asyncio.wait_for(collect(crash_job), 5)
+                )
+            finally:
+                contract_writing._update_draft = original
+
+        failed, crashed = asyncio.run(scenario())
+        assert failed[-1].startswith("event: error"), f"保存失败时未推送错误事件: {failed}"
+        assert "超时" in failed[-1], "错误信息丢失"
+        assert crashed[-1].startswith("event: error"), f"任务异常退出时未推送错误事件: {crashed}"
+
+        print("    [OK] 流以 error 事件结束")
+
+
 def run_tests():
     """运行所有测试"""
     print("=" * 60)
@@ -147,7 +189,7 @@ def run_tests():
     print("=" * 60)
     print()
 
-    test_classes = [TestDocumentBuilder(), TestContractPrompts()]
+    test_classes = [TestDocumentBuilder(), TestContractPrompts(), TestGenerationStream()]
     total_tests = 0
     passed_tests = 0
     failed_tests = 0
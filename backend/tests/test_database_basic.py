@@ -0,0 +1,135 @@
+"""
+数据库升级基本测试
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import Column, ForeignKey, MetaData, Table, inspect, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from backend.database import Base, ADDED_COLUMNS, ADDED_INDEXES, upgrade_schema
+from backend.models import contract_writing, search  # noqa: F401  注册全部模型
+from backend.models.review import Contract, ReviewRecord
+
+
+class TestSchemaUpgrade:
+    """测试为旧数据库补齐新增的列"""
+
+    def test_upgrade_old_database(self):
+        """测试旧版本数据库补齐新增的列和索引后可以正常查询，重复执行不报错"""
+        print("  [测试] 数据库升级...")
+
+        def create_old_schema(conn):
+            """按去掉新增列的模型建表，模拟旧版本创建的数据库"""
+            old_metadata = MetaData()
+            for table in Base.metadata.sorted_tables:
+                Table(table.name, old_metadata, *[
+                    Column(
+                        column.name,
+                        column.type,
+                        *[ForeignKey(foreign_key.target_fullname) for foreign_key in column.foreign_keys],
+                        primary_key=column.primary_key
+                    )
+                    for column in table.columns
+                    if (table.name, column.name) not in ADDED_COLUMNS
+                ])
+            old_metadata.create_all(conn)
+            conn.execute(text(
+                "INSERT INTO contracts (id, user_id, title, status) VALUES ('c1', 'default_user', '旧合同', 'completed')"
+            ))
+
+        def schema(conn):
+            inspector = inspect(conn)
+            columns = {
+                (table_name, column["name"])
+                for table_name in ("contracts", "review_records")
+                for column in inspector.get_columns(table_name)
+            }
+            indexes = {
+                index["name"]
+                for table_name in ("contracts", "review_records")
+                for index in inspector.get_indexes(table_name)
+            }
+            return columns, indexes
+
+        async def scenario(db_path):
+            engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+            async with engine.begin() as conn:
+                await conn.run_sync(create_old_schema)
+                before, _ = await conn.run_sync(schema)
+
+            for _ in range(2):
+                async with engine.begin() as conn:
+                    await conn.run_sync(Base.metadata.create_all)
+                    await conn.run_sync(upgrade_schema)
+
+            async with engine.begin() as conn:
+                after, indexes = await conn.run_sync(schema)
+                contract = (await conn.execute(select(Contract))).first()
+                await conn.execute(select(ReviewRecord))
+            await engine.dispose()
+            return before, after, indexes, contract
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            before, after, indexes, contract = asyncio.run(scenario(str(Path(tmp_dir) / "old.db")))
+
+        assert not before & set(ADDED_COLUMNS), "旧数据库不应包含新增的列"
+        assert set(ADDED_COLUMNS) <= after, f"新增的列未补齐: {set(ADDED_COLUMNS) - after}"
+        assert set(ADDED_INDEXES) <= indexes, f"新增的索引未补建: {set(ADDED_INDEXES) - indexes}"
+        assert contract is not None and contract.title == "旧合同", "升级后旧记录丢失"
+
+        print("    [OK] 旧数据库升级后可正常查询")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("数据库升级基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestSchemaUpgrade()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,136 @@
+"""
+流式文档读取基本测试
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from docx import Document
+from docx.oxml import OxmlElement
+from backend.utils.document_parser import DocumentParser
+
+
+def _make_document(path: str):
+    """构造包含标题、制表符、换行、超链接和合并单元格的文档"""
+    doc = Document()
+    doc.add_heading("框架协议", 0)
+    doc.add_heading("第一条 定义", 1)
+    paragraph = doc.add_paragraph("含制表\t的段落")
+    paragraph.add_run().add_break()
+    paragraph.add_run("换行之后")
+    doc.add_paragraph("列表项", style="List Bullet")
+
+    table = doc.add_table(rows=3, cols=3)
+    for row in range(3):
+        for col in range(3):
+            table.cell(row, col).text = f"{row}-{col}"
+    table.cell(0, 0).merge(table.cell(0, 1))
+    table.cell(1, 2).merge(table.cell(2, 2))
+
+    for i in range(2, 8):
+        doc.add_paragraph(f"第{'一二三四五六七八九十'[i - 1]}条 条款{i}")
+        doc.add_paragraph("甲方应当在验收后支付货款。" * i)
+
+    paragraph = doc.add_paragraph("详见")
+    hyperlink = OxmlElement("w:hyperlink")
+    run = OxmlElement("w:r")
+    text = OxmlElement("w:t")
+    text.text = "附件一"
+    run.append(text)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+    doc.save(path)
+
+
+class TestStreamingParse:
+    """测试流式解析"""
+
+    def test_same_result_as_python_docx(self):
+        """测试流式解析结果与 python-docx 解析一致"""
+        print("  [测试] 流式解析一致性...")
+        parser = DocumentParser()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "contract.docx")
+            _make_document(path)
+            expected = parser.parse_document(path)
+            actual = parser.parse_document_streaming(path)
+
+        assert actual["paragraphs"] == expected["paragraphs"], "段落文本或样式不一致"
+        assert actual["tables"] == expected["tables"], f"表格不一致: {actual['tables']}"
+        assert actual == expected, "解析结果不一致"
+        assert actual["paragraphs"][-1]["text"] == "详见附件一", "超链接文字缺失"
+
+        print("    [OK] 流式解析结果一致")
+
+    def test_stream_sections(self):
+        """测试流式分段与整体分段一致"""
+        print("  [测试] 流式分段...")
+        parser = DocumentParser()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = str(Path(tmp_dir) / "contract.docx")
+            _make_document(path)
+            parsed_doc = parser.parse_document(path)
+
+            for max_tokens in (10, 30, 1000):
+                for overlap_tokens in (0, 20):
+                    expected = parser.split_by_sections(parsed_doc, max_tokens, overlap_tokens)
+                    actual = list(parser.stream_sections(path, max_tokens, overlap_tokens))
+                    assert actual == expected, f"分段不一致: max_tokens={max_tokens}, overlap={overlap_tokens}"
+
+        print("    [OK] 流式分段一致")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("流式文档读取基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestStreamingParse()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,154 @@
+"""
+文档处理进程池基本测试
+"""
+import sys
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from docx import Document
+from backend.utils import document_tasks
+from backend.utils.executor import init_executor, shutdown_executor, run_cpu, get_executor_stats
+
+
+def _make_document(path: str):
+    """构造一份简单合同"""
+    doc = Document()
+    doc.add_heading("第一条 付款", 1)
+    doc.add_paragraph("甲方应在验收合格后三十日内支付全部货款。")
+    doc.add_heading("第二条 违约", 1)
+    doc.add_paragraph("任何一方违约的，应向守约方支付合同总价百分之二十的违约金。")
+    doc.save(path)
+
+
+def _run_pipeline(workers: int, directory: str):
+    """按指定进程数执行解析 → 定位 → 写批注，返回结果和耗时统计"""
+    source = os.path.join(directory, "contract.docx")
+    output = os.path.join(directory, f"reviewed_{workers}.docx")
+    _make_document(source)
+    issues = [{
+        "original_text": "百分之二十的违约金",
+        "severity": "高",
+        "category": "违约责任",
+        "problem": "违约金比例过高",
+        "suggestion": "调整为百分之十"
+    }]
+
+    async def scenario():
+        parsed_doc = await run_cpu(document_tasks.parse_document, source)
+        located = await run_cpu(document_tasks.locate_issues, source, issues, None, parsed_doc)
+        written = await run_cpu(
+            document_tasks.write_reviewed_document, source, parsed_doc, located, output, "摘要"
+        )
+        return parsed_doc, located, written
+
+    init_executor(workers)
+    try:
+        result = asyncio.run(scenario())
+        stats = get_executor_stats()
+    finally:
+        shutdown_executor()
+    return result, stats, output
+
+
+class TestCpuExecutor:
+    """测试进程池执行文档处理任务"""
+
+    def test_process_pool_matches_inline(self):
+        """测试进程池与线程池执行的结果一致，并记录各任务耗时"""
+        print("  [测试] 进程池执行文档任务...")
+
+        with tempfile.TemporaryDirectory() as directory:
+            (parsed, located, written), stats, output = _run_pipeline(2, directory)
+            (inline_parsed, inline_located, inline_written), inline_stats, _ = _run_pipeline(-1, directory)
+
+            assert stats["mode"] == "process" and stats["workers"] == 2, f"进程池配置错误: {stats}"
+            assert inline_stats["mode"] == "thread", f"线程池配置错误: {inline_stats}"
+            assert parsed["paragraphs"] == inline_parsed["paragraphs"], "解析结果不一致"
+            assert located == inline_located, "定位结果不一致"
+            assert located[0]["location"]["index"] == 3, f"定位错误: {located[0]}"
+            assert written["comments"] == inline_written["comments"] == 1, f"批注数错误: {written}"
+            assert "违约金比例过高" in written["report"], "报告缺少问题"
+            assert os.path.exists(output), "批注文档未保存"
+
+            for name in ("parse_document", "locate_issues", "write_reviewed_document"):
+                timing = stats["tasks"][name]
+                assert timing["calls"] >= 1 and timing["failures"] == 0, f"{name} 统计错误: {timing}"
+                assert timing["avg_run_seconds"] is not None, f"{name} 缺少耗时"
+        print("    [OK] 进程池执行文档任务正确")
+
+    def test_task_error_propagates(self):
+        """测试任务异常原样抛出并计入失败次数"""
+        print("  [测试] 任务异常...")
+
+        async def scenario():
+            try:
+                await run_cpu(document_tasks.parse_document, "/nonexistent/contract.docx")
+            except Exception as e:
+                return e
+            return None
+
+        init_executor(1)
+        try:
+            error = asyncio.run(scenario())
+            stats = get_executor_stats()
+        finally:
+            shutdown_executor()
+
+        assert error is not None, "异常未抛出"
+        assert stats["tasks"]["parse_document"]["failures"] >= 1, f"失败次数错误: {stats}"
+        print("    [OK] 任务异常正确抛出")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("文档处理进程池基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestCpuExecutor()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,327 @@
+"""
+审查任务队列基本测试
+"""
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.database import Base
+from backend.models.review import ReviewJob
+from backend.services.job_queue import ReviewJobQueue, enqueue_review_job
+
+
+async def _make_queue() -> ReviewJobQueue:
+    """创建使用临时数据库的任务队列"""
+    db_path = Path(tempfile.mkdtemp()) / "queue.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return ReviewJobQueue(session_factory=async_sessionmaker(engine, expire_on_commit=False))
+
+
+async def _enqueue(queue: ReviewJobQueue, review_id: str, priority: int = 0):
+    async with queue.session_factory() as session:
+        enqueue_review_job(session, review_id, "contract", priority=priority)
+        await session.commit()
+
+
+class TestReviewJobQueue:
+    """测试审查任务队列"""
+
+    def test_lease_by_priority(self):
+        """测试按优先级领取任务"""
+        print("  [测试] 优先级领取...")
+
+        async def scenario():
+            queue = await _make_queue()
+            await _enqueue(queue, "low", priority=0)
+            await _enqueue(queue, "high", priority=10)
+            first = await queue.lease("w1")
+            second = await queue.lease("w2")
+            third = await queue.lease("w3")
+            return first, second, third
+
+        first, second, third = asyncio.run(scenario())
+        assert first["review_id"] == "high", "未优先领取高优先级任务"
+        assert second["review_id"] == "low", "第二个任务错误"
+        assert third is None, "同一任务被重复领取"
+
+        print("    [OK] 按优先级领取，且不重复领取")
+
+    def test_concurrent_lease_is_exclusive(self):
+        """测试并发领取时每个任务只分配一次"""
+        print("  [测试] 并发领取...")
+
+        async def scenario():
+            queue = await _make_queue()
+            for i in range(5):
+                await _enqueue(queue, f"review-{i}")
+            jobs = await asyncio.gather(*[queue.lease(f"w{i}") for i in range(8)])
+            return [job["review_id"] for job in jobs if job]
+
+        leased = asyncio.run(scenario())
+        assert len(leased) == len(set(leased)), f"任务被重复分配: {leased}"
+        assert len(leased) == 5, f"领取数量错误: {leased}"
+
+        print("    [OK] 任务不会被重复分配")
+
+    def test_retry_with_backoff(self):
+        """测试失败后退避重试，超过次数后失败"""
+        print("  [测试] 失败重试...")
+
+        async def scenario():
+            queue = await _make_queue()
+            queue.retry_base_seconds = 0
+            await _enqueue(queue, "review")
+
+            outcomes = []
+            for _ in range(3):
+                job = await queue.lease("w1")
+                outcomes.append(await queue.fail(job["id"], "w1", "模型超时"))
+            return outcomes, await queue.lease("w1")
+
+        outcomes, leftover = asyncio.run(scenario())
+        assert outcomes == [True, True, False], f"重试结果错误: {outcomes}"
+        assert leftover is None, "失败任务仍可被领取"
+
+        print("    [OK] 达到最大次数后停止重试")
+
+    def test_expired_lease_is_reclaimed(self):
+        """测试租约过期的任务被其他 Worker 接管"""
+        print("  [测试] 租约过期接管...")
+
+        async def scenario():
+            queue = await _make_queue()
+            await _enqueue(queue, "review")
+            job = await queue.lease("crashed")
+
+            async with queue.session_factory() as session:
+                await session.execute(
+                    update(ReviewJob)
+                    .where(ReviewJob.id == job["id"])
+                    .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+                )
+                await session.commit()
+
+            reclaimed = await queue.lease("w2")
+            still_owner = await queue.heartbeat(job["id"], "crashed")
+            return reclaimed, still_owner
+
+        reclaimed, still_owner = asyncio.run(scenario())
+        assert reclaimed and reclaimed["attempts"] == 2, "过期任务未被接管"
+        assert not still_owner, "原 Worker 仍能续约"
+
+        print("    [OK] 过期任务被重新领取")
+
+    def test_crashing_job_stops_after_max_attempts(self):
+        """测试反复因 Worker 崩溃而租约过期的任务，达到最大次数后标记失败"""
+        print("  [测试] 崩溃任务次数上限...")
+
+        async def expire(queue, job_id):
+            async with queue.session_factory() as session:
+                await session.execute(
+                    update(ReviewJob)
+                    .where(ReviewJob.id == job_id)
+                    .values(lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+                )
+                await session.commit()
+
+        async def scenario():
+            queue = await _make_queue()
+            await _enqueue(queue, "review")
+            leases = []
+            for i in range(4):
+                job = await queue.lease(f"w{i}")
+                if job is None:
+                    break
+                leases.append(job["attempts"])
+                await expire(queue, job["id"])
+            failed = await queue.fail_exhausted()
+            again = await queue.fail_exhausted()
+            return leases, failed, again, await queue.lease("w9")
+
+        leases, failed, again, leftover = asyncio.run(scenario())
+        assert leases == [1, 2, 3], f"领取次数错误: {leases}"
+        assert [item["review_id"] for item in failed] == ["review"], f"未标记失败: {failed}"
+        assert again == [] and leftover is None, "失败任务仍被处理"
+
+        print("    [OK] 达到最大次数后不再领取")
+
+    def test_non_retryable_failure(self):
+        """测试不可重试的失败直接标记失败"""
+        print("  [测试] 不可重试的失败...")
+
+        async def scenario():
+            queue = await _make_queue()
+            queue.retry_base_seconds = 0
+            await _enqueue(queue, "review")
+            job = await queue.lease("w1")
+            will_retry = await queue.fail(job["id"], "w1", "合同不存在", retryable=False)
+            return will_retry, await queue.lease("w1")
+
+        will_retry, leftover = asyncio.run(scenario())
+        assert will_retry is False and leftover is None, "不可重试的任务被重新排队"
+
+        print("    [OK] 不重试")
+
+    def test_worker_slot_survives_db_errors(self):
+        """测试任务状态更新失败时执行槽继续运行"""
+        print("  [测试] 执行槽容错...")
+        from backend.worker import ReviewWorker
+
+        class LockedQueue:
+            """完成标记时数据库被锁的队列"""
+
+            def __init__(self):
+                self.jobs = [{"id": f"job-{i}", "review_id": f"review-{i}", "contract_id": "c",
+                              "payload": {}, "attempts": 1} for i in range(2)]
+
+            async def fail_exhausted(self):
+                return []
+
+            async def lease(self, worker_id):
+                return self.jobs.pop(0) if self.jobs else None
+
+            async def complete(self, job_id, worker_id):
+                raise RuntimeError("database is locked")
+
+        async def scenario():
+            queue = LockedQueue()
+            worker = ReviewWorker(concurrency=1, queue=queue)
+            worker.poll_interval = 0.01
+            processed = []
+
+            async def process(job):
+                processed.append(job["id"])
+
+            worker._process = process
+            worker.start()
+            await asyncio.sleep(0.2)
+            alive = not worker._slots[0].done()
+            await worker.stop()
+            return processed, alive
+
+        processed, alive = asyncio.run(scenario())
+        assert processed == ["job-0", "job-1"], f"后续任务未执行: {processed}"
+        assert alive, "执行槽已退出"
+
+        print("    [OK] 执行槽继续领取任务")
+
+    def test_sweep_once_per_worker(self):
+        """测试过期任务清理按 Worker 定时执行，不随每个执行槽的轮询执行"""
+        print("  [测试] 过期任务清理频率...")
+        from backend.worker import ReviewWorker
+
+        class IdleQueue:
+            """没有任务的队列，记录调用次数"""
+
+            def __init__(self):
+                self.sweeps = 0
+                self.leases = 0
+
+            async def fail_exhausted(self):
+                self.sweeps += 1
+                return []
+
+            async def lease(self, worker_id):
+                self.leases += 1
+                return None
+
+        async def scenario():
+            queue = IdleQueue()
+            worker = ReviewWorker(concurrency=3, queue=queue)
+            worker.poll_interval = 0.01
+            worker.sweep_interval = 60
+            worker.start()
+            await asyncio.sleep(0.2)
+            await worker.stop()
+            return queue.sweeps, queue.leases
+
+        sweeps, leases = asyncio.run(scenario())
+        assert sweeps == 1, f"清理次数错误: {sweeps}"
+        assert leases > 3 * 5, f"执行槽未持续轮询: {leases}"
+
+        print("    [OK] 每个 Worker 定时清理一次")
+
+    def test_failed_review_resets_contract(self):
+        """测试审查最终失败后合同不再停留在审核中"""
+        print("  [测试] 失败后恢复合同状态...")
+        from backend.models.review import Contract, ReviewRecord
+        from backend.services.review_pipeline import mark_review_failed
+
+        async def scenario():
+            queue = await _make_queue()
+            async with queue.session_factory() as session:
+                session.add(Contract(id="c1", title="合同", status="reviewing"))
+                session.add(ReviewRecord(id="r1", contract_id="c1", status="processing"))
+                await session.commit()
+
+            await mark_review_failed("r1", "模型超时", session_factory=queue.session_factory)
+
+            async with queue.session_factory() as session:
+                contract = await session.get(Contract, "c1")
+                review = await session.get(ReviewRecord, "r1")
+                return contract.status, review.status
+
+        contract_status, review_status = asyncio.run(scenario())
+        assert review_status == "failed", "审查未标记失败"
+        assert contract_status == "pending", f"合同状态未恢复: {contract_status}"
+
+        print("    [OK] 合同恢复为待审核")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("审查任务队列基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestReviewJobQueue()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,160 @@
+"""
+位置匹配基本测试
+"""
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.utils.document_parser import DocumentParser
+from backend.utils.location_matcher import LocationMatcher
+
+
+def _make_parsed_doc(texts):
+    """由段落文本构造解析结果"""
+    paragraphs = [{"text": text, "style": "Normal", "index": i} for i, text in enumerate(texts)]
+    return {
+        "paragraphs": paragraphs,
+        "structure": DocumentParser()._detect_structure(paragraphs)
+    }
+
+
+class TestLocationMatcher:
+    """测试位置匹配"""
+
+    def test_exact_match_prefers_hinted_section(self):
+        """测试精确匹配优先在位置提示的条款内查找"""
+        print("  [测试] 精确匹配...")
+
+        matcher = LocationMatcher(_make_parsed_doc([
+            "第一条 付款",
+            "甲方应当在验收后支付货款。",
+            "第二条 违约",
+            "甲方应当在验收后支付货款，逾期按日支付违约金。",
+        ]))
+
+        anywhere = matcher.locate_issue({"original_text": "验收后支付货款", "location_hint": ""})
+        hinted = matcher.locate_issue({"original_text": "验收后支付货款", "location_hint": "第二条"})
+        missing = matcher.locate_issue({"original_text": "不存在的内容", "location_hint": ""})
+
+        assert anywhere["index"] == 1 and anywhere["confidence"] == 1.0, f"全文匹配错误: {anywhere}"
+        assert hinted["index"] == 3, f"未优先匹配提示范围: {hinted}"
+        assert missing is None, "不存在的内容不应定位成功"
+
+        print("    [OK] 精确匹配正确")
+
+    def test_fuzzy_and_batch(self):
+        """测试模糊匹配和批量定位"""
+        print("  [测试] 模糊匹配与批量定位...")
+
+        matcher = LocationMatcher(_make_parsed_doc([
+            "第一条 保密",
+            "双方应对合作中知悉的商业秘密承担保密义务。",
+            "本合同自双方签字盖章之日起生效。",
+        ]))
+
+        issues = [
+            {"original_text": "双方应对合作中知悉的商业秘密承担保密责任。", "location_hint": ""},
+            {"original_text": "本合同自双方签字盖章之日起生效", "location_hint": ""},
+            {"original_text": "本合同自双方签字盖章之日起生效", "location_hint": ""},
+        ]
+        locations = matcher.locate_issues(issues)
+
+        assert locations[0]["index"] == 1 and 0.7 <= locations[0]["confidence"] < 1.0, \
+            f"模糊匹配错误: {locations[0]}"
+        assert locations[1]["index"] == 2 and locations[2] == locations[1], "批量定位结果错误"
+        assert locations[1] is not locations[2], "批量结果不应共享同一对象"
+
+        print("    [OK] 模糊匹配与批量定位正确")
+
+    def test_character_spans(self):
+        """测试字符级范围和跨段落匹配"""
+        print("  [测试] 字符级范围...")
+
+        matcher = LocationMatcher(_make_parsed_doc([
+            "第一条 交付",
+            "乙方应在收到货款后",
+            "",
+            "十日内 交付货物。",
+        ]))
+
+        inner = matcher.locate_issue({"original_text": "收到货款", "location_hint": ""})
+        across = matcher.locate_issue({"original_text": "收到货款后十日内交付", "location_hint": ""})
+
+        assert inner["span"] == LocationMatcher.span(1, 4, 1, 8), f"段内范围错误: {inner}"
+        assert across["index"] == 1 and across["confidence"] == 1.0, f"跨段落匹配错误: {across}"
+        assert across["span"] == LocationMatcher.span(1, 4, 3, 6), f"跨段落范围错误: {across['span']}"
+
+        print("    [OK] 字符级范围正确")
+
+    def test_table_cell_location(self):
+        """测试表格单元格定位"""
+        print("  [测试] 表格单元格定位...")
+
+        parsed_doc = _make_parsed_doc(["第一条 价格"])
+        parsed_doc["tables"] = [{
+            "index": 0,
+            "position": 1,
+            "rows": [["品名", "付款"], ["设备A", "验收后付款"], ["设备B", "验收后付款"], ["设备C", "预付百分之八十"]]
+        }]
+        matcher = LocationMatcher(parsed_doc)
+
+        cell = matcher.locate_issue({"original_text": "百分之八十", "location_hint": ""})
+        row = matcher.locate_issue({"original_text": "| 设备B | 验收后付款 |", "location_hint": ""})
+
+        assert (cell["type"], cell["table"], cell["row"], cell["cell"]) == ("table_cell", 0, 3, 1), f"单元格定位错误: {cell}"
+        assert cell["span"] == {"start": {"offset": 2}, "end": {"offset": 7}}, f"单元格范围错误: {cell['span']}"
+        assert (row["row"], row["cell"]) == (2, 1), f"整行原文应定位到所在行: {row}"
+
+        print("    [OK] 表格单元格定位正确")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("位置匹配基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestLocationMatcher()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,165 @@
+"""
+OOXML 包增量写入基本测试
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.utils.location_matcher import LocationMatcher
+from backend.utils.comment_generator import CommentGenerator
+
+
+class TestPackagePatch:
+    """测试保存带批注文档时的增量写入"""
+
+    def test_save_copies_untouched_members(self):
+        """测试保存时只重写正文和批注相关部分，其余成员原样复制压缩数据"""
+        print("  [测试] 增量保存...")
+
+        import struct
+        import zipfile
+        from docx import Document
+
+        def raw_data(path, name):
+            """成员的原始压缩数据"""
+            with zipfile.ZipFile(path) as archive:
+                info = archive.getinfo(name)
+            with open(path, "rb") as f:
+                f.seek(info.header_offset + 26)
+                name_length, extra_length = struct.unpack("<2H", f.read(4))
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                return f.read(info.compress_size)
+
+        doc = Document()
+        doc.add_paragraph("甲方应当按时支付全部货款。")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            output_path = str(Path(tmp_dir) / "reviewed.docx")
+            doc.save(doc_path)
+
+            generator = CommentGenerator(doc_path)
+            generator.add_issues_as_comments([{
+                "issue": {"problem": "付款时间不明确"},
+                "location": {"type": "paragraph", "index": 0, "span": LocationMatcher.span(0, 4, 0, 8)}
+            }])
+            generator.save(output_path)
+
+            with zipfile.ZipFile(doc_path) as archive:
+                source_names = archive.namelist()
+            with zipfile.ZipFile(output_path) as archive:
+                assert archive.testzip() is None, "输出包校验失败"
+                output_names = archive.namelist()
+
+            rewritten = {
+                "word/document.xml", "word/comments.xml",
+                "word/_rels/document.xml.rels", "[Content_Types].xml"
+            }
+            copied = [name for name in source_names if name not in rewritten]
+            unchanged = all(raw_data(doc_path, name) == raw_data(output_path, name) for name in copied)
+
+            reopened = CommentGenerator(output_path)
+            comment_count = len(reopened._comments_element())
+            text = reopened.doc.paragraphs[0].text
+
+        assert output_names[:len(source_names)] == source_names, "成员顺序改变"
+        assert output_names[len(source_names):] == ["word/comments.xml"], f"新增成员错误: {output_names}"
+        assert copied and unchanged, "未修改的成员没有原样复制"
+        assert comment_count == 1, f"批注数错误: {comment_count}"
+        assert text == "甲方应当按时支付全部货款。", f"正文错误: {text}"
+
+        print("    [OK] 增量保存正确")
+
+    def test_fallback_to_full_save(self):
+        """测试包格式不支持增量写入时改用 python-docx 完整保存"""
+        print("  [测试] 完整保存回退...")
+
+        from docx import Document
+        from backend.utils import comment_generator
+        from backend.utils.ooxml_writer import UnsupportedPackageError
+
+        def unsupported(source_path, output_path, parts):
+            raise UnsupportedPackageError("成员需要 ZIP64: word/media/image1.png")
+
+        doc = Document()
+        doc.add_paragraph("甲方应当按时支付全部货款。")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            doc_path = str(Path(tmp_dir) / "contract.docx")
+            output_path = str(Path(tmp_dir) / "reviewed.docx")
+            doc.save(doc_path)
+
+            generator = CommentGenerator(doc_path)
+            generator.add_issues_as_comments([{
+                "issue": {"problem": "付款时间不明确"},
+                "location": {"type": "paragraph", "index": 0, "span": LocationMatcher.span(0, 4, 0, 8)}
+            }])
+
+            original = comment_generator.patch_package
+            comment_generator.patch_package = unsupported
+            try:
+                generator.save(output_path)
+            finally:
+                comment_generator.patch_package = original
+
+            reopened = CommentGenerator(output_path)
+            comment_count = len(reopened._comments_element())
+            text = reopened.doc.paragraphs[0].text
+
+        assert comment_count == 1, f"回退保存后批注数错误: {comment_count}"
+        assert text == "甲方应当按时支付全部货款。", f"回退保存后正文错误: {text}"
+
+        print("    [OK] 回退到完整保存")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("OOXML 包增量写入基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestPackagePatch()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,120 @@
+"""
+游标分页基本测试
+"""
+import sys
+import asyncio
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.database import Base
+from backend.models.review import Contract
+from backend.utils.pagination import (
+    encode_cursor, decode_cursor, paginate, split_page, InvalidCursorError
+)
+
+
+class TestCursor:
+    """测试游标分页"""
+
+    def test_cursor_round_trip(self):
+        """测试游标编码解码"""
+        print("  [测试] 游标编码解码...")
+
+        created_at = datetime(2026, 1, 1, 8, 30)
+        cursor = encode_cursor([created_at, "id-1"])
+        assert decode_cursor(cursor, [Contract.created_at, Contract.id]) == [created_at, "id-1"], "游标解码错误"
+
+        try:
+            decode_cursor("not-a-cursor", [Contract.created_at, Contract.id])
+            assert False, "无效游标未报错"
+        except InvalidCursorError:
+            pass
+
+        print("    [OK] 游标编码解码正确")
+
+    def test_pages_cover_all_rows(self):
+        """测试逐页翻页不重复、不遗漏（含创建时间相同的行）"""
+        print("  [测试] 逐页翻页...")
+
+        async def scenario():
+            db_path = Path(tempfile.mkdtemp()) / "page.db"
+            engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+            base_time = datetime(2026, 1, 1)
+            async with session_factory() as db:
+                for i in range(7):
+                    db.add(Contract(id=f"c{i}", title=f"合同{i}", created_at=base_time + timedelta(minutes=i // 3)))
+                await db.commit()
+
+                columns = [Contract.created_at, Contract.id]
+                seen, cursor = [], None
+                while True:
+                    query = paginate(select(Contract.id, Contract.created_at), columns, cursor, 3)
+                    rows, cursor = split_page((await db.execute(query)).all(), ["created_at", "id"], 3)
+                    seen.extend(row.id for row in rows)
+                    if not cursor:
+                        return seen
+
+        seen = asyncio.run(scenario())
+        assert seen == ["c6", "c5", "c4", "c3", "c2", "c1", "c0"], f"翻页结果错误: {seen}"
+
+        print("    [OK] 翻页覆盖全部数据且顺序正确")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("游标分页基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestCursor()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
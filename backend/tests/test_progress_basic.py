@@ -0,0 +1,112 @@
+"""
+审查进度推送基本测试
+"""
+import sys
+import asyncio
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.progress import ReviewProgressBroker
+from backend.utils.sse import stream_queue
+
+
+class TestProgressBroker:
+    """测试进度发布/订阅"""
+
+    def test_fan_out_and_late_subscriber(self):
+        """测试事件扇出到所有订阅者，后加入的订阅者先收到最近进度"""
+        print("  [测试] 事件扇出...")
+
+        async def scenario():
+            broker = ReviewProgressBroker()
+            first = broker.subscribe("r1")
+            second = broker.subscribe("r1")
+            other = broker.subscribe("r2")
+
+            broker.publish("r1", "progress", {"stage": "parsed"})
+            late = broker.subscribe("r1")
+            broker.publish("r1", "completed", {"stage": "completed"})
+
+            received = [[q.get_nowait()[1]["stage"] for _ in range(q.qsize())] for q in (first, second, late)]
+            for queue in (first, second, late):
+                broker.unsubscribe("r1", queue)
+            return received, other.qsize(), broker.subscriber_count()
+
+        received, other_size, remaining = asyncio.run(scenario())
+        assert received[0] == ["parsed", "completed"], f"订阅者事件错误: {received[0]}"
+        assert received[1] == received[0], "事件未扇出到所有订阅者"
+        assert received[2] == ["parsed", "completed"], f"后加入的订阅者未收到最近进度: {received[2]}"
+        assert other_size == 0, "收到了其他审查的事件"
+        assert remaining == 1, "取消订阅后订阅数错误"
+
+        print("    [OK] 事件扇出正确")
+
+    def test_stream_ends_on_terminal_event(self):
+        """测试 SSE 流在终止事件后结束"""
+        print("  [测试] SSE 流终止...")
+
+        async def scenario():
+            broker = ReviewProgressBroker()
+            queue = broker.subscribe("r1")
+            broker.publish("r1", "progress", {"stage": "located"})
+            broker.publish("r1", "failed", {"stage": "failed"})
+            broker.publish("r1", "progress", {"stage": "ignored"})
+            return [chunk async for chunk in stream_queue(queue, ("completed", "failed"))]
+
+        chunks = asyncio.run(scenario())
+        assert len(chunks) == 2, f"事件数量错误: {chunks}"
+        assert chunks[1].startswith("event: failed"), "终止事件格式错误"
+
+        print("    [OK] 终止事件后结束")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("审查进度推送基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestProgressBroker()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,197 @@
+"""
+审查报告渲染基本测试
+"""
+import sys
+import asyncio
+import csv
+import io
+import json
+import tempfile
+import zipfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.services.report_service import build_once, stream_and_cache
+from backend.utils import report_renderer
+from backend.utils.comment_generator import CommentGenerator
+
+ISSUES = [
+    {
+        "category": "违约责任",
+        "severity": "高",
+        "location_hint": "第二条",
+        "original_text": "百分之二十的违约金",
+        "problem": "违约金比例过高，<b>可能</b>被调整",
+        "suggestion": "调整为百分之十"
+    },
+    {
+        "category": "付款",
+        "severity": "低",
+        "location_hint": "第一条",
+        "original_text": "三十日内",
+        "problem": "期限偏长",
+        "suggestion": "缩短为十五日"
+    },
+]
+LOCATIONS = [
+    {"type": "paragraph", "index": 3},
+    {"type": "table_cell", "table": 0, "row": 1, "cell": 2},
+]
+
+
+class TestReportRenderer:
+    """测试报告渲染"""
+
+    def test_formats_share_report(self):
+        """测试各格式由同一报告结构生成"""
+        print("  [测试] 多格式渲染...")
+
+        report = report_renderer.build_report(ISSUES, LOCATIONS, "共发现 2 个问题", "采购合同", "r1")
+        assert report["counts"]["high_risk_count"] == 1 and report["counts"]["low_risk_count"] == 1
+
+        data = json.loads(report_renderer.render_report(report, "json"))
+        assert data["review_id"] == "r1"
+        assert [item["location"] for item in data["issues"]] == ["第4段", "表格1 第2行第3列"]
+
+        rows = list(csv.reader(io.StringIO(report_renderer.render_report(report, "csv").decode("utf-8-sig"))))
+        assert len(rows) == 3 and rows[1][2] == "违约责任"
+
+        page = report_renderer.render_report(report, "html").decode("utf-8")
+        assert "&lt;b&gt;可能&lt;/b&gt;" in page and "<b>" not in page
+        assert "### 2. 付款（低风险）" in report_renderer.render_report(report, "md").decode("utf-8")
+
+        with zipfile.ZipFile(io.BytesIO(report_renderer.render_report(report, "docx"))) as archive:
+            assert "百分之二十的违约金" in archive.read("word/document.xml").decode("utf-8")
+
+        text = CommentGenerator.create_review_report(None, ISSUES, "共发现 2 个问题")
+        assert text.startswith("=" * 60) and "1. 违约责任 - 高风险" in text
+        print("    [OK] 多格式渲染正常")
+
+    def test_null_fields(self):
+        """测试模型返回 null 字段时各格式仍能完整渲染"""
+        print("  [测试] null 字段...")
+
+        issues = [{"severity": None, "category": None, "original_text": "原文", "problem": None, "suggestion": 3}]
+        report = report_renderer.build_report(issues, [None])
+        assert report["issues"][0]["severity"] == "" and report["issues"][0]["suggestion"] == "3"
+
+        for fmt in report_renderer.REPORT_FORMATS:
+            assert report_renderer.render_report(report, fmt), f"{fmt} 渲染结果为空"
+        assert report_renderer.render_report(report, "html").decode("utf-8").endswith("</html>\n")
+        print("    [OK] null 字段渲染正常")
+
+    def test_stream_and_cache(self):
+        """测试流式输出同时写入缓存，中途断开时不留下缓存"""
+        print("  [测试] 流式输出与缓存...")
+
+        report = report_renderer.build_report(ISSUES, LOCATIONS)
+
+        async def collect(cache_path, limit=None):
+            chunks = []
+            stream = stream_and_cache(report_renderer.render_json(report), cache_path)
+            async for chunk in stream:
+                chunks.append(chunk)
+                if limit and len(chunks) >= limit:
+                    await stream.aclose()
+                    break
+            return b"".join(chunks)
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache_path = Path(directory) / "report.json"
+            body = asyncio.run(collect(cache_path))
+            assert cache_path.read_bytes() == body
+            assert json.loads(body)["counts"]["total"] == 2
+
+            aborted_path = Path(directory) / "aborted.json"
+            asyncio.run(collect(aborted_path, limit=1))
+            assert not aborted_path.exists()
+            assert sorted(p.name for p in Path(directory).iterdir()) == ["report.json"]
+        print("    [OK] 缓存文件只在完整输出后生成")
+
+    def test_build_once_coalesces(self):
+        """测试同时请求同一文件时只生成一次，生成失败时不留下文件"""
+        print("  [测试] 合并同时到达的生成请求...")
+
+        calls = []
+
+        async def build(output_path):
+            calls.append(output_path)
+            await asyncio.sleep(0.05)
+            with open(output_path, "wb") as f:
+                f.write(b"docx")
+
+        async def failing_build(output_path):
+            calls.append(output_path)
+            await asyncio.sleep(0.05)
+            raise RuntimeError("写入失败")
+
+        async def scenario(path, builder):
+            return await asyncio.gather(*(build_once(path, builder) for _ in range(5)), return_exceptions=True)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "reviewed.docx"
+            results = asyncio.run(scenario(path, build))
+            assert results == [path] * 5 and len(calls) == 1
+            assert path.read_bytes() == b"docx"
+
+            asyncio.run(scenario(path, build))
+            assert len(calls) == 1, "已生成的文件不应重新生成"
+
+            calls.clear()
+            failed_path = Path(directory) / "failed.docx"
+            results = asyncio.run(scenario(failed_path, failing_build))
+            assert len(calls) == 1 and all(isinstance(r, RuntimeError) for r in results)
+            assert sorted(p.name for p in Path(directory).iterdir()) == ["reviewed.docx"]
+        print("    [OK] 5 个并发请求只生成 1 次")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("审查报告渲染基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestReportRenderer()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,426 @@
+"""
+合同审核服务基本测试
+"""
+import sys
+import asyncio
+import json
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.database import Base
+from backend.services.review_service import AIReviewer
+from backend.services.review_cache import ReviewCache
+from backend.utils.document_parser import DocumentParser
+
+
+def _make_issue(section_number: int) -> dict:
+    """构造一个合法的问题数据"""
+    return {
+        "category": "测试",
+        "severity": "中",
+        "location_hint": f"第{section_number}部分",
+        "original_text": f"分段{section_number}原文",
+        "problem": "测试问题",
+        "suggestion": "测试建议"
+    }
+
+
+class FakeReviewer(AIReviewer):
+    """不调用真实模型的审核器，记录并发数"""
+
+    def __init__(self, delay: float = 0.1, max_concurrent: int = 2):
+        super().__init__(use_cache=False)
+        self.delay = delay
+        self.max_concurrent_sections = max_concurrent
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+
+    async def _call_ai_with_retry(self, prompt: str, retry_count: int = 0, usage: dict = None) -> dict:
+        self.calls += 1
+        if usage is not None:
+            # 模拟接口返回的用量：每个字符 1 个 Token
+            usage["prompt_tokens"] = len(prompt)
+            usage["completion_tokens"] = 10
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        # 让后面的分段先返回，检验合并顺序
+        section_number = int(prompt.split("这是合同的 ")[1].split("/")[0])
+        await asyncio.sleep(self.delay / section_number)
+
+        self.in_flight -= 1
+        return {"issues": [_make_issue(section_number)], "summary": ""}
+
+
+class TestSectionReview:
+    """测试分段并发审核"""
+
+    def _sections(self, count: int) -> list:
+        return [
+            {"section_number": i, "text": f"第{i}部分内容", "paragraphs": []}
+            for i in range(1, count + 1)
+        ]
+
+    def test_sections_preserve_order(self):
+        """测试合并结果保持分段顺序"""
+        print("  [测试] 分段结果顺序...")
+        reviewer = FakeReviewer(max_concurrent=4)
+        result = asyncio.run(reviewer._review_sections(self._sections(4)))
+
+        hints = [issue["location_hint"] for issue in result["issues"]]
+        assert hints == ["第1部分", "第2部分", "第3部分", "第4部分"], f"顺序错误: {hints}"
+        assert result["total_issues"] == 4, "问题数量错误"
+
+        print("    [OK] 合并顺序正确")
+
+    def test_concurrency_is_bounded(self):
+        """测试同时进行的请求数不超过上限"""
+        print("  [测试] 并发上限...")
+        reviewer = FakeReviewer(max_concurrent=2)
+        asyncio.run(reviewer._review_sections(self._sections(6)))
+
+        assert reviewer.peak_in_flight <= 2, f"并发超限: {reviewer.peak_in_flight}"
+        assert reviewer.peak_in_flight > 1, "分段没有并发执行"
+
+        print("    [OK] 并发数受限")
+
+    def test_section_stats(self):
+        """测试分段计时信息"""
+        print("  [测试] 分段计时...")
+        reviewer = FakeReviewer(max_concurrent=3)
+        result = asyncio.run(reviewer._review_sections(self._sections(3)))
+
+        stats = result["section_stats"]
+        assert [s["section_number"] for s in stats] == [1, 2, 3], "计时顺序错误"
+        assert all(s["success"] and s["elapsed_seconds"] > 0 for s in stats), "计时信息缺失"
+
+        print("    [OK] 计时信息完整")
+
+    def test_token_usage_report(self):
+        """测试 Token 估算误差汇总"""
+        print("  [测试] Token 估算误差...")
+        reviewer = FakeReviewer(max_concurrent=3)
+        result = asyncio.run(reviewer._review_sections(self._sections(3)))
+
+        usage = result["token_usage"]
+        assert usage["calls"] == 3, f"统计调用数错误: {usage}"
+        assert usage["prompt_tokens"] == sum(s["prompt_tokens"] for s in result["section_stats"]), "实际用量未汇总"
+        expected = (usage["estimated_prompt_tokens"] - usage["prompt_tokens"]) / usage["prompt_tokens"]
+        assert usage["estimate_error"] == round(expected, 4), f"误差计算错误: {usage}"
+
+        print("    [OK] Token 估算误差已汇总")
+
+    def test_failed_section_fails_review(self):
+        """测试有分段失败时整体审核失败，并报告失败的分段"""
+        print("  [测试] 分段失败...")
+
+        class FailingReviewer(FakeReviewer):
+            async def _call_ai_with_retry(self, prompt, retry_count=0, usage=None):
+                if "这是合同的 2/" in prompt:
+                    return {"issues": [], "summary": "AI 调用失败: 429", "error": "429"}
+                return await super()._call_ai_with_retry(prompt, retry_count, usage)
+
+        result = asyncio.run(FailingReviewer(max_concurrent=3)._review_sections(self._sections(3)))
+        assert result["success"] is False, "分段失败时不应视为成功"
+        assert result["failed_sections"] == [2], f"失败分段错误: {result.get('failed_sections')}"
+        assert "429" in result["error"]
+        print("    [OK] 分段失败时整体失败")
+
+    def test_prompt_prefix_identical(self):
+        """测试各分段的系统消息相同，分段内容只出现在用户消息中"""
+        print("  [测试] Prompt 固定前缀...")
+        requests = []
+
+        async def create(**kwargs):
+            requests.append(kwargs["messages"])
+            usage = SimpleNamespace(
+                prompt_tokens=100,
+                completion_tokens=10,
+                prompt_tokens_details=SimpleNamespace(cached_tokens=80)
+            )
+            message = SimpleNamespace(content=json.dumps({"issues": [], "summary": ""}))
+            return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=message)])
+
+        reviewer = AIReviewer(use_cache=False)
+        reviewer.client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+        sections = self._sections(3)
+        sections[2]["context"] = "第2部分内容"
+        result = asyncio.run(reviewer._review_sections(sections))
+
+        systems = {messages[0]["content"] for messages in requests}
+        assert systems == {reviewer.system_prompt}, "各分段的系统消息不同"
+        assert all("部分内容" not in system for system in systems), "系统消息包含分段内容"
+        users = [messages[1]["content"] for messages in requests]
+        for i in range(1, 4):
+            assert any(f"这是合同的 {i}/3 部分" in user and f"第{i}部分内容" in user for user in users), \
+                f"分段 {i} 的用户消息缺少分段内容"
+
+        usage = result["token_usage"]
+        assert usage["cached_prompt_tokens"] == 240, f"缓存命中未统计: {usage}"
+        assert usage["prefix_tokens"] > 0 and all(s["cached_tokens"] == 80 for s in result["section_stats"])
+        print("    [OK] 系统消息逐字节相同，缓存命中已统计")
+
+
+class TestSectionSplit:
+    """测试按 Token 预算分段"""
+
+    def _parsed_doc(self, texts: list) -> dict:
+        parser = DocumentParser()
+        paragraphs = [{"text": text, "style": "Normal", "index": i} for i, text in enumerate(texts)]
+        return {
+            "paragraphs": paragraphs,
+            "structure": parser._detect_structure(paragraphs)
+        }
+
+    def test_sections_packed_to_budget(self):
+        """测试小章节合并、超长章节按段落拆分"""
+        print("  [测试] 分段预算...")
+        parser = DocumentParser()
+        parsed_doc = self._parsed_doc([
+            "第一条 定义", "甲" * 15,
+            "第二条 付款", "乙" * 15,
+            "第三条 违约", "丙" * 60, "丁" * 60,
+        ])
+
+        sections = parser.split_by_sections(parsed_doc, max_tokens=50)
+        starts = [s["paragraphs"][0]["index"] for s in sections]
+
+        # 前两条合计 24 Token 合并为一段，第三条 86 Token 超出预算按段落拆分
+        assert starts == [0, 4, 6], f"分段起点错误: {starts}"
+        assert all(s["tokens"] <= 50 for s in sections), "分段超出预算"
+        assert [s["section_number"] for s in sections] == [1, 2, 3], "分段编号错误"
+
+        print("    [OK] 分段按预算装箱")
+
+    def test_overlap_context(self):
+        """测试分段重叠上下文"""
+        print("  [测试] 分段重叠...")
+        parser = DocumentParser()
+        parsed_doc = self._parsed_doc(["第一条 定义", "甲" * 60, "第二条 付款", "乙" * 60])
+
+        sections = parser.split_by_sections(parsed_doc, max_tokens=50, overlap_tokens=41)
+
+        assert sections[0]["context"] == "", "第一个分段不应有上下文"
+        assert sections[1]["context"] == "甲" * 60, f"上下文错误: {sections[1]['context']}"
+        assert "甲" not in sections[1]["text"], "上下文不应计入分段内容"
+
+        print("    [OK] 重叠上下文正确")
+
+    def test_oversized_table_split_by_rows(self):
+        """测试超出预算的表格按行范围拆分并重复表头"""
+        print("  [测试] 表格分段...")
+        parser = DocumentParser()
+        parsed_doc = self._parsed_doc(["第一条 价格", "第二条 其他"])
+        rows = [["品名", "单价"]] + [[f"设备{i}", f"{i}00元"] for i in range(1, 40)]
+        parsed_doc["tables"] = [{"index": 0, "position": 1, "rows": rows}]
+
+        sections = parser.split_by_sections(parsed_doc, max_tokens=60)
+        pieces = [piece for section in sections for piece in section["tables"]]
+
+        assert pieces[0]["start_row"] == 0 and pieces[-1]["end_row"] == len(rows), f"行范围不完整: {pieces}"
+        assert all(a["end_row"] == b["start_row"] for a, b in zip(pieces, pieces[1:])), "行范围不连续"
+        assert len(pieces) > 1 and all(s["tokens"] <= 60 for s in sections), "表格未按预算拆分"
+        assert all("| 品名 | 单价 |" in s["text"] for s in sections if s["tables"]), "拆分后的片段缺少表头"
+        assert sections[0]["paragraphs"][0]["index"] == 0 and sections[-1]["paragraphs"][-1]["index"] == 1, \
+            "表格未位于所在段落之间"
+
+        print("    [OK] 表格按行范围拆分")
+
+    def test_estimate_tokens(self):
+        """测试 Token 估算"""
+        print("  [测试] Token 估算...")
+        parser = DocumentParser()
+        assert parser.estimate_tokens("合同" * 3) == 4, "中文估算错误"
+        assert parser.estimate_tokens("abcdefgh") == 2, "英文估算错误"
+        assert parser.estimate_tokens("合同abcd") == 2, "混合文本估算错误"
+
+        print("    [OK] Token 估算正确")
+
+
+class TestIncrementalReview:
+    """测试增量审核"""
+
+    def _sections(self, texts: list, start: int = 0) -> list:
+        sections = []
+        index = start
+        for i, text in enumerate(texts, 1):
+            sections.append({
+                "section_number": i,
+                "text": text,
+                "paragraphs": [{"text": text, "style": "Normal", "index": index}]
+            })
+            index += 1
+        return sections
+
+    def test_only_changed_sections_are_reviewed(self):
+        """测试只有修改过的分段调用 AI"""
+        print("  [测试] 增量审核...")
+        reviewer = FakeReviewer(max_concurrent=4)
+
+        first = asyncio.run(reviewer._review_sections(self._sections(["条款A", "条款B", "条款C"])))
+        located = [
+            {"issue": issue, "location": {"type": "paragraph", "index": i}, "located": True}
+            for i, issue in enumerate(first["issues"])
+        ]
+        previous = reviewer.build_section_records(first, located)
+        assert reviewer.calls == 3, "首次审核调用次数错误"
+
+        # 在开头插入一个新分段，修改最后一个分段
+        sections = self._sections(["新增条款", "条款A", "条款B", "条款C（已修改）"], start=0)
+        second = asyncio.run(reviewer._review_sections(sections, previous))
+
+        reused = [s["reused"] for s in second["section_stats"]]
+        assert reused == [False, True, True, False], f"复用情况错误: {reused}"
+        assert reviewer.calls == 5, f"只应审核两个分段，实际调用 {reviewer.calls - 3} 次"
+
+        # 复用的问题按新的段落位置重新定位
+        assert second["location_hints"] == [None, 1, 2, None], f"定位提示错误: {second['location_hints']}"
+
+        print("    [OK] 未修改分段直接复用")
+
+    def test_failed_sections_not_recorded(self):
+        """测试审核失败的分段不记录，下次审核时重新调用 AI"""
+        print("  [测试] 失败分段不复用...")
+
+        class FlakyReviewer(FakeReviewer):
+            fail = True
+
+            async def _call_ai_with_retry(self, prompt, retry_count=0, usage=None):
+                if self.fail and "条款B" in prompt:
+                    self.calls += 1
+                    return {"issues": [], "summary": "AI 调用失败", "error": "timeout"}
+                return await super()._call_ai_with_retry(prompt, retry_count, usage)
+
+        reviewer = FlakyReviewer(max_concurrent=4)
+        sections = self._sections(["条款A", "条款B", "条款C"])
+        first = asyncio.run(reviewer._review_sections(sections))
+        previous = reviewer.build_section_records(first, [
+            {"issue": issue, "location": None, "located": False} for issue in first["issues"]
+        ])
+        assert len(previous) == 2, f"失败分段不应记录: {len(previous)}"
+
+        reviewer.fail = False
+        second = asyncio.run(reviewer._review_sections(sections, previous))
+        reused = [s["reused"] for s in second["section_stats"]]
+        assert reused == [True, False, True], f"失败分段应重新审核: {reused}"
+        assert second["success"], "重新审核后应成功"
+
+        print("    [OK] 失败分段重新审核")
+
+
+class TestReviewCache:
+    """测试审核结果缓存"""
+
+    async def _make_cache(self) -> ReviewCache:
+        db_path = Path(tempfile.mkdtemp()) / "cache.db"
+        engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        return ReviewCache(session_factory=async_sessionmaker(engine, expire_on_commit=False))
+
+    def test_unchanged_sections_hit_cache(self):
+        """测试未修改的分段命中缓存"""
+        print("  [测试] 分段缓存命中...")
+
+        async def scenario():
+            reviewer = FakeReviewer(max_concurrent=4)
+            reviewer.cache = await self._make_cache()
+            sections = [
+                {"section_number": i, "text": f"第{i}部分内容", "paragraphs": []}
+                for i in range(1, 4)
+            ]
+            await reviewer._review_sections(sections)
+
+            # 修改第3部分，前两部分只有空白差异
+            sections[0]["text"] = "  第1部分内容 "
+            sections[2]["text"] = "第3部分内容（已修改）"
+            return await reviewer._review_sections(sections)
+
+        result = asyncio.run(scenario())
+        cached = [s["cached"] for s in result["section_stats"]]
+        assert cached == [True, True, False], f"缓存命中情况错误: {cached}"
+        assert result["total_issues"] == 3, "缓存结果未合并"
+
+        print("    [OK] 未修改分段命中缓存")
+
+    def test_size_bounded_eviction(self):
+        """测试超出容量时淘汰旧条目"""
+        print("  [测试] 缓存容量淘汰...")
+
+        async def scenario():
+            cache = await self._make_cache()
+            cache.max_entries = 2
+            for i in range(3):
+                await cache.set(f"文本{i}", "v1", "section", {"issues": [], "summary": str(i)})
+            return [await cache.get(f"文本{i}", "v1") for i in range(3)]
+
+        results = asyncio.run(scenario())
+        assert results[0] is None, "最旧条目未被淘汰"
+        assert results[2]["summary"] == "2", "最新条目丢失"
+
+        print("    [OK] 超出容量时淘汰最久未访问条目")
+
+    def test_prompt_version_in_key(self):
+        """测试 Prompt 版本参与缓存键"""
+        print("  [测试] Prompt 版本隔离...")
+        cache = ReviewCache(session_factory=object)
+        assert cache.make_key("合同", "v1") != cache.make_key("合同", "v2"), "版本未参与缓存键"
+        assert cache.make_key("合同 内容", "v1") == cache.make_key(" 合同\n内容 ", "v1"), "空白未规范化"
+
+        print("    [OK] 缓存键包含 Prompt 版本")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("合同审核服务基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestSectionReview(), TestSectionSplit(), TestIncrementalReview(), TestReviewCache()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
@@ -0,0 +1,164 @@
+"""
+全文检索服务基本测试
+"""
+import sys
+import asyncio
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from backend.database import Base
+from backend.models.review import Contract
+from backend.models.contract_writing import ContractClause
+from backend.models import search as search_models
+from backend.services.search_service import (
+    tokenize, build_match_query, index_document, remove_document, search, ensure_search_index
+)
+
+
+async def _make_session_factory():
+    """创建使用临时数据库的会话工厂"""
+    db_path = Path(tempfile.mkdtemp()) / "search.db"
+    engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return async_sessionmaker(engine, expire_on_commit=False)
+
+
+class TestTokenize:
+    """测试分词"""
+
+    def test_bigram_and_words(self):
+        """测试中文二元组切分和英文单词切分"""
+        print("  [测试] 分词...")
+
+        assert tokenize("违约金") == ["违约", "约金", "金"], "中文二元组切分错误"
+        assert tokenize("甲方 ABC公司") == ["甲方", "方", "abc", "公司", "司"], "混合文本切分错误"
+        assert tokenize("甲方，乙方", query=True) == ["甲方", "方", "乙方"], "查询词末尾不应补单字"
+        assert build_match_query("违约金 甲方") == '"违约 约金" AND "甲方"', "查询表达式错误"
+        assert build_match_query("罚") == '"罚"*', "单字查询应为前缀匹配"
+        assert build_match_query("甲方，乙") == '"甲方 方 乙"*', "以单字结尾的词应按前缀匹配"
+        assert build_match_query("，。") is None, "无可检索内容时应返回 None"
+
+        print("    [OK] 分词正确")
+
+
+class TestSearch:
+    """测试检索"""
+
+    def test_ranked_search_with_snippet(self):
+        """测试检索排序、摘要和增量更新"""
+        print("  [测试] 检索与增量索引...")
+
+        async def scenario():
+            session_factory = await _make_session_factory()
+            async with session_factory() as db:
+                db.add(Contract(id="c1", title="采购合同", content_text="乙方逾期交货的，应当支付违约金。"))
+                db.add(Contract(id="c2", title="违约金条款汇总", content_text="违约金不超过合同总额的百分之二十。"))
+                db.add(Contract(id="c3", title="租赁合同", content_text="租金按月支付。", user_id="other"))
+                await db.commit()
+
+            # 已有数据在启动时回填
+            await ensure_search_index(session_factory)
+
+            async with session_factory() as db:
+                first = await search(db, "违约金", user_id="default_user")
+                other_user = await search(db, "租金", user_id="default_user")
+
+                await index_document(db, "contract", "c1", "采购合同", "乙方逾期交货的，应当赔偿损失。", "default_user")
+                db.add(ContractClause(id="k1", title="保密条款", content="双方应对违约金数额保密。"))
+                await index_document(db, "clause", "k1", "保密条款", "双方应对违约金数额保密。")
+                await remove_document(db, "contract", "c2")
+                await db.commit()
+
+                second = await search(db, "违约金", user_id="default_user")
+            return first, other_user, second
+
+        first, other_user, second = asyncio.run(scenario())
+
+        assert [hit["doc_id"] for hit in first["hits"]] == ["c2", "c1"], f"排序错误: {first['hits']}"
+        assert "<mark>违约金</mark>" in first["hits"][1]["snippet"], "摘要未标出匹配词"
+        assert other_user["total"] == 0, "返回了其他用户的合同"
+        assert [hit["doc_id"] for hit in second["hits"]] == ["k1"], f"增量更新未生效: {second['hits']}"
+
+        print("    [OK] 排序、摘要和增量更新正确")
+
+    def test_single_character_at_end_of_run(self):
+        """测试单字查询命中位于中文片段末尾的字，短语查询不受末尾单字影响"""
+        print("  [测试] 片段末尾的单字...")
+
+        async def scenario():
+            session_factory = await _make_session_factory()
+            async with session_factory() as db:
+                db.add(Contract(id="c1", title="采购合同", content_text="甲方：某某公司"))
+                db.add(Contract(id="c2", title="租赁合同", content_text="出租方为乙方，承租方另行约定。"))
+                db.add(Contract(id="c3", title="服务合同", content_text="服务期限一年。"))
+                await db.commit()
+            await ensure_search_index(session_factory)
+
+            async with session_factory() as db:
+                single = await search(db, "方", user_id="default_user")
+                phrase = await search(db, "乙方，承租", user_id="default_user")
+                inner = await search(db, "租方", user_id="default_user")
+            return single, phrase, inner
+
+        single, phrase, inner = asyncio.run(scenario())
+
+        assert sorted(hit["doc_id"] for hit in single["hits"]) == ["c1", "c2"], f"单字查询结果错误: {single['hits']}"
+        assert [hit["doc_id"] for hit in phrase["hits"]] == ["c2"], f"跨标点短语查询失败: {phrase['hits']}"
+        assert [hit["doc_id"] for hit in inner["hits"]] == ["c2"], f"片段内短语查询失败: {inner['hits']}"
+
+        print("    [OK] 片段末尾的单字可以检索")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("全文检索服务基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestTokenize(), TestSearch()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
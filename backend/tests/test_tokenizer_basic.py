@@ -0,0 +1,157 @@
+"""
+Token 计数基本测试
+"""
+import sys
+import tempfile
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.utils.document_parser import DocumentParser
+from backend.utils.tokenizer import HeuristicTokenizer, character_features, find_tokenizer_file
+
+
+def _actual_tokens(text: str) -> int:
+    """模拟接口计数：中文 0.9、字母 0.3、数字 0.5、其他 0.3 Token/字符，固定开销 20"""
+    cjk, alpha, digit, other = character_features(text)
+    return int(0.9 * cjk + 0.3 * alpha + 0.5 * digit + 0.3 * other + 20)
+
+
+class TestHeuristicTokenizer:
+    """测试估算与校准"""
+
+    def test_default_coefficients(self):
+        """测试未校准时沿用默认估算"""
+        print("  [测试] 默认估算...")
+        tokenizer = HeuristicTokenizer()
+
+        assert character_features("合同ab12，") == [2, 2, 2, 1], "字符分类错误"
+        assert tokenizer.count("合同" * 3) == 4, "中文估算错误"
+        assert tokenizer.count("abcdefgh") == 2, "英文估算错误"
+
+        print("    [OK] 默认估算正确")
+
+    def test_calibration_reduces_error(self):
+        """测试根据实际用量校准后误差下降"""
+        print("  [测试] 用量校准...")
+        tokenizer = HeuristicTokenizer(min_samples=3)
+        # 各类字符比例不同的 Prompt
+        prompts = [
+            "合同条款" * (30 * a) + "Party A shall pay " * (6 * b) + "20241231，" * (8 * c)
+            for a, b, c in [(1, 1, 1), (4, 1, 1), (1, 4, 1), (1, 1, 4), (3, 2, 0), (0, 3, 2), (2, 0, 3), (5, 5, 5)]
+        ]
+        probe = "甲方应于2025年1月1日前支付 Service Fee 共计 100000 元。" * 20
+
+        before = abs(tokenizer.count_prompt(probe) - _actual_tokens(probe)) / _actual_tokens(probe)
+        for prompt in prompts:
+            tokenizer.observe(prompt, _actual_tokens(prompt))
+        after = abs(tokenizer.count_prompt(probe) - _actual_tokens(probe)) / _actual_tokens(probe)
+
+        stats = tokenizer.get_stats()
+        assert stats["samples"] == len(prompts), f"样本数错误: {stats}"
+        assert after < 0.05 < before, f"校准未降低误差: {before:.3f} -> {after:.3f}"
+        assert abs(stats["coefficients"]["cjk"] - 0.9) < 0.05, f"中文权重未收敛: {stats['coefficients']}"
+
+        print("    [OK] 校准后误差下降")
+
+    def test_calibration_disabled(self):
+        """测试关闭校准时只统计误差"""
+        print("  [测试] 关闭校准...")
+        tokenizer = HeuristicTokenizer(calibrate=False, min_samples=1)
+        tokenizer.observe("合同" * 100, 500)
+
+        stats = tokenizer.get_stats()
+        assert stats["samples"] == 1 and stats["last_error"] < 0, f"误差统计错误: {stats}"
+        assert stats["coefficients"]["cjk"] == round(1 / 1.5, 4), "关闭校准时权重不应变化"
+
+        print("    [OK] 关闭校准时权重不变")
+
+    def test_split_uses_calibrated_counts(self):
+        """测试分段使用审核进程校准后的计数，而不是解析时（未校准）的估算"""
+        print("  [测试] 分段使用校准计数...")
+        texts = ["第一条 定义", "甲" * 60, "第二条 付款", "乙" * 60]
+        paragraphs = [{"text": text, "style": "Normal", "index": i} for i, text in enumerate(texts)]
+        # 解析在进程池中进行，使用默认权重
+        parsed_doc = DocumentParser(HeuristicTokenizer())._build_result(paragraphs, [])
+
+        calibrated = HeuristicTokenizer(min_samples=3)
+        for n in (50, 100, 200, 400):
+            calibrated.observe("合同" * n, int(2 * n * 0.9))
+        parser = DocumentParser(calibrated)
+
+        assert parsed_doc["total_tokens"] < 100, f"解析时估算错误: {parsed_doc['total_tokens']}"
+        assert parser.should_split(parsed_doc, 100), "分段判断未使用校准后的计数"
+        assert len(parser.split_by_sections(parsed_doc, 100)) == 2, "分段未使用校准后的计数"
+
+        print("    [OK] 分段使用校准计数")
+
+
+class TestTokenizerSelection:
+    """测试 tokenizer 文件查找"""
+
+    def test_find_tokenizer_file(self):
+        """测试按模型名查找本地 tokenizer 文件"""
+        print("  [测试] tokenizer 文件查找...")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            assert find_tokenizer_file("qwen-plus", tmp_dir) is None, "不存在的文件不应返回"
+
+            model_dir = Path(tmp_dir) / "qwen-plus"
+            model_dir.mkdir()
+            (model_dir / "tokenizer.json").write_text("{}", encoding="utf-8")
+            found = find_tokenizer_file("qwen-plus", tmp_dir)
+
+        assert found and found.endswith("tokenizer.json"), f"查找结果错误: {found}"
+
+        print("    [OK] tokenizer 文件查找正确")
+
+
+def run_tests():
+    """运行所有测试"""
+    print("=" * 60)
+    print("Token 计数基本测试")
+    print("=" * 60)
+    print()
+
+    test_classes = [TestHeuristicTokenizer(), TestTokenizerSelection()]
+    total_tests = 0
+    passed_tests = 0
+    failed_tests = 0
+
+    for test_class in test_classes:
+        class_name = test_class.__class__.__name__
+        print(f"[{class_name}]")
+
+        test_methods = [method for method in dir(test_class) if method.startswith('test_')]
+
+        for method_name in test_methods:
+            total_tests += 1
+            try:
+                method = getattr(test_class, method_name)
+                method()
+                passed_tests += 1
+            except AssertionError as e:
+                failed_tests += 1
+                print(f"    [FAILED] {method_name}: {str(e)}")
+            except Exception as e:
+                failed_tests += 1
+                print(f"    [ERROR] {method_name}: {str(e)}")
+
+        print()
+
+    print("=" * 60)
+    print(f"测试结果: {passed_tests}/{total_tests} 通过")
+    if failed_tests > 0:
+        print(f"失败: {failed_tests}")
+    else:
+        print("所有测试通过!")
+    print("=" * 60)
+
+    return failed_tests == 0
+
+
+if __name__ == "__main__":
+    success = run_tests()
+    sys.exit(0 if success else 1)
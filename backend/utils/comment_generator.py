@@ -3,32 +3,73 @@
 """
 from docx import Document
 from docx.shared import RGBColor, Pt
-from docx.oxml import OxmlElement
+from docx.opc.constants import CONTENT_TYPE as CT, RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import PartFactory, XmlPart
+from docx.oxml import OxmlElement, parse_xml
 from docx.oxml.ns import qn
-from typing import Dict, List
-from xml.etree import ElementTree as ET
-import re
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Tuple
+import copy
+import logging
 import os
-import tempfile
 import zipfile
+from backend.utils.report_renderer import build_report, render_txt
+from backend.utils.ooxml_writer import (
+    CONTENT_TYPES_PART,
+    UnsupportedPackageError,
+    add_content_type_override,
+    patch_package
+)
+
+logger = logging.getLogger(__name__)
+
+# 可以按字符拆分的 run 子元素（拆分时按文本重建）
+_SPLITTABLE_RUN_CHILDREN = {qn("w:rPr"), qn("w:t"), qn("w:tab")}
+
+# 新建批注部分的内容
+_COMMENTS_XML = (
+    '<w:comments xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"/>'
+)
+
+# python-docx 默认把批注部分当作二进制部分加载，注册为 XML 部分后已有批注可以直接追加
+PartFactory.part_type_for.setdefault(CT.WML_COMMENTS, XmlPart)
 
 
 class CommentGenerator:
     """批注生成器 - 完整实现Word批注功能"""
 
-    def __init__(self, doc_path: str):
+    def __init__(self, doc_path: str, parsed_doc: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            doc_path: 文档路径
+            parsed_doc: 上传时生成的解析结果（可选），用于段落文本判断，
+                避免再次从 XML 中提取段落文本
+        """
         self.doc_path = doc_path
         self.doc = Document(doc_path)
-        self._comment_id_start = 0
-        self._ensure_comments_part()
-
-    def _ensure_comments_part(self):
-        """确保文档有批注部分"""
-        # 批注功能会在实际添加批注时自动创建
-        # 这里不需要预先检查
-        pass
-
-    def add_comment(self, paragraph_index: int, text: str, author: str = "AI审核") -> bool:
+        self.parsed_doc = parsed_doc
+        # 段落代理列表只构建一次（doc.paragraphs 每次访问都会重建）
+        self._paragraphs = self.doc.paragraphs
+        # 表格代理列表在首次添加表格批注时构建
+        self._tables = None
+        # 各表格之前的正文段落数（批注排序用），首次需要时获取
+        self._table_positions = None
+        # 批注部分及其根元素（w:comments）在首次添加批注时查找或创建
+        self._comments_part = None
+        self._comments = None
+        self._comments_resolved = False
+        self._comments_created = False
+        self._next_comment_id = 0
+
+    def add_comment(
+        self,
+        paragraph_index: int,
+        text: str,
+        author: str = "AI审核",
+        span: Optional[Dict[str, Any]] = None
+    ) -> bool:
         """
         为指定段落添加批注
 
@@ -36,229 +77,455 @@ class CommentGenerator:
             paragraph_index: 段落索引
             text: 批注内容
             author: 批注作者
+            span: 位置匹配器返回的字符级范围（可选），批注锚定到该范围的文字，
+                缺失或与文档不符时锚定整个段落
 
         Returns:
             是否成功添加
         """
-        if paragraph_index >= len(self.doc.paragraphs):
+        bounds = self._paragraph_bounds(paragraph_index, span)
+        if bounds is None:
             return False
 
-        paragraph = self.doc.paragraphs[paragraph_index]
+        self._add_comment_to_bounds(bounds, text, author)
+        return True
 
-        # 如果段落为空，跳过
-        if not paragraph.text.strip():
-            return False
+    def add_table_comment(
+        self,
+        table_index: int,
+        row_index: int,
+        cell_index: int,
+        text: str,
+        author: str = "AI审核",
+        span: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        为表格单元格添加批注
 
-        # 先尝试XML批注，失败则使用备用方案
-        try:
-            if len(paragraph.runs) == 0:
-                run = paragraph.add_run(paragraph.text)
-                paragraph.clear()
-                paragraph.add_run(run.text)
-                paragraph = self.doc.paragraphs[paragraph_index]
-
-            # 尝试添加XML批注
-            self._add_comment_to_paragraph(paragraph, text, author)
-        except Exception as e:
-            print(f"XML批注失败，使用备用方案: {e}")
-            # 使用备用方案
-            self._add_comment_inline(paragraph, text, author)
+        Args:
+            table_index: 表格索引
+            row_index: 行索引
+            cell_index: 单元格在行中的索引（横向合并的单元格按跨越的列数计）
+            text: 批注内容
+            author: 批注作者
+            span: 单元格文本内的字符范围 {"start": {"offset"}, "end": {"offset"}}（可选），
+                缺失或无效时锚定整个单元格
+
+        Returns:
+            是否成功添加
+        """
+        bounds = self._table_bounds(table_index, row_index, cell_index, span)
+        if bounds is None:
+            return False
 
+        self._add_comment_to_bounds(bounds, text, author)
         return True
 
-    def _add_comment_to_paragraph(self, paragraph, text: str, author: str):
-        """为段落添加批注 - 使用更可靠的XML方式"""
-        p_element = paragraph._element
+    def add_issues_as_comments(self, issues_with_location: List[Dict], author: str = "AI审核") -> int:
+        """
+        批量添加问题批注
 
-        # 找到所有 w:r (run) 元素
-        run_elements = p_element.findall(qn("w:r"), p_element.nsmap)
-        if not run_elements or len(run_elements) == 0:
-            raise Exception("没有找到run元素")
+        先解析所有问题的字符范围并按文档顺序排序，按顺序一次性生成批注内容（批注ID与文档顺序一致），
+        再从后往前插入范围标记：备用方案插入的说明文字只影响其后的偏移，不会使尚未处理的范围错位。
 
-        # 选择第一个run来添加批注
-        target_run = run_elements[0]
+        Args:
+            issues_with_location: locate_issues 的返回结果
+            author: 批注作者
 
-        # 为目标run添加背景色高亮
-        # 获取或创建run的rPr属性
-        run_props = target_run.find(qn("w:rPr"), target_run.nsmap)
-        if run_props is None:
-            run_props = OxmlElement("w:rPr")
-            target_run.insert(0, run_props)
-        else:
-            # 清空现有属性
-            for child in list(run_props):
-                run_props.remove(child)
+        Returns:
+            成功添加的批注数
+        """
+        # (排序键, 字符范围, 批注内容)
+        targets = []
+        for item in issues_with_location:
+            issue = item.get("issue", {})
+            location = item.get("location")
+            if not location:
+                continue
+
+            comment_text = (
+                f"【{issue.get('severity', '中')}风险】{issue.get('problem', '')}\n"
+                f"建议：{issue.get('suggestion', '')}"
+            )
+
+            if location.get("type") == "table_cell":
+                bounds = self._table_bounds(
+                    location["table"], location["row"], location["cell"], location.get("span")
+                )
+                # 表格位于其之前的正文段落之后、下一个段落之前
+                key = (
+                    self._table_position(location["table"]), 0,
+                    location["table"], location["row"], location["cell"], _span_start(location)[1]
+                )
+            else:
+                paragraph_index = location.get("index", -1)
+                bounds = self._paragraph_bounds(paragraph_index, location.get("span"))
+                start_paragraph, start_offset = _span_start(location, paragraph_index)
+                key = (start_paragraph, 1, start_offset)
+
+            if bounds is not None:
+                targets.append((key, bounds, comment_text))
+
+        targets.sort(key=lambda target: target[0])
+
+        comments = self._comments_element()
+        elements = (
+            [self._append_comment(comments, text, author) for _, _, text in targets]
+            if comments is not None else [None] * len(targets)
+        )
+
+        inline = 0
+        for (_, bounds, text), comment in zip(reversed(targets), reversed(elements)):
+            if comment is not None and self._mark_range(bounds, comment.get(qn("w:id"))):
+                continue
+            if comment is not None:
+                comments.remove(comment)
+            self._add_comment_inline(bounds, text, author)
+            inline += 1
+
+        logger.info(f"已添加 {len(targets)} 条批注（其中 {inline} 条使用内联说明）")
+        return len(targets)
+
+    def _add_comment_to_bounds(self, bounds: Tuple[List[Any], int, int], text: str, author: str):
+        """为字符范围添加批注，无法写入批注部分或范围内没有 run 时使用备用方案"""
+        comments = self._comments_element()
+        if comments is not None:
+            comment = self._append_comment(comments, text, author)
+            if self._mark_range(bounds, comment.get(qn("w:id"))):
+                return
+            comments.remove(comment)
+        self._add_comment_inline(bounds, text, author)
+
+    def _paragraph_bounds(self, paragraph_index: int, span: Optional[Dict[str, Any]]) -> Optional[Tuple[List[Any], int, int]]:
+        """段落批注的字符范围，段落不存在或为空时返回 None"""
+        if not (0 <= paragraph_index < len(self._paragraphs)):
+            return None
 
-        # 添加背景色为黄色
-        # 使用shd元素添加底纹
+        # 如果段落为空，跳过
+        if not self._paragraph_text(paragraph_index, self._paragraphs[paragraph_index]).strip():
+            return None
+
+        return self._resolve_span(paragraph_index, span)
+
+    def _table_bounds(
+        self,
+        table_index: int,
+        row_index: int,
+        cell_index: int,
+        span: Optional[Dict[str, Any]]
+    ) -> Optional[Tuple[List[Any], int, int]]:
+        """单元格批注的字符范围（单元格文本偏移换算为段落内偏移），单元格不存在或为空时返回 None"""
+        if self._tables is None:
+            self._tables = self.doc.tables
+
+        try:
+            cell = self._tables[table_index].rows[row_index].cells[cell_index]
+        except IndexError:
+            return None
+
+        p_elements = [paragraph._element for paragraph in cell.paragraphs]
+        if not p_elements or not cell.text.strip():
+            return None
+
+        # 单元格文本为各段落以换行连接
+        lengths = [len(p_element.text) for p_element in p_elements]
+        cell_length = sum(lengths) + len(lengths) - 1
+
+        start, end = 0, cell_length
+        if span:
+            try:
+                start, end = int(span["start"]["offset"]), int(span["end"]["offset"])
+            except (KeyError, TypeError, ValueError):
+                start, end = 0, cell_length
+            if not (0 <= start < end <= cell_length):
+                start, end = 0, cell_length
+
+        # 单元格文本偏移换算为 (段落, 段内偏移)
+        first, last = None, None
+        position = 0
+        for k, length in enumerate(lengths):
+            if first is None and start <= position + length:
+                first = (k, start - position)
+            if end <= position + length:
+                last = (k, end - position)
+                break
+            position += length + 1
+
+        return p_elements[first[0]:last[0] + 1], first[1], last[1]
+
+    def _table_position(self, table_index: int) -> int:
+        """表格之前的正文段落数，优先使用解析结果"""
+        if self._table_positions is None:
+            tables = (self.parsed_doc or {}).get("tables") or []
+            if tables and all("position" in table for table in tables):
+                self._table_positions = [table["position"] for table in tables]
+            else:
+                self._table_positions = []
+                paragraph_count = 0
+                for child in self.doc.element.body.iterchildren():
+                    if child.tag == qn("w:p"):
+                        paragraph_count += 1
+                    elif child.tag == qn("w:tbl"):
+                        self._table_positions.append(paragraph_count)
+
+        if 0 <= table_index < len(self._table_positions):
+            return self._table_positions[table_index]
+        return len(self._paragraphs)
+
+    def _paragraph_text(self, paragraph_index: int, paragraph) -> str:
+        """获取段落文本，优先使用解析结果"""
+        if self.parsed_doc:
+            paragraphs = self.parsed_doc.get("paragraphs", [])
+            if paragraph_index < len(paragraphs):
+                return paragraphs[paragraph_index]["text"]
+        return paragraph.text
+
+    def _resolve_span(self, paragraph_index: int, span: Optional[Dict[str, Any]]) -> Tuple[List[Any], int, int]:
+        """
+        校验字符级范围
+
+        Returns:
+            (范围内的段落元素, 起始段落内的偏移, 结束段落内的偏移)，范围无效时为整个段落
+        """
+        p_element = self._paragraphs[paragraph_index]._element
+        whole = ([p_element], 0, len(p_element.text))
+        if not span:
+            return whole
+
+        try:
+            start_paragraph = int(span["start"]["paragraph"])
+            start_offset = int(span["start"]["offset"])
+            end_paragraph = int(span["end"]["paragraph"])
+            end_offset = int(span["end"]["offset"])
+        except (KeyError, TypeError, ValueError):
+            return whole
+
+        if not (0 <= start_paragraph <= end_paragraph < len(self._paragraphs)):
+            return whole
+        if start_offset < 0 or end_offset > len(self._paragraphs[end_paragraph]._element.text):
+            return whole
+        if start_offset > len(self._paragraphs[start_paragraph]._element.text):
+            return whole
+        if start_paragraph == end_paragraph and start_offset >= end_offset:
+            return whole
+
+        p_elements = [paragraph._element for paragraph in self._paragraphs[start_paragraph:end_paragraph + 1]]
+        return p_elements, start_offset, end_offset
+
+    @staticmethod
+    def _run_offsets(p_element) -> List[Tuple[Any, int, int]]:
+        """段落中各 run 的字符范围 [(run, 起始偏移, 结束偏移), ...]，与段落文本的偏移一致"""
+        offsets = []
+        position = 0
+        for run in p_element.xpath("w:r | w:hyperlink/w:r"):
+            length = len(run.text)
+            offsets.append((run, position, position + length))
+            position += length
+        return offsets
+
+    def _split_at(self, p_element, offset: int):
+        """在段落的字符偏移处拆分 run，使该偏移落在 run 边界上"""
+        for run, run_start, run_end in self._run_offsets(p_element):
+            if run_start < offset < run_end:
+                # 只拆分纯文本 run，含图片、域代码等内容的 run 保持完整
+                if any(child.tag not in _SPLITTABLE_RUN_CHILDREN for child in run):
+                    return
+                text = run.text
+                tail = copy.deepcopy(run)
+                run.text = text[:offset - run_start]
+                tail.text = text[offset - run_start:]
+                run.addnext(tail)
+                return
+
+    def _span_runs(self, bounds: Tuple[List[Any], int, int]) -> List[Any]:
+        """拆分范围两端的 run，返回范围内的所有 run（按文档顺序）"""
+        p_elements, start_offset, end_offset = bounds
+        self._split_at(p_elements[0], start_offset)
+        self._split_at(p_elements[-1], end_offset)
+
+        # 无法拆分的 run 与范围有重叠时整体计入
+        runs = []
+        last = len(p_elements) - 1
+        for position, p_element in enumerate(p_elements):
+            lower = start_offset if position == 0 else 0
+            for run, run_start, run_end in self._run_offsets(p_element):
+                if position == last and run_start >= end_offset:
+                    break
+                if run_end > lower and run_end > run_start:
+                    runs.append(run)
+        return runs
+
+    @staticmethod
+    def _highlight(run):
+        """为 run 添加黄色底纹（保留原有格式）"""
+        run_props = run.get_or_add_rPr()
+        for shd in run_props.findall(qn("w:shd")):
+            run_props.remove(shd)
         shd = OxmlElement("w:shd")
+        shd.set(qn("w:val"), "clear")
         shd.set(qn("w:fill"), "FFFF00")  # 黄色背景
         run_props.append(shd)
 
-        # 创建批注范围开始标记
-        comment_start = OxmlElement("w:commentRangeStart")
-        comment_start.set(qn("w:id"), str(self._comment_id_start))
+    def _mark_range(self, bounds: Tuple[List[Any], int, int], comment_id: str) -> bool:
+        """
+        在字符范围两端插入批注范围标记和批注引用，并高亮范围内的文字
 
-        # 创建批注范围结束标记
+        Returns:
+            是否成功（范围内没有 run 时返回 False，正文不做修改）
+        """
+        runs = self._span_runs(bounds)
+        if not runs:
+            return False
+
+        for run in runs:
+            self._highlight(run)
+
+        comment_start = OxmlElement("w:commentRangeStart")
+        comment_start.set(qn("w:id"), comment_id)
         comment_end = OxmlElement("w:commentRangeEnd")
-        comment_end.set(qn("w:id"), str(self._comment_id_start))
+        comment_end.set(qn("w:id"), comment_id)
 
-        # 创建批注引用run
-        comment_ref_run = OxmlElement("w:r")
+        # 批注引用 run（正文中的批注标记）
+        reference_run = OxmlElement("w:r")
         r_pr = OxmlElement("w:rPr")
         r_style = OxmlElement("w:rStyle")
         r_style.set(qn("w:val"), "CommentReference")
         r_pr.append(r_style)
-        comment_ref_run.append(r_pr)
+        reference_run.append(r_pr)
+        reference = OxmlElement("w:commentReference")
+        reference.set(qn("w:id"), comment_id)
+        reference_run.append(reference)
 
-        comment_ref = OxmlElement("w:annotationRef")
-        comment_ref.set(qn("w:id"), str(self._comment_id_start))
-        comment_ref_run.append(comment_ref)
+        # 范围开始标记放在第一个 run 之前，结束标记和批注引用放在最后一个 run 之后
+        runs[0].addprevious(comment_start)
+        runs[-1].addnext(comment_end)
+        comment_end.addnext(reference_run)
 
-        # 找到目标run的索引位置
-        run_index = list(p_element).index(target_run)
-
-        # 正确的插入顺序：
-        # 1. 在目标run之前插入commentRangeStart
-        p_element.insert(run_index, comment_start)
-
-        # 2. 插入批注引用run（在目标run之后）
-        # 由于插入了comment_start，索引需要+1
-        p_element.insert(run_index + 2, comment_ref_run)
-
-        # 3. 插入commentRangeEnd（在批注引用之后）
-        p_element.insert(run_index + 3, comment_end)
-
-        # 添加批注内容到文档 - 如果这失败，抛出异常
-        self._add_comment_to_document(self._comment_id_start, author, text)
+        logger.debug(f"批注标记已添加 (ID: {comment_id})")
+        return True
 
-        self._comment_id_start += 1
+    def _comments_element(self):
+        """
+        批注部分的根元素 w:comments（只查找或创建一次）
 
-        print(f"✓ 批注标记已添加 (ID: {self._comment_id_start - 1})")
+        文档已有批注部分时沿用，批注ID从已有的最大ID之后开始；没有时创建 /word/comments.xml
+        并与正文建立关系。创建失败时返回 None，批注改用备用方案。
+        """
+        if self._comments_resolved:
+            return self._comments
+        self._comments_resolved = True
 
-    def _add_comment_to_document(self, comment_id: int, author: str, text: str):
-        """将批注添加到文档的批注部分 - 使用正确的方法"""
+        doc_part = self.doc.part
         try:
-            from docx.oxml import parse_xml
-            from docx.oxml.ns import qn
-
-            # 获取文档的main part
-            doc_part = self.doc.part
-
-            # 尝试获取现有的批注部分
             comments_part = None
-
-            # 遍历关系查找批注部分
             for rel in doc_part.rels.values():
-                if rel.reltype == "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments":
+                if rel.reltype == RT.COMMENTS and not rel.is_external:
                     comments_part = rel.target_part
                     break
 
-            # 如果批注部分不存在，创建新的
             if comments_part is None:
-                # 创建新的批注部分 - 使用正确的方法
-                # 添加到document.xml.rels中
-                rel_id = doc_part.rels.add(
-                    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments",
-                    "http://schemas.openxmlformats.org/officeDocument/2006/relationships/comments"
+                comments_part = XmlPart(
+                    PackURI("/word/comments.xml"),
+                    CT.WML_COMMENTS,
+                    parse_xml(_COMMENTS_XML),
+                    doc_part.package
                 )
+                doc_part.relate_to(comments_part, RT.COMMENTS)
+                self._comments_created = True
 
-                # 创建comments.xml内容
-                comments_xml = '<w:comments xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"/>'
-                comments_element = parse_xml(comments_xml)
-
-                # 创建新的Part
-                from docx.opc.packuri import PackURI
-                comments_uri = PackURI("/word/comments.xml")
-
-                # 使用doc_part.package来添加part
-                comments_part = doc_part.package.part_related_by[rel_id]
-
-                # 设置element
-                if hasattr(comments_part, '_element'):
-                    comments_part._element = comments_element
-                else:
-                    # 创建part并设置内容
-                    doc_part.package.save_part(comments_uri, comments_element.xml)
+            self._comments_part = comments_part
+            self._comments = comments_part.element
+        except Exception as e:
+            logger.warning(f"无法创建批注部分，使用内联说明代替批注: {e}")
+            self._comments = None
+            return None
 
-            # 获取comments元素
-            comments_element = comments_part.element
+        existing = [
+            int(value) for value in (comment.get(qn("w:id"), "") for comment in self._comments.iterchildren(qn("w:comment")))
+            if value.lstrip("-").isdigit()
+        ]
+        self._next_comment_id = max(existing, default=-1) + 1
+        return self._comments
 
-            # 创建批注
-            comment = OxmlElement("w:comment")
-            comment.set(qn("w:id"), str(comment_id))
-            comment.set(qn("w:author"), author)
-            # 添加初始日期
-            from datetime import datetime
-            comment.set(qn("w:date"), datetime.now().strftime("%Y-%m-%dT%H:%M:00Z"))
+    def _append_comment(self, comments, text: str, author: str):
+        """
+        在批注部分末尾添加一条批注（每行一个段落）
 
-            # 创建批注段落
+        Returns:
+            w:comment 元素
+        """
+        comment = OxmlElement("w:comment")
+        comment.set(qn("w:id"), str(self._next_comment_id))
+        comment.set(qn("w:author"), author)
+        comment.set(qn("w:initials"), author[:2])
+        comment.set(qn("w:date"), datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ"))
+        self._next_comment_id += 1
+
+        for position, line in enumerate(text.split("\n")):
             p = OxmlElement("w:p")
+            p_pr = OxmlElement("w:pPr")
+            p_style = OxmlElement("w:pStyle")
+            p_style.set(qn("w:val"), "CommentText")
+            p_pr.append(p_style)
+            p.append(p_pr)
+
+            if position == 0:
+                # 批注第一段以批注标记开头
+                ref_run = OxmlElement("w:r")
+                r_pr = OxmlElement("w:rPr")
+                r_style = OxmlElement("w:rStyle")
+                r_style.set(qn("w:val"), "CommentReference")
+                r_pr.append(r_style)
+                ref_run.append(r_pr)
+                ref_run.append(OxmlElement("w:annotationRef"))
+                p.append(ref_run)
 
-            # 创建批注内容的run
             r = OxmlElement("w:r")
-
-            # 添加文本
             t = OxmlElement("w:t")
             t.set(qn("xml:space"), "preserve")
-            t.text = text
+            t.text = line
             r.append(t)
-
             p.append(r)
             comment.append(p)
 
-            # 将批注添加到comments元素
-            comments_element.append(comment)
-
-            print(f"批注内容已添加到comments部分: {text[:50]}...")
-
-        except Exception as e:
-            # 如果无法添加到批注部分，重新抛出异常
-            import traceback
-            print(f"批注内容添加失败: {e}")
-            traceback.print_exc()
-            raise e
-
-    def _add_comment_inline(self, paragraph, text: str, author: str):
-        """备用方案：在段落后添加批注标记"""
-        try:
-            print(f"[备用方案] 开始添加批注...")
-            # 直接在段落的XML元素中添加run
-            p_element = paragraph._element
+        comments.append(comment)
+        return comment
 
-            # 创建新的run元素
-            new_run = OxmlElement("w:r")
+    def _add_comment_inline(self, bounds: Tuple[List[Any], int, int], text: str, author: str):
+        """备用方案：高亮范围内的文字，并在范围末尾添加红色说明文字"""
+        runs = self._span_runs(bounds)
+        for run in runs:
+            self._highlight(run)
 
-            # 创建run属性
-            r_pr = OxmlElement("w:rPr")
+        # 创建新的run元素
+        new_run = OxmlElement("w:r")
 
-            # 设置颜色为红色
-            color = OxmlElement("w:color")
-            color.set(qn("w:val"), "FF0000")
-            r_pr.append(color)
+        # 创建run属性
+        r_pr = OxmlElement("w:rPr")
 
-            # 设置字体大小
-            sz = OxmlElement("w:sz")
-            sz.set(qn("w:val"), "20")  # 10pt = 20 half-points
-            r_pr.append(sz)
+        # 设置颜色为红色
+        color = OxmlElement("w:color")
+        color.set(qn("w:val"), "FF0000")
+        r_pr.append(color)
 
-            new_run.append(r_pr)
+        # 设置字体大小
+        sz = OxmlElement("w:sz")
+        sz.set(qn("w:val"), "20")  # 10pt = 20 half-points
+        r_pr.append(sz)
 
-            # 创建文本元素（不使用emoji）
-            t = OxmlElement("w:t")
-            t.set(qn("xml:space"), "preserve")
-            comment_text = f"\n[{author}: {text}]"
-            t.text = comment_text
-            new_run.append(t)
+        new_run.append(r_pr)
 
-            # 添加到段落末尾
-            p_element.append(new_run)
-            print(f"[备用方案] 完成")
+        # 创建文本元素（不使用emoji）
+        t = OxmlElement("w:t")
+        t.set(qn("xml:space"), "preserve")
+        t.text = f"\n[{author}: {text}]"
+        new_run.append(t)
 
-        except Exception as e:
-            print(f"[备用方案] 失败: {e}")
-            import traceback
-            traceback.print_exc()
+        # 添加到范围末尾，范围内没有 run 时添加到结束段落末尾
+        if runs:
+            runs[-1].addnext(new_run)
+        else:
+            bounds[0][-1].append(new_run)
 
     def add_review_summary(self, issues: List[Dict]) -> bool:
         """
@@ -307,38 +574,46 @@ class CommentGenerator:
         return p
 
     def save(self, output_path: str):
-        """保存文档"""
+        """
+        保存文档
+
+        只重写修改过的部分（正文、批注部分，新建批注部分时还有正文的关系部分和内容类型），
+        其余成员原样复制压缩数据；包格式不支持增量写入时使用 python-docx 完整保存。
+        """
         # 确保输出目录存在
         output_dir = os.path.dirname(output_path)
         if output_dir and not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-        self.doc.save(output_path)
-
-    def add_issues_as_comments(self, issues_with_location: List[Dict]) -> int:
-        """
-        批量添加问题批注 - 使用内联红色文字方式
-        """
-        print("使用内联红色文字批注方式...")
-        count = 0
-        for item in issues_with_location:
-            issue = item.get("issue", {})
-            location = item.get("location", {})
+        try:
+            patch_package(self.doc_path, output_path, self._changed_parts())
+        except (UnsupportedPackageError, zipfile.BadZipFile, KeyError) as e:
+            logger.warning(f"无法增量写入文档，使用完整保存: {e}")
+            self.doc.save(output_path)
+
+    def _changed_parts(self) -> Dict[str, bytes]:
+        """修改过的部分：成员名 -> 序列化后的内容"""
+        doc_part = self.doc.part
+        parts = {doc_part.partname.membername: doc_part.blob}
+
+        if self._comments_part is not None:
+            parts[self._comments_part.partname.membername] = self._comments_part.blob
+
+        if self._comments_created:
+            parts[doc_part.partname.rels_uri.membername] = doc_part.rels.xml
+            with zipfile.ZipFile(self.doc_path) as archive:
+                content_types = archive.read(CONTENT_TYPES_PART)
+            updated = add_content_type_override(
+                content_types, self._comments_part.partname, CT.WML_COMMENTS
+            )
+            if updated is not None:
+                parts[CONTENT_TYPES_PART] = updated
 
-            if location:
-                paragraph_index = location.get("index", -1)
-                if paragraph_index >= 0:
-                    comment_text = (
-                        f"【{issue.get('severity', '中')}风险】{issue.get('problem', '')}\n"
-                        f"建议：{issue.get('suggestion', '')}"
-                    )
-                    if self.add_comment(paragraph_index, comment_text):
-                        count += 1
-        return count
+        return parts
 
     def create_review_report(self, issues: List[Dict], summary: str) -> str:
         """
-        创建审查报告（纯文本）
+        创建审查报告（纯文本，其他格式见 report_renderer）
 
         Args:
             issues: 问题列表
@@ -347,27 +622,13 @@ class CommentGenerator:
         Returns:
             报告文本
         """
-        report_lines = [
-            "=" * 60,
-            "合同审查报告",
-            "=" * 60,
-            "",
-            summary,
-            "",
-            "=" * 60,
-            "问题详情",
-            "=" * 60,
-            ""
-        ]
+        return "".join(render_txt(build_report(issues, summary=summary)))
+
 
-        for i, issue in enumerate(issues, 1):
-            report_lines.extend([
-                f"{i}. {issue.get('category', '')} - {issue.get('severity', '')}风险",
-                f"   位置：{issue.get('location_hint', '')}",
-                f"   原文：{issue.get('original_text', '')}",
-                f"   问题：{issue.get('problem', '')}",
-                f"   建议：{issue.get('suggestion', '')}",
-                ""
-            ])
-
-        return "\n".join(report_lines)
+def _span_start(location: Dict[str, Any], paragraph_index: int = 0) -> Tuple[int, int]:
+    """定位结果中范围的起点 (段落, 偏移)，用于排序；没有范围时为段落开头"""
+    start = (location.get("span") or {}).get("start") or {}
+    try:
+        return int(start.get("paragraph", paragraph_index)), int(start.get("offset", 0))
+    except (TypeError, ValueError):
+        return paragraph_index, 0
@@ -1,16 +1,31 @@
 """
 Word 文档解析模块
 """
+import os
+from collections import deque
+from itertools import groupby
 from docx import Document
-from typing import List, Dict, Any
+from docx.oxml.ns import qn
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Tuple
 import re
+from backend.config import get_settings
+from backend.utils.docx_stream import iter_docx
+from backend.utils.tokenizer import get_tokenizer
+
+# 解析结果格式版本，解析结构变化时递增，旧版本的持久化结果会被重新解析
+PARSED_DOCUMENT_VERSION = 2
 
 
 class DocumentParser:
     """文档解析器"""
 
-    def __init__(self):
-        pass
+    def __init__(self, tokenizer=None):
+        """
+        Args:
+            tokenizer: Token 计数器（可选），默认使用进程共享的计数器
+                （有本地 tokenizer 文件时精确计数，否则为校准后的估算）
+        """
+        self.tokenizer = tokenizer or get_tokenizer()
 
     def parse_document(self, file_path: str) -> Dict[str, Any]:
         """
@@ -19,11 +34,24 @@ class DocumentParser:
         Returns:
             {
                 "paragraphs": [(text, style_name, index), ...],
-                "tables": [[row1, row2, ...], ...],
+                "tables": [{"index": int, "position": int, "rows": [[cell, ...], ...]}, ...],
                 "full_text": str,
-                "structure": {...}
+                "structure": {...},
+                "total_tokens": int
             }
+
+        position 为表格之前的正文段落数；全文和 Token 数包含按行序列化的表格（见 serialize_table）。
+        total_tokens 是解析时的估算，只用于展示；解析可能在进程池中执行，那里的计数器没有经过校准，
+        分段时由审核进程用自己的计数器重新计数。
+
+        解析结果可直接 JSON 序列化，上传时解析一次并随合同记录持久化，
+        审核、定位和批注各环节复用同一份结果。
+        超过 docx_stream_parse_threshold 的大文档使用流式读取（见 parse_document_streaming）。
         """
+        threshold = get_settings().docx_stream_parse_threshold
+        if threshold >= 0 and os.path.getsize(file_path) >= threshold:
+            return self.parse_document_streaming(file_path)
+
         doc = Document(file_path)
 
         # 解析段落
@@ -36,29 +64,175 @@ class DocumentParser:
                 "index": idx
             })
 
+        # 表格位置：正文中表格之前的段落数
+        positions = []
+        paragraph_count = 0
+        for child in doc.element.body.iterchildren():
+            if child.tag == qn("w:p"):
+                paragraph_count += 1
+            elif child.tag == qn("w:tbl"):
+                positions.append(paragraph_count)
+
         # 解析表格
         tables = []
-        for table in doc.tables:
+        for table_index, (table, position) in enumerate(zip(doc.tables, positions)):
             table_data = []
             for row in table.rows:
                 row_data = [cell.text for cell in row.cells]
                 table_data.append(row_data)
-            tables.append(table_data)
+            tables.append({"index": table_index, "position": position, "rows": table_data})
+
+        return self._build_result(paragraphs, tables)
 
-        # 生成全文
-        full_text = "\n".join([p["text"] for p in paragraphs if p["text"].strip()])
+    def parse_document_streaming(self, file_path: str) -> Dict[str, Any]:
+        """
+        流式解析 Word 文档（不构建 python-docx 对象模型，结果与 parse_document 相同）
+
+        Returns:
+            同 parse_document
+        """
+        paragraphs = []
+        tables: List[Dict[str, Any]] = []
+
+        for item in iter_docx(file_path):
+            if item["type"] == "paragraph":
+                paragraphs.append(self._paragraph_info(item))
+            else:
+                if item["row"] == 0:
+                    tables.append({"index": item["table"], "position": len(paragraphs), "rows": []})
+                tables[-1]["rows"].append(item["cells"])
+
+        return self._build_result(paragraphs, tables)
+
+    def iter_paragraphs(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        逐个产出文档段落（流式读取，不保留已产出的段落）
+
+        Yields:
+            {"text": str, "style": str, "index": int}
+        """
+        for item in iter_docx(file_path):
+            if item["type"] == "paragraph":
+                yield self._paragraph_info(item)
+
+    @staticmethod
+    def _paragraph_info(item: Dict[str, Any]) -> Dict[str, Any]:
+        """流式读取的段落转换为解析结果中的段落格式"""
+        return {
+            "text": item["text"],
+            "style": item["style"] if item["style"] is not None else "Normal",
+            "index": item["index"]
+        }
+
+    def _build_result(self, paragraphs: List[Dict], tables: List[Dict]) -> Dict[str, Any]:
+        """由段落和表格生成解析结果"""
+        # 按文档顺序生成全文（表格按行序列化）
+        table_texts = [self.serialize_table(table["index"], table["rows"]) for table in tables]
+        blocks = []
+        table_cursor = 0
+        for position, para in enumerate(paragraphs):
+            while table_cursor < len(tables) and tables[table_cursor]["position"] <= position:
+                blocks.append(table_texts[table_cursor])
+                table_cursor += 1
+            if para["text"].strip():
+                blocks.append(para["text"])
+        blocks.extend(table_texts[table_cursor:])
+        full_text = "\n".join(blocks)
 
         # 检测文档结构
         structure = self._detect_structure(paragraphs)
 
         return {
+            "version": PARSED_DOCUMENT_VERSION,
             "paragraphs": paragraphs,
             "tables": tables,
             "full_text": full_text,
             "structure": structure,
-            "total_paragraphs": len(paragraphs)
+            "total_paragraphs": len(paragraphs),
+            "total_tokens": self.estimate_tokens(full_text)
         }
 
+    @staticmethod
+    def table_row_line(cells: List[str]) -> str:
+        """表格行序列化为竖线分隔的一行（单元格内的换行和连续空白合并为一个空格）"""
+        return "| " + " | ".join(" ".join(cell.split()).replace("|", "｜") for cell in cells) + " |"
+
+    @staticmethod
+    def _table_caption(table_index: int, start_row: int, end_row: int) -> str:
+        """表格片段标题（行号从 1 开始）"""
+        return f"[表格{table_index + 1} 第{start_row + 1}-{end_row}行]"
+
+    def serialize_table(self, table_index: int, rows: List[List[str]]) -> str:
+        """整个表格的序列化文本"""
+        lines = [self._table_caption(table_index, 0, len(rows))]
+        lines.extend(self.table_row_line(cells) for cells in rows)
+        return "\n".join(lines)
+
+    def _table_pieces(
+        self,
+        table_index: int,
+        rows: Iterable[List[str]],
+        max_tokens: int
+    ) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """
+        按行范围拆分表格，每个片段不超过 Token 预算（单行超出预算时单独成段）
+
+        第一行视为表头，后续片段重复表头以保留列含义。
+
+        Yields:
+            ({"table", "start_row", "end_row", "text"}, Token 数)，end_row 不包含
+        """
+        caption_tokens = self.estimate_tokens(self._table_caption(table_index, 0, 0))
+        header = None
+        header_tokens = 0
+        lines: List[str] = []
+        tokens = caption_tokens
+        start_row = 0
+        row = 0
+
+        def piece() -> Tuple[Dict[str, Any], int]:
+            text = "\n".join([self._table_caption(table_index, start_row, row)] + lines)
+            return {"table": table_index, "start_row": start_row, "end_row": row, "text": text}, tokens
+
+        for cells in rows:
+            line = self.table_row_line(cells)
+            line_tokens = self.estimate_tokens(line)
+            if header is None:
+                header, header_tokens = line, line_tokens
+
+            if row > start_row and tokens + line_tokens > max_tokens:
+                yield piece()
+                start_row = row
+                lines = [header]
+                tokens = caption_tokens + header_tokens
+
+            lines.append(line)
+            tokens += line_tokens
+            row += 1
+
+        if row > start_row:
+            yield piece()
+
+    def load_or_parse(self, file_path: str, parsed_doc: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        复用已持久化的解析结果，缺失或版本过期时重新解析
+
+        Args:
+            file_path: 文档路径
+            parsed_doc: 已有的解析结果（可选）
+
+        Returns:
+            解析结果
+        """
+        if self.is_current(parsed_doc):
+            return parsed_doc
+        return self.parse_document(file_path)
+
+    @staticmethod
+    def is_current(parsed_doc: Optional[Dict[str, Any]]) -> bool:
+        """判断解析结果是否为当前版本"""
+        return bool(parsed_doc) and parsed_doc.get("version") == PARSED_DOCUMENT_VERSION
+
     def _detect_structure(self, paragraphs: List[Dict]) -> Dict[str, Any]:
         """检测文档结构"""
         sections = []
@@ -70,7 +244,7 @@ class DocumentParser:
             style = para["style"]
 
             # 检测是否为标题
-            if self._is_heading(style) or self._is_numbered_title(text):
+            if self._is_section_start(para):
                 section_num += 1
                 current_section = {
                     "number": section_num,
@@ -86,6 +260,10 @@ class DocumentParser:
             "total_sections": section_num
         }
 
+    def _is_section_start(self, para: Dict) -> bool:
+        """段落是否为章节开始（标题样式或编号标题）"""
+        return self._is_heading(para["style"]) or self._is_numbered_title(para["text"].strip())
+
     def _is_heading(self, style_name: str) -> bool:
         """判断是否为标题样式"""
         if style_name is None:
@@ -105,99 +283,170 @@ class DocumentParser:
 
     def estimate_tokens(self, text: str) -> int:
         """估算 Token 数量"""
-        # 中文约 1.5 字符 = 1 token，英文约 4 字符 = 1 token
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-        other_chars = len(text) - chinese_chars
-        return int(chinese_chars / 1.5 + other_chars / 4)
+        return self.tokenizer.count(text)
+
+    def paragraph_tokens(self, parsed_doc: Dict) -> List[int]:
+        """各段落的 Token 数（用当前计数器计数，不使用解析时的估算）"""
+        return [self.estimate_tokens(p["text"]) for p in parsed_doc["paragraphs"]]
 
     def should_split(self, parsed_doc: Dict, max_tokens: int) -> bool:
-        """判断是否需要分段处理"""
-        estimated_tokens = self.estimate_tokens(parsed_doc["full_text"])
-        return estimated_tokens > max_tokens
+        """判断是否需要分段处理（用当前计数器计数，不使用解析时的估算）"""
+        return self.estimate_tokens(parsed_doc["full_text"]) > max_tokens
 
-    def split_by_sections(self, parsed_doc: Dict, max_tokens: int) -> List[Dict]:
-        """按章节分段"""
-        sections = parsed_doc["structure"]["sections"]
-        paragraphs = parsed_doc["paragraphs"]
+    def split_by_sections(self, parsed_doc: Dict, max_tokens: int, overlap_tokens: int = 0) -> List[Dict]:
+        """
+        按章节分段
 
-        if not sections:
-            # 没有章节结构，按段落数量分段
-            return self._split_by_paragraphs(paragraphs, max_tokens)
+        相邻的完整章节合并到同一分段，直到达到 Token 预算；单个章节超出预算时按段落拆分。
+        没有章节结构时按段落分段。表格按行序列化后位于其所在位置，超出预算的表格按行范围拆分。
 
-        # 按章节分段
-        result = []
-        current_section = None
-        current_paras = []
-        current_tokens = 0
+        Args:
+            parsed_doc: 解析结果
+            max_tokens: 每个分段的 Token 预算
+            overlap_tokens: 分段间重叠的上下文 Token 数，取上一分段末尾的段落放入
+                context 字段（只作为审核参考，不计入分段内容）
 
-        for para in paragraphs:
-            # 检查是否是章节开始
-            section = next((s for s in sections if s["start_index"] == para["index"]), None)
-
-            if section:
-                # 保存当前分段
-                if current_paras:
-                    result.append({
-                        "section_number": len(result) + 1,
-                        "paragraphs": current_paras,
-                        "text": "\n".join([p["text"] for p in current_paras])
-                    })
-
-                current_section = section
-                current_paras = [para]
-                current_tokens = self.estimate_tokens(para["text"])
+        Returns:
+            [{section_number, paragraphs, tables, text, tokens, context}, ...]，
+            tables 为分段包含的表格行范围 [{table, start_row, end_row}, ...]
+        """
+        return list(self._pack_sections(self._parsed_units(parsed_doc, max_tokens), max_tokens, overlap_tokens))
+
+    def _parsed_units(self, parsed_doc: Dict, max_tokens: int) -> Iterator[Tuple[Dict, int, bool]]:
+        """解析结果中的段落和表格片段（按文档顺序），供装箱使用"""
+        paragraphs = parsed_doc["paragraphs"]
+        section_starts = {section["start_index"] for section in parsed_doc["structure"]["sections"]}
+        tables = parsed_doc.get("tables", [])
+        table_cursor = 0
+
+        for position, (para, tokens) in enumerate(zip(paragraphs, self.paragraph_tokens(parsed_doc))):
+            while table_cursor < len(tables) and tables[table_cursor]["position"] <= position:
+                table = tables[table_cursor]
+                for piece, piece_tokens in self._table_pieces(table["index"], table["rows"], max_tokens):
+                    yield piece, piece_tokens, False
+                table_cursor += 1
+            yield para, tokens, para["index"] in section_starts
+
+        for table in tables[table_cursor:]:
+            for piece, piece_tokens in self._table_pieces(table["index"], table["rows"], max_tokens):
+                yield piece, piece_tokens, False
+
+    def _stream_units(self, file_path: str, max_tokens: int) -> Iterator[Tuple[Dict, int, bool]]:
+        """流式读取文档中的段落和表格片段（表格逐行读取，只保留当前片段）"""
+        for key, items in groupby(iter_docx(file_path), key=lambda item: (item["type"], item.get("table"))):
+            if key[0] == "paragraph":
+                for item in items:
+                    para = self._paragraph_info(item)
+                    yield para, self.estimate_tokens(para["text"]), self._is_section_start(para)
             else:
-                para_tokens = self.estimate_tokens(para["text"])
-
-                # 检查是否超过限制
-                if current_tokens + para_tokens > max_tokens and current_paras:
-                    result.append({
-                        "section_number": len(result) + 1,
-                        "paragraphs": current_paras,
-                        "text": "\n".join([p["text"] for p in current_paras])
-                    })
-                    current_paras = [para]
-                    current_tokens = para_tokens
-                else:
-                    current_paras.append(para)
-                    current_tokens += para_tokens
-
-        # 保存最后一段
-        if current_paras:
-            result.append({
-                "section_number": len(result) + 1,
-                "paragraphs": current_paras,
-                "text": "\n".join([p["text"] for p in current_paras])
-            })
+                rows = (item["cells"] for item in items)
+                for piece, piece_tokens in self._table_pieces(key[1], rows, max_tokens):
+                    yield piece, piece_tokens, False
 
-        return result
+    def stream_sections(self, file_path: str, max_tokens: int, overlap_tokens: int = 0) -> Iterator[Dict]:
+        """
+        流式读取文档并逐个产出分段（结果与 parse_document + split_by_sections 相同）
 
-    def _split_by_paragraphs(self, paragraphs: List[Dict], max_tokens: int) -> List[Dict]:
-        """按段落分段（无章节结构时）"""
-        result = []
-        current_paras = []
-        current_tokens = 0
+        内存中只保留当前分段和一个章节的段落，适合超大文档。
 
-        for para in paragraphs:
-            para_tokens = self.estimate_tokens(para["text"])
-
-            if current_tokens + para_tokens > max_tokens and current_paras:
-                result.append({
-                    "section_number": len(result) + 1,
-                    "paragraphs": current_paras,
-                    "text": "\n".join([p["text"] for p in current_paras])
-                })
-                current_paras = [para]
-                current_tokens = para_tokens
-            else:
-                current_paras.append(para)
-                current_tokens += para_tokens
-
-        if current_paras:
-            result.append({
-                "section_number": len(result) + 1,
-                "paragraphs": current_paras,
-                "text": "\n".join([p["text"] for p in current_paras])
-            })
+        Yields:
+            同 split_by_sections 的分段
+        """
+        return self._pack_sections(self._stream_units(file_path, max_tokens), max_tokens, overlap_tokens)
+
+    def _pack_sections(
+        self,
+        items: Iterable[Tuple[Dict, int, bool]],
+        max_tokens: int,
+        overlap_tokens: int
+    ) -> Iterator[Dict]:
+        """
+        单遍装箱：章节块整块放得下时与前面的章节合并，块本身超出预算时按段落拆分
+
+        Args:
+            items: (段落或表格片段, Token 数, 是否章节开始)，按文档顺序
+            max_tokens: 每个分段的 Token 预算
+            overlap_tokens: 分段间重叠的上下文 Token 数
 
-        return result
+        Yields:
+            分段
+        """
+        current: List[Tuple[Dict, int]] = []
+        current_tokens = 0
+        current_context = ""
+        section_number = 0
+        # 当前章节块中尚未装入分段的段落（块超出预算后直接按段落装箱）
+        block: List[Tuple[Dict, int]] = []
+        block_tokens = 0
+        block_oversized = False
+        # 已装入分段的末尾非空段落（总 Token 数不超过 overlap_tokens），作为下一分段的上下文
+        history: deque = deque()
+        history_tokens = 0
+
+        def emit() -> Dict:
+            nonlocal current, current_tokens, section_number
+            section_number += 1
+            section = {
+                "section_number": section_number,
+                "paragraphs": [unit for unit, _ in current if "table" not in unit],
+                "tables": [
+                    {"table": unit["table"], "start_row": unit["start_row"], "end_row": unit["end_row"]}
+                    for unit, _ in current if "table" in unit
+                ],
+                "text": "\n".join([unit["text"] for unit, _ in current]),
+                "tokens": current_tokens,
+                "context": current_context
+            }
+            current, current_tokens = [], 0
+            return section
+
+        def append(para: Dict, tokens: int):
+            nonlocal current_tokens, current_context, history_tokens
+            if not current:
+                current_context = "\n".join(text for text, _ in history) if overlap_tokens > 0 else ""
+            current.append((para, tokens))
+            current_tokens += tokens
+
+            if overlap_tokens > 0 and para["text"].strip():
+                history.append((para["text"], tokens))
+                history_tokens += tokens
+                while history and history_tokens > overlap_tokens:
+                    history_tokens -= history.popleft()[1]
+
+        for para, tokens, is_start in items:
+            if is_start or (not block and not block_oversized):
+                # 上一章节块整块放得下时装入当前分段
+                if block and not block_oversized:
+                    if current and current_tokens + block_tokens > max_tokens:
+                        yield emit()
+                    for item in block:
+                        append(*item)
+                block, block_tokens, block_oversized = [], 0, False
+
+            if block_oversized:
+                if current and current_tokens + tokens > max_tokens:
+                    yield emit()
+                append(para, tokens)
+                continue
+
+            block.append((para, tokens))
+            block_tokens += tokens
+            if block_tokens > max_tokens:
+                # 章节块超出预算：先结束当前分段，再按段落装箱
+                block_oversized = True
+                if current:
+                    yield emit()
+                for item in block:
+                    if current and current_tokens + item[1] > max_tokens:
+                        yield emit()
+                    append(*item)
+                block = []
+
+        if block and not block_oversized:
+            if current and current_tokens + block_tokens > max_tokens:
+                yield emit()
+            for item in block:
+                append(*item)
+
+        if current:
+            yield emit()
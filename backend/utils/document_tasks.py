@@ -0,0 +1,114 @@
+"""
+文档处理任务
+
+解析、定位、写批注和生成文档的模块级函数，参数和返回值都是普通数据（路径、字典、列表），
+可以直接提交到进程池执行（见 executor.run_cpu），也可以在当前进程中直接调用。
+"""
+from typing import Any, Dict, List, Optional
+from backend.utils.comment_generator import CommentGenerator
+from backend.utils.document_parser import DocumentParser
+from backend.utils.location_matcher import LocationMatcher
+
+
+def parse_document(file_path: str) -> Dict[str, Any]:
+    """
+    解析 Word 文档
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        解析结果（同 DocumentParser.parse_document）
+    """
+    return DocumentParser().parse_document(file_path)
+
+
+def locate_issues(
+    file_path: str,
+    issues: List[Dict],
+    location_hints: Optional[List[Optional[int]]] = None,
+    parsed_doc: Optional[Dict[str, Any]] = None
+) -> List[Dict]:
+    """
+    为问题定位位置
+
+    Args:
+        file_path: 文件路径
+        issues: 问题列表
+        location_hints: 与 issues 对应的段落索引提示（增量审核复用的问题），
+            提示段落仍包含原文时直接采用，否则重新匹配
+        parsed_doc: 已有的解析结果（可选）
+
+    Returns:
+        带位置信息的问题列表
+    """
+    parsed_doc = DocumentParser().load_or_parse(file_path, parsed_doc)
+    paragraphs = parsed_doc["paragraphs"]
+
+    # 提示段落仍包含原文的问题直接采用提示位置
+    locations: List[Optional[Dict]] = [None] * len(issues)
+    pending = []
+    for i, issue in enumerate(issues):
+        hint = location_hints[i] if location_hints and i < len(location_hints) else None
+        original_text = issue.get("original_text", "").strip()
+
+        offset = -1
+        if hint is not None and 0 <= hint < len(paragraphs) and original_text:
+            offset = paragraphs[hint]["text"].find(original_text)
+
+        if offset >= 0:
+            locations[i] = {
+                "type": "paragraph",
+                "index": hint,
+                "text": paragraphs[hint]["text"],
+                "confidence": 1.0,
+                "span": LocationMatcher.span(hint, offset, hint, offset + len(original_text))
+            }
+        else:
+            pending.append(i)
+
+    # 其余问题通过位置匹配器批量定位（索引只建立一次）
+    if pending:
+        matcher = LocationMatcher(parsed_doc)
+        for i, location in zip(pending, matcher.locate_issues([issues[i] for i in pending])):
+            locations[i] = location
+
+    return [
+        {
+            "issue": issue,
+            "location": location,
+            "located": location is not None
+        }
+        for issue, location in zip(issues, locations)
+    ]
+
+
+def write_reviewed_document(
+    file_path: str,
+    parsed_doc: Optional[Dict[str, Any]],
+    issues_with_location: List[Dict],
+    output_path: str,
+    summary: str = ""
+) -> Dict[str, Any]:
+    """
+    生成带批注的文档和审查报告
+
+    Args:
+        file_path: 原始文件路径
+        parsed_doc: 解析结果（可选，用于校验段落索引）
+        issues_with_location: locate_issues 的返回结果
+        output_path: 带批注文档的保存路径
+        summary: 审查摘要
+
+    Returns:
+        {"comments": 写入的批注数, "report": 审查报告文本}
+    """
+    comment_gen = CommentGenerator(file_path, parsed_doc)
+    count = comment_gen.add_issues_as_comments(issues_with_location)
+    comment_gen.save(output_path)
+
+    issues = [item["issue"] for item in issues_with_location]
+    return {
+        "comments": count,
+        "report": comment_gen.create_review_report(issues, summary)
+    }
@@ -0,0 +1,208 @@
+"""
+流式读取 .docx
+
+直接从 zip 包中增量解析 word/document.xml（lxml iterparse），逐个产出正文段落和表格行，
+处理完的元素立即释放，不构建 python-docx 对象模型，内存占用与文档大小基本无关。
+产出的段落文本、样式名和表格单元格与 python-docx 的 doc.paragraphs / doc.tables 一致：
+- 段落只包含正文直属的 w:p，文本由 w:r 和 w:hyperlink 组成（制表符为 \\t，换行为 \\n）
+- 样式名按 styles.xml 解析，未指定或找不到时为默认段落样式
+- 表格只包含正文直属的 w:tbl，横向合并的单元格按跨越的列数重复，纵向合并的单元格取起始单元格的文本
+"""
+import zipfile
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from lxml import etree
+from docx.styles import BabelFish
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+DOCUMENT_PART = "word/document.xml"
+STYLES_PART = "word/styles.xml"
+
+
+def _w(tag: str) -> str:
+    """带命名空间的 WordprocessingML 标签名"""
+    return f"{{{W_NS}}}{tag}"
+
+
+_BODY = _w("body")
+_P = _w("p")
+_R = _w("r")
+_HYPERLINK = _w("hyperlink")
+_TBL = _w("tbl")
+_TR = _w("tr")
+_TC = _w("tc")
+_VAL = _w("val")
+
+# run 内各元素对应的文本（w:t 取元素文本，w:br 按类型区分）
+_RUN_TEXT = {
+    _w("tab"): "\t",
+    _w("ptab"): "\t",
+    _w("cr"): "\n",
+    _w("noBreakHyphen"): "-",
+}
+
+
+def load_styles(archive: zipfile.ZipFile) -> Tuple[Dict[str, str], Optional[str]]:
+    """
+    读取段落样式
+
+    Returns:
+        (样式ID -> 样式名, 默认段落样式名)
+    """
+    if STYLES_PART not in archive.namelist():
+        return {}, None
+
+    with archive.open(STYLES_PART) as stream:
+        root = etree.parse(stream).getroot()
+
+    names: Dict[str, str] = {}
+    default_name = None
+    for style in root.iterfind(_w("style")):
+        if style.get(_w("type")) != "paragraph":
+            continue
+        name_element = style.find(_w("name"))
+        name = BabelFish.internal2ui(name_element.get(_VAL)) if name_element is not None else None
+        style_id = style.get(_w("styleId"))
+        if style_id is not None:
+            names[style_id] = name
+        if style.get(_w("default")) in ("1", "true", "on"):
+            default_name = name
+
+    return names, default_name
+
+
+def run_text(run) -> str:
+    """run 的文本"""
+    parts = []
+    for child in run:
+        tag = child.tag
+        if tag == _w("t"):
+            parts.append(child.text or "")
+        elif tag == _w("br"):
+            if child.get(_w("type"), "textWrapping") == "textWrapping":
+                parts.append("\n")
+        elif tag in _RUN_TEXT:
+            parts.append(_RUN_TEXT[tag])
+    return "".join(parts)
+
+
+def paragraph_text(p) -> str:
+    """段落文本（直属 run 和超链接中的 run）"""
+    parts = []
+    for child in p:
+        if child.tag == _R:
+            parts.append(run_text(child))
+        elif child.tag == _HYPERLINK:
+            parts.extend(run_text(run) for run in child.iterfind(_R))
+    return "".join(parts)
+
+
+def paragraph_style(p, styles: Dict[str, str], default_style: Optional[str]) -> Optional[str]:
+    """段落样式名"""
+    style = p.find(f"{_w('pPr')}/{_w('pStyle')}")
+    if style is not None:
+        name = styles.get(style.get(_VAL))
+        if name is not None:
+            return name
+    return default_style
+
+
+def _row_cells(tr, above: Dict[int, str]) -> List[str]:
+    """
+    表格行的单元格文本
+
+    Args:
+        tr: w:tr 元素
+        above: 上一行各网格列的单元格文本（按网格列位置），用于纵向合并，调用后更新为本行
+    """
+    grid_before = tr.find(f"{_w('trPr')}/{_w('gridBefore')}")
+    column = int(grid_before.get(_VAL, 0)) if grid_before is not None else 0
+
+    cells = []
+    current: Dict[int, str] = {}
+    for tc in tr.iterfind(_TC):
+        tc_pr = tc.find(_w("tcPr"))
+        span, merge = 1, None
+        if tc_pr is not None:
+            grid_span = tc_pr.find(_w("gridSpan"))
+            if grid_span is not None:
+                span = int(grid_span.get(_VAL, 1))
+            v_merge = tc_pr.find(_w("vMerge"))
+            if v_merge is not None:
+                merge = v_merge.get(_VAL, "continue")
+
+        if merge == "continue":
+            text = above.get(column, "")
+        else:
+            text = "\n".join(paragraph_text(p) for p in tc.iterfind(_P))
+
+        for offset in range(span):
+            current[column + offset] = text
+        cells.extend([text] * span)
+        column += span
+
+    above.clear()
+    above.update(current)
+    return cells
+
+
+def iter_docx(file_path: str) -> Iterator[Dict[str, Any]]:
+    """
+    流式读取文档正文
+
+    Yields:
+        {"type": "paragraph", "index": int, "text": str, "style": str}
+        {"type": "table_row", "table": int, "row": int, "cells": [str, ...]}
+    """
+    with zipfile.ZipFile(file_path) as archive:
+        styles, default_style = load_styles(archive)
+
+        with archive.open(DOCUMENT_PART) as stream:
+            # 标签栈（start 时入栈、end 时出栈），用于判断元素是否为正文直属
+            path: List[str] = []
+            paragraph_index = 0
+            table_index = -1
+            row_index = 0
+            above: Dict[int, str] = {}
+
+            for event, element in etree.iterparse(stream, events=("start", "end")):
+                if event == "start":
+                    path.append(element.tag)
+                    if len(path) == 3 and element.tag == _TBL and path[1] == _BODY:
+                        table_index += 1
+                        row_index = 0
+                        above = {}
+                    continue
+
+                depth = len(path)
+                path.pop()
+
+                if depth == 3 and path[1] == _BODY:
+                    # 正文直属元素：段落产出后释放；表格的行已在下面逐行释放
+                    if element.tag == _P:
+                        yield {
+                            "type": "paragraph",
+                            "index": paragraph_index,
+                            "text": paragraph_text(element),
+                            "style": paragraph_style(element, styles, default_style),
+                        }
+                        paragraph_index += 1
+                    _release(element)
+
+                elif depth == 4 and element.tag == _TR and path[1] == _BODY and path[2] == _TBL:
+                    yield {
+                        "type": "table_row",
+                        "table": table_index,
+                        "row": row_index,
+                        "cells": _row_cells(element, above),
+                    }
+                    row_index += 1
+                    _release(element)
+
+
+def _release(element):
+    """释放已处理的元素及其之前的兄弟元素"""
+    element.clear()
+    parent = element.getparent()
+    if parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
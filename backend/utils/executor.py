@@ -0,0 +1,194 @@
+"""
+CPU 密集型文档处理的进程池
+
+解析文档、定位问题、写入批注和生成 Word 文档都是纯 CPU 计算，直接在请求处理函数中执行会阻塞
+事件循环，上传集中时其他请求（包括进度推送）都要排队。这些操作通过 run_cpu 提交到进程级共享的
+进程池执行，多核并行，事件循环只等待结果。
+
+提交的函数和参数、返回值都要能被 pickle：使用模块级函数（见 document_tasks.py），
+参数只传文件路径、解析结果等普通数据，不传 DocumentParser、Document 等对象。
+
+进程数由 cpu_workers 配置：0 表示按 CPU 核数，-1 表示不使用进程池（在线程池中执行，仍不阻塞事件循环）。
+子进程以 spawn 方式启动，不继承父进程的事件循环、数据库连接和线程。
+"""
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, Tuple
+from backend.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+
+class TaskTiming:
+    """单类任务的耗时统计"""
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.run_seconds = 0.0
+        self.wait_seconds = 0.0
+        self.max_run_seconds = 0.0
+
+    def record(self, run_seconds: float, wait_seconds: float, failed: bool = False):
+        """记录一次执行（执行耗时，以及提交后等待空闲进程的时间）"""
+        self.calls += 1
+        if failed:
+            self.failures += 1
+        self.run_seconds += run_seconds
+        self.wait_seconds += wait_seconds
+        self.max_run_seconds = max(self.max_run_seconds, run_seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """统计结果"""
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "avg_run_seconds": round(self.run_seconds / self.calls, 4) if self.calls else None,
+            "max_run_seconds": round(self.max_run_seconds, 4),
+            "avg_wait_seconds": round(self.wait_seconds / self.calls, 4) if self.calls else None,
+        }
+
+
+_executor: Optional[Executor] = None
+_workers = 0
+_lock = threading.Lock()
+_timings: Dict[str, TaskTiming] = {}
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """
+    进程数（-1 表示不使用进程池）
+
+    Args:
+        workers: 进程数，默认取 cpu_workers 配置，0 表示按 CPU 核数
+    """
+    if workers is None:
+        workers = get_settings().cpu_workers
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    return max(workers, -1)
+
+
+def init_executor(workers: Optional[int] = None) -> Optional[Executor]:
+    """
+    创建（或按新的进程数重建）共享进程池
+
+    Args:
+        workers: 进程数，默认取 cpu_workers 配置
+
+    Returns:
+        进程池，不使用进程池时为 None
+    """
+    global _executor, _workers
+    workers = resolve_workers(workers)
+
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+        _workers = workers
+        if workers > 0:
+            _executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"文档处理进程池已创建: {workers} 个进程")
+        return _executor
+
+
+def get_executor() -> Optional[Executor]:
+    """获取共享进程池（首次调用时按配置创建）"""
+    if _executor is None and _workers == 0:
+        init_executor()
+    return _executor
+
+
+def shutdown_executor(wait: bool = True):
+    """关闭共享进程池（应用退出时调用）"""
+    global _executor, _workers
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait, cancel_futures=True)
+        _executor = None
+        _workers = 0
+
+
+def _run_timed(func: Callable, args: Tuple, kwargs: Dict[str, Any]) -> Tuple[Any, float, float]:
+    """在执行进程中调用函数，返回 (结果, 开始时间, 执行耗时)"""
+    started = time.time()
+    try:
+        result = func(*args, **kwargs)
+    except Exception as e:
+        # 部分异常（如 lxml 的解析错误）无法 pickle，传回主进程前转换为 RuntimeError
+        try:
+            pickle.dumps(e)
+        except Exception:
+            raise RuntimeError(f"{type(e).__name__}: {e}") from None
+        raise
+    return result, started, time.time() - started
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """
+    在共享进程池中执行 CPU 密集型函数
+
+    Args:
+        func: 模块级函数（参数和返回值需可 pickle）
+        *args, **kwargs: 函数参数
+
+    Returns:
+        函数返回值（函数抛出的异常原样抛出）
+    """
+    name = getattr(func, "__name__", repr(func))
+    executor = get_executor()
+    loop = asyncio.get_running_loop()
+    submitted = time.time()
+
+    try:
+        if executor is None:
+            call = functools.partial(_run_timed, func, args, kwargs)
+            result, started, run_seconds = await loop.run_in_executor(None, call)
+        else:
+            result, started, run_seconds = await loop.run_in_executor(
+                executor, _run_timed, func, args, kwargs
+            )
+    except BrokenProcessPool:
+        # 子进程异常退出（如被系统杀掉）后进程池不可用，丢弃后下次调用重新创建
+        logger.error(f"文档处理进程池异常，已重建: {name}")
+        init_executor(_workers if _workers else None)
+        _timing(name).record(time.time() - submitted, 0.0, failed=True)
+        raise
+    except Exception:
+        _timing(name).record(time.time() - submitted, 0.0, failed=True)
+        raise
+
+    wait_seconds = max(started - submitted, 0.0)
+    _timing(name).record(run_seconds, wait_seconds)
+    logger.info(f"[CPU] {name} 耗时 {run_seconds:.3f}s（等待 {wait_seconds:.3f}s）")
+    return result
+
+
+def _timing(name: str) -> TaskTiming:
+    """获取任务的耗时统计"""
+    timing = _timings.get(name)
+    if timing is None:
+        timing = _timings[name] = TaskTiming()
+    return timing
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """进程池配置和各类任务的耗时统计"""
+    return {
+        "mode": "process" if _executor is not None else "thread",
+        "workers": _workers if _workers > 0 else None,
+        "tasks": {name: timing.to_dict() for name, timing in _timings.items()}
+    }
@@ -1,13 +1,27 @@
 """
 文件处理工具
 """
+import hashlib
 import os
 import shutil
+import uuid
+import zipfile
 import aiofiles
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import List, Optional, Tuple
 from datetime import datetime, timedelta
 
+# 流式保存上传文件时每次读取的字节数
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class FileTooLargeError(Exception):
+    """上传文件超过大小限制"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"文件过大，最大支持 {max_size / (1024 * 1024):.0f}MB")
+
 
 class FileManager:
     """文件管理器"""
@@ -19,10 +33,10 @@ class FileManager:
         self.storage_dir.mkdir(exist_ok=True)
 
     def get_upload_path(self, filename: str) -> Path:
-        """获取上传文件路径"""
+        """获取上传文件路径（同名文件同时上传时以随机后缀区分）"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        name, ext = os.path.splitext(filename)
-        return self.upload_dir / f"{name}_{timestamp}{ext}"
+        name, ext = os.path.splitext(os.path.basename(filename))
+        return self.upload_dir / f"{name}_{timestamp}_{uuid.uuid4().hex[:8]}{ext}"
 
     def get_storage_path(self, contract_id: str, filename: str) -> Path:
         """获取存储文件路径"""
@@ -37,6 +51,102 @@ class FileManager:
             await f.write(file_content)
         return path
 
+    async def save_upload_stream(self, upload, filename: str, max_size: int) -> Tuple[Path, str]:
+        """
+        分块读取上传内容并直接写入目标文件，边写边计算 SHA-256，
+        超过大小限制时立即停止并删除已写入的部分（内存占用与文件大小无关）
+
+        Args:
+            upload: 上传文件（提供 async read(size) 的对象，如 UploadFile）
+            filename: 文件名
+            max_size: 大小上限（字节）
+
+        Returns:
+            (保存路径, 内容的 SHA-256 十六进制摘要)
+
+        Raises:
+            FileTooLargeError: 超过大小限制
+        """
+        path = self.get_upload_path(filename)
+        digest = hashlib.sha256()
+        size = 0
+        try:
+            async with aiofiles.open(path, "wb") as f:
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeError(max_size)
+                    digest.update(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path, digest.hexdigest()
+
+    def extract_zip(
+        self,
+        zip_path: Path,
+        max_size: int,
+        allowed_extensions: list,
+        max_files: int
+    ) -> Tuple[List[Tuple[str, Path, str]], List[Tuple[str, str]]]:
+        """
+        解压 zip 中的合同文件到上传目录（同步执行，由调用方放到线程中）
+
+        只取文件名部分，忽略目录结构；按实际解压的字节数检查大小，不信任 zip 头中记录的大小。
+
+        Args:
+            zip_path: zip 文件路径
+            max_size: 单个文件大小上限（字节）
+            allowed_extensions: 允许的扩展名
+            max_files: 最多解压的文件数，超出的文件计入未导入列表
+
+        Returns:
+            (已解压的 [(文件名, 路径, SHA-256)], 未导入的 [(文件名, 原因)])
+        """
+        saved: List[Tuple[str, Path, str]] = []
+        rejected: List[Tuple[str, str]] = []
+
+        try:
+            archive = zipfile.ZipFile(zip_path)
+        except zipfile.BadZipFile:
+            return saved, [(zip_path.name, "不是有效的 zip 文件")]
+
+        with archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                filename = os.path.basename(_zip_member_name(info))
+                # 跳过 macOS 元数据、隐藏文件和 Word 临时文件
+                if not filename or info.filename.startswith("__MACOSX/") or filename.startswith((".", "~$")):
+                    continue
+
+                valid, error_msg = self.validate_file(filename, info.file_size, max_size, allowed_extensions)
+                if not valid:
+                    rejected.append((filename, error_msg))
+                    continue
+                if len(saved) >= max_files:
+                    rejected.append((filename, f"超过批量文件数上限 {max_files}"))
+                    continue
+
+                path = self.get_upload_path(filename)
+                try:
+                    file_hash = _copy_limited(archive, info, path, max_size)
+                except FileTooLargeError as e:
+                    path.unlink(missing_ok=True)
+                    rejected.append((filename, str(e)))
+                    continue
+                except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                    path.unlink(missing_ok=True)
+                    rejected.append((filename, f"解压失败: {e}"))
+                    continue
+                saved.append((filename, path, file_hash))
+
+        return saved, rejected
+
     async def save_reviewed_file(self, contract_id: str, filename: str, content: bytes) -> Path:
         """保存审查后的文件"""
         path = self.get_storage_path(contract_id, filename)
@@ -80,3 +190,30 @@ class FileManager:
             return False, f"文件过大，最大支持 {max_mb:.0f}MB"
 
         return True, None
+
+
+def _zip_member_name(info: zipfile.ZipInfo) -> str:
+    """zip 成员的文件名（未标记 UTF-8 时按 GBK 解码，兼容 Windows 压缩的中文文件名）"""
+    if info.flag_bits & 0x800:
+        return info.filename
+    try:
+        return info.filename.encode("cp437").decode("gbk")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return info.filename
+
+
+def _copy_limited(archive: zipfile.ZipFile, info: zipfile.ZipInfo, path: Path, max_size: int) -> str:
+    """分块解压单个成员并返回内容的 SHA-256，超过大小限制时抛出 FileTooLargeError"""
+    digest = hashlib.sha256()
+    size = 0
+    with archive.open(info) as source, open(path, "wb") as target:
+        while True:
+            chunk = source.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise FileTooLargeError(max_size)
+            digest.update(chunk)
+            target.write(chunk)
+    return digest.hexdigest()
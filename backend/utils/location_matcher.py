@@ -1,18 +1,75 @@
 """
 位置匹配模块
+
+构造时对解析结果建立一次字符二元组（bigram）倒排索引，定位问题时先用索引筛选
+候选段落，再只对候选段落做精确包含判断或相似度计算，避免逐段扫描全文。
+
+定位结果带字符级范围（起止段落及段内偏移），批注可以精确锚定到问题原文。
+构造时同时建立一次偏移映射（去除空白后的全文及各段落起点），原文跨越多个段落
+或空白与文档不一致时，在映射上查找一次即可换算出起止位置。
+表格单元格同样建立一次偏移映射，正文中找不到的原文再在单元格中查找。
 """
+import re
+from bisect import bisect_right
+from collections import Counter
 from difflib import SequenceMatcher
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
+
+
+_WHITESPACE = re.compile(r"\s+")
+_NON_WHITESPACE = re.compile(r"\S")
 
 
 class LocationMatcher:
     """位置匹配器"""
 
+    # 模糊匹配的相似度阈值
+    FUZZY_THRESHOLD = 0.7
+    # 模糊匹配时计算相似度的最大候选段落数（按共有二元组数从多到少）
+    FUZZY_CANDIDATES = 8
+
     def __init__(self, parsed_doc: Dict[str, Any]):
         self.parsed_doc = parsed_doc
         self.paragraphs = parsed_doc["paragraphs"]
         self.structure = parsed_doc.get("structure", {})
 
+        # 二元组 -> 包含该二元组的段落位置（升序、去重）
+        self._postings: Dict[str, List[int]] = {}
+        for position, para_info in enumerate(self.paragraphs):
+            for gram in set(self._bigrams(para_info["text"])):
+                self._postings.setdefault(gram, []).append(position)
+
+        # 偏移映射：去除空白后的全文，以及每个段落在其中的起点
+        compact_parts = []
+        self._compact_starts: List[int] = []
+        total = 0
+        for para_info in self.paragraphs:
+            compact = _WHITESPACE.sub("", para_info["text"])
+            self._compact_starts.append(total)
+            compact_parts.append(compact)
+            total += len(compact)
+        self._compact_text = "".join(compact_parts)
+        # 段落位置 -> 非空白字符在原段落中的偏移（用到时才计算）
+        self._char_offsets: Dict[int, List[int]] = {}
+
+        # 表格单元格的偏移映射：(表格, 行, 列, 单元格文本)，以及去除空白后拼接的文本和各单元格起点
+        self._cells: List[Tuple[int, int, int, str]] = []
+        cell_parts = []
+        self._cell_starts: List[int] = []
+        total = 0
+        for table in parsed_doc.get("tables", []):
+            if not isinstance(table, dict):
+                continue
+            for row_index, cells in enumerate(table["rows"]):
+                for cell_index, cell_text in enumerate(cells):
+                    compact = _WHITESPACE.sub("", cell_text)
+                    self._cells.append((table["index"], row_index, cell_index, cell_text))
+                    self._cell_starts.append(total)
+                    cell_parts.append(compact)
+                    # 单元格之间加分隔符，匹配结果不会跨越单元格
+                    total += len(compact) + 1
+        self._cell_text = "\x00".join(cell_parts)
+
     def locate_issue(self, issue: Dict) -> Optional[Dict]:
         """
         定位问题在文档中的位置
@@ -22,8 +79,23 @@ class LocationMatcher:
                 "type": "paragraph",
                 "index": int,
                 "text": str,
-                "confidence": float
+                "confidence": float,
+                "span": {
+                    "start": {"paragraph": int, "offset": int},
+                    "end": {"paragraph": int, "offset": int}
+                }
             }
+
+            index 为起始段落，span 的结束偏移不包含在范围内。
+            原文位于表格中时返回：
+            {
+                "type": "table_cell",
+                "table": int, "row": int, "cell": int,
+                "text": str,
+                "confidence": float,
+                "span": {"start": {"offset": int}, "end": {"offset": int}}
+            }
+            其中 span 为单元格文本内的偏移
         """
         original_text = issue.get("original_text", "").strip()
         location_hint = issue.get("location_hint", "")
@@ -36,84 +108,272 @@ class LocationMatcher:
         if result:
             return result
 
-        # 2. 模糊匹配
+        # 2. 跨段落匹配（忽略空白）
+        result = self._span_match(original_text, location_hint)
+        if result:
+            return result
+
+        # 3. 表格单元格匹配
+        result = self._table_match(original_text)
+        if result:
+            return result
+
+        # 4. 模糊匹配
         result = self._fuzzy_match(original_text, location_hint)
         if result:
             return result
 
-        # 3. 未定位成功
+        # 5. 未定位成功
         return None
 
+    def locate_issues(self, issues: List[Dict]) -> List[Optional[Dict]]:
+        """
+        批量定位问题（同一份审查的所有问题共用索引，相同原文和位置提示只匹配一次）
+
+        Args:
+            issues: 问题列表
+
+        Returns:
+            与 issues 一一对应的位置信息，未定位成功时为 None
+        """
+        results: Dict[Tuple[str, str], Optional[Dict]] = {}
+        locations = []
+
+        for issue in issues:
+            key = (issue.get("original_text", "").strip(), issue.get("location_hint", "") or "")
+            if key not in results:
+                results[key] = self.locate_issue(issue)
+            location = results[key]
+            locations.append(dict(location) if location else None)
+
+        return locations
+
     def _exact_match(self, text: str, location_hint: str) -> Optional[Dict]:
         """精确匹配"""
-        # 先在指定范围内搜索
-        search_range = self._get_search_range(location_hint)
-
-        for para_info in search_range:
-            if text in para_info["text"]:
-                return {
-                    "type": "paragraph",
-                    "index": para_info["index"],
-                    "text": para_info["text"],
-                    "confidence": 1.0
-                }
+        candidates = self._exact_candidates(text)
 
-        # 全文搜索
-        for para_info in self.paragraphs:
-            if text in para_info["text"]:
-                return {
-                    "type": "paragraph",
-                    "index": para_info["index"],
-                    "text": para_info["text"],
-                    "confidence": 1.0
-                }
+        # 先在指定范围内搜索，再全文搜索
+        start, end = self._get_search_bounds(location_hint)
+        in_range = [position for position in candidates if start <= position < end]
+
+        for position in in_range + candidates:
+            para_info = self.paragraphs[position]
+            offset = para_info["text"].find(text)
+            if offset >= 0:
+                span = self.span(para_info["index"], offset, para_info["index"], offset + len(text))
+                return self._paragraph_location(para_info, 1.0, span)
 
         return None
 
+    def _span_match(self, text: str, location_hint: str) -> Optional[Dict]:
+        """在偏移映射上匹配去除空白后的原文（可跨越多个段落）"""
+        compact = _WHITESPACE.sub("", text)
+        if not compact:
+            return None
+
+        # 先在指定范围内搜索，再全文搜索
+        start, end = self._get_search_bounds(location_hint)
+        lower = self._compact_offset(start)
+        upper = self._compact_offset(end)
+        found = self._compact_text.find(compact, lower, upper)
+        if found < 0:
+            found = self._compact_text.find(compact)
+        if found < 0:
+            return None
+
+        start_position, start_offset = self._resolve_offset(found)
+        end_position, end_offset = self._resolve_offset(found + len(compact) - 1)
+        span = self.span(
+            self.paragraphs[start_position]["index"], start_offset,
+            self.paragraphs[end_position]["index"], end_offset + 1
+        )
+        return self._paragraph_location(self.paragraphs[start_position], 1.0, span)
+
+    def _table_match(self, text: str) -> Optional[Dict]:
+        """在表格单元格中匹配原文（忽略空白；原文为竖线分隔的表格行时取最长的单元格内容）"""
+        if not self._cells:
+            return None
+
+        segments = [_WHITESPACE.sub("", segment) for segment in re.split(r"[|｜]", text)]
+        segments = [segment for segment in segments if segment]
+        if not segments:
+            return None
+
+        # 按最长的单元格内容查找，原文为整行时要求同一行包含其余各单元格内容
+        compact = max(segments, key=len)
+        found = self._cell_text.find(compact)
+        first_found = found
+        while found >= 0 and len(segments) > 1 and not self._row_contains(found, segments):
+            found = self._cell_text.find(compact, found + 1)
+        if found < 0:
+            found = first_found
+        if found < 0:
+            return None
+
+        position = bisect_right(self._cell_starts, found) - 1
+        table_index, row_index, cell_index, cell_text = self._cells[position]
+        offsets = [match.start() for match in _NON_WHITESPACE.finditer(cell_text)]
+        local = found - self._cell_starts[position]
+
+        return {
+            "type": "table_cell",
+            "table": table_index,
+            "row": row_index,
+            "cell": cell_index,
+            "text": cell_text,
+            "confidence": 1.0,
+            "span": {
+                "start": {"offset": offsets[local]},
+                "end": {"offset": offsets[local + len(compact) - 1] + 1}
+            }
+        }
+
+    def _row_contains(self, found: int, segments: List[str]) -> bool:
+        """匹配位置所在的表格行是否包含全部单元格内容"""
+        position = bisect_right(self._cell_starts, found) - 1
+        table_index, row_index = self._cells[position][:2]
+
+        # 同一行的单元格在映射中相邻
+        first = position
+        while first > 0 and self._cells[first - 1][:2] == (table_index, row_index):
+            first -= 1
+        last = position
+        while last + 1 < len(self._cells) and self._cells[last + 1][:2] == (table_index, row_index):
+            last += 1
+
+        end = self._cell_starts[last + 1] - 1 if last + 1 < len(self._cells) else len(self._cell_text)
+        row_text = self._cell_text[self._cell_starts[first]:end]
+        return all(segment in row_text for segment in segments)
+
     def _fuzzy_match(self, text: str, location_hint: str) -> Optional[Dict]:
-        """模糊匹配"""
-        threshold = 0.7
+        """模糊匹配（只对共有二元组最多、且长度上可能达到阈值的候选段落计算相似度）"""
+        start, end = self._get_search_bounds(location_hint)
+
+        overlap = Counter()
+        for gram in set(self._bigrams(text)):
+            for position in self._postings.get(gram, ()):
+                if start <= position < end:
+                    overlap[position] += 1
+
         best_match = None
         best_similarity = 0
+        evaluated = 0
+
+        for position, _ in sorted(overlap.items(), key=lambda item: (-item[1], item[0])):
+            para_info = self.paragraphs[position]
 
-        # 在指定范围内搜索
-        search_range = self._get_search_range(location_hint)
+            # 相似度上界 2*min(len)/(len1+len2)，长度差过大的段落不可能达到阈值
+            shorter, longer = sorted((len(text), len(para_info["text"])))
+            if 2 * shorter / (shorter + longer) < self.FUZZY_THRESHOLD:
+                continue
 
-        for para_info in search_range:
-            similarity = self._calculate_similarity(text, para_info["text"])
+            similarity = self._calculate_similarity(text, para_info["text"], best_similarity)
             if similarity > best_similarity:
                 best_similarity = similarity
                 best_match = para_info
 
-        if best_match and best_similarity >= threshold:
-            return {
-                "type": "paragraph",
-                "index": best_match["index"],
-                "text": best_match["text"],
-                "confidence": best_similarity
-            }
+            evaluated += 1
+            if evaluated >= self.FUZZY_CANDIDATES:
+                break
+
+        if best_match and best_similarity >= self.FUZZY_THRESHOLD:
+            start, end = self._matched_range(text, best_match["text"])
+            span = self.span(best_match["index"], start, best_match["index"], end)
+            return self._paragraph_location(best_match, best_similarity, span)
 
         return None
 
-    def _get_search_range(self, location_hint: str) -> List[Dict]:
-        """根据位置提示获取搜索范围"""
+    def _exact_candidates(self, text: str) -> List[int]:
+        """包含查询文本全部二元组的段落位置（升序）"""
+        grams = set(self._bigrams(text))
+        if not grams:
+            # 单字查询没有二元组，逐段判断
+            return [position for position, para_info in enumerate(self.paragraphs) if text in para_info["text"]]
+
+        # 从最少出现的二元组开始求交集，候选集合很快缩小
+        postings = sorted((self._postings.get(gram, []) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(posting)
+
+        return sorted(candidates)
+
+    def _paragraph_location(self, para_info: Dict, confidence: float, span: Dict) -> Dict:
+        """生成段落位置信息"""
+        return {
+            "type": "paragraph",
+            "index": para_info["index"],
+            "text": para_info["text"],
+            "confidence": confidence,
+            "span": span
+        }
+
+    @staticmethod
+    def span(start_paragraph: int, start_offset: int, end_paragraph: int, end_offset: int) -> Dict:
+        """
+        生成字符级范围
+
+        Args:
+            start_paragraph: 起始段落索引
+            start_offset: 起始段落内的字符偏移
+            end_paragraph: 结束段落索引
+            end_offset: 结束段落内的字符偏移（不包含）
+        """
+        return {
+            "start": {"paragraph": start_paragraph, "offset": start_offset},
+            "end": {"paragraph": end_paragraph, "offset": end_offset}
+        }
+
+    def _compact_offset(self, position: int) -> int:
+        """段落位置在去空白全文中的起点（超出末尾时为全文长度）"""
+        if position < len(self._compact_starts):
+            return self._compact_starts[position]
+        return len(self._compact_text)
+
+    def _resolve_offset(self, compact_offset: int) -> Tuple[int, int]:
+        """将去空白全文中的偏移换算为 (段落位置, 段内字符偏移)"""
+        # 空段落与下一段落起点相同，bisect_right 会落到真正包含该字符的段落
+        position = bisect_right(self._compact_starts, compact_offset) - 1
+        offsets = self._char_offsets.get(position)
+        if offsets is None:
+            text = self.paragraphs[position]["text"]
+            offsets = [match.start() for match in _NON_WHITESPACE.finditer(text)]
+            self._char_offsets[position] = offsets
+        return position, offsets[compact_offset - self._compact_starts[position]]
+
+    @staticmethod
+    def _matched_range(text: str, para_text: str) -> Tuple[int, int]:
+        """模糊匹配时原文在段落中对应的字符范围（首个到最后一个匹配块）"""
+        blocks = [block for block in SequenceMatcher(None, text, para_text).get_matching_blocks() if block.size]
+        if not blocks:
+            return 0, len(para_text)
+        return blocks[0].b, blocks[-1].b + blocks[-1].size
+
+    def _get_search_bounds(self, location_hint: str) -> Tuple[int, int]:
+        """根据位置提示获取搜索范围（段落位置区间 [start, end)）"""
+        total = len(self.paragraphs)
         if not location_hint:
-            return self.paragraphs
+            return 0, total
 
         # 解析位置提示，如 "第3条" 或 "第3条第2款"
-        import re
-
         # 匹配 "第X条"
         match = re.search(r'第([一二三四五六七八九十百\d]+)条', location_hint)
         if match:
             section_num = self._chinese_number_to_int(match.group(1))
-            return self._get_section_paragraphs(section_num)
+            return self._get_section_bounds(section_num)
 
         # 无法解析，返回全部
-        return self.paragraphs
+        return 0, total
 
-    def _get_section_paragraphs(self, section_num: int) -> List[Dict]:
-        """获取指定章节的段落"""
+    def _get_search_range(self, location_hint: str) -> List[Dict]:
+        """根据位置提示获取搜索范围"""
+        start, end = self._get_search_bounds(location_hint)
+        return self.paragraphs[start:end]
+
+    def _get_section_bounds(self, section_num: int) -> Tuple[int, int]:
+        """获取指定章节的段落区间"""
         sections = self.structure.get("sections", [])
 
         for i, section in enumerate(sections):
@@ -124,14 +384,34 @@ class LocationMatcher:
                     end = sections[i + 1]["start_index"]
                 else:
                     end = len(self.paragraphs)
-                return self.paragraphs[start:end]
+                return start, end
 
         # 未找到章节，返回全部
-        return self.paragraphs
+        return 0, len(self.paragraphs)
+
+    def _get_section_paragraphs(self, section_num: int) -> List[Dict]:
+        """获取指定章节的段落"""
+        start, end = self._get_section_bounds(section_num)
+        return self.paragraphs[start:end]
+
+    @staticmethod
+    def _bigrams(text: str) -> List[str]:
+        """文本的字符二元组"""
+        return [text[i:i + 2] for i in range(len(text) - 1)]
 
-    def _calculate_similarity(self, text1: str, text2: str) -> float:
-        """计算文本相似度"""
-        return SequenceMatcher(None, text1, text2).ratio()
+    def _calculate_similarity(self, text1: str, text2: str, floor: float = 0.0) -> float:
+        """
+        计算文本相似度
+
+        Args:
+            text1: 文本1
+            text2: 文本2
+            floor: 当前最优相似度，快速上界不超过该值时跳过精确计算
+        """
+        matcher = SequenceMatcher(None, text1, text2)
+        if floor and matcher.quick_ratio() <= floor:
+            return 0.0
+        return matcher.ratio()
 
     def _chinese_number_to_int(self, num_str: str) -> int:
         """转换中文数字"""
@@ -0,0 +1,244 @@
+"""
+OOXML 包的增量写入
+
+python-docx 保存时会重新序列化并重新压缩包中的每个部分，文档中有大量图片等嵌入内容时，
+保存耗时和内存都与这些内容的大小成正比。批注只修改正文、批注部分、正文的关系部分和内容类型，
+这里按 zip 格式逐个写出成员：未修改的成员直接复制原始的压缩数据（不解压、不重新压缩），
+只有修改过的成员重新压缩，输出边读边写，耗时只与修改的文本量有关。
+
+只处理普通的 zip 包（不支持 ZIP64 和加密），遇到不支持的包时抛出 UnsupportedPackageError，
+由调用方改用 python-docx 保存。
+
+这里只减少保存阶段的开销：打开文档时 python-docx 仍会读入包中的所有部分（见 CommentGenerator），
+嵌入内容占用的内存不会因此减少。
+"""
+import os
+import struct
+import time
+import zipfile
+import zlib
+from typing import BinaryIO, Dict, List, Optional, Tuple
+from lxml import etree
+
+# 复制原始数据时每次读取的字节数
+COPY_CHUNK_SIZE = 1024 * 1024
+
+CONTENT_TYPES_PART = "[Content_Types].xml"
+CONTENT_TYPES_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+_LOCAL_HEADER = struct.Struct("<4s5H3L2H")
+# 中央目录项（不含末尾的本地文件头偏移，偏移在写中央目录时填写）
+_CENTRAL_HEADER = struct.Struct("<4s6H3L5HL")
+_END_RECORD = struct.Struct("<4s4H2LH")
+_LOCAL_SIGNATURE = b"PK\x03\x04"
+_CENTRAL_SIGNATURE = b"PK\x01\x02"
+_END_SIGNATURE = b"PK\x05\x06"
+
+# 超过这些上限需要 ZIP64
+_MAX_SIZE = 0xFFFFFFFF
+_MAX_ENTRIES = 0xFFFF
+
+# 通用标志位
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DATA_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+
+class UnsupportedPackageError(Exception):
+    """包格式不支持增量写入（ZIP64、加密等）"""
+    pass
+
+
+def patch_package(source_path: str, output_path: str, parts: Dict[str, bytes]):
+    """
+    复制 OOXML 包并替换（或新增）指定成员
+
+    Args:
+        source_path: 原始包路径
+        output_path: 输出路径
+        parts: 成员名（如 word/document.xml）-> 新内容，原包中没有的成员追加到末尾
+
+    Raises:
+        UnsupportedPackageError: 包格式不支持增量写入
+    """
+    with zipfile.ZipFile(source_path) as archive:
+        members = archive.infolist()
+        if len(members) + len(parts) >= _MAX_ENTRIES:
+            raise UnsupportedPackageError("成员数超过 zip 格式上限")
+        for info in members:
+            if info.flag_bits & _FLAG_ENCRYPTED:
+                raise UnsupportedPackageError(f"成员已加密: {info.filename}")
+            if max(info.compress_size, info.file_size, info.header_offset) >= _MAX_SIZE:
+                raise UnsupportedPackageError(f"成员需要 ZIP64: {info.filename}")
+
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    pending = dict(parts)
+    # (中央目录项, 成员名, 本地文件头偏移)
+    entries: List[Tuple[bytes, bytes, int]] = []
+
+    # 先写临时文件，完成后替换，输出路径与原始包相同或写入中途失败时都不会损坏已有文件
+    temp_path = f"{output_path}.tmp"
+    try:
+        with open(source_path, "rb") as source, open(temp_path, "wb") as target:
+            for info in members:
+                offset = target.tell()
+                if info.filename in pending:
+                    central = _write_member(target, info.filename, pending.pop(info.filename), info)
+                else:
+                    central = _copy_member(source, target, info)
+                entries.append((*central, offset))
+
+            for name, data in pending.items():
+                offset = target.tell()
+                entries.append((*_write_member(target, name, data), offset))
+
+            central_offset = target.tell()
+            if central_offset >= _MAX_SIZE:
+                raise UnsupportedPackageError("输出超过 zip 格式上限")
+            for header, name_bytes, offset in entries:
+                target.write(header + struct.pack("<L", offset) + name_bytes)
+            central_size = target.tell() - central_offset
+
+            target.write(_END_RECORD.pack(
+                _END_SIGNATURE, 0, 0, len(entries), len(entries), central_size, central_offset, 0
+            ))
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def add_content_type_override(content_types: bytes, partname: str, content_type: str) -> Optional[bytes]:
+    """
+    在 [Content_Types].xml 中为部分登记内容类型
+
+    Args:
+        content_types: 原内容
+        partname: 部分名（以 / 开头）
+        content_type: 内容类型
+
+    Returns:
+        修改后的内容，已登记时返回 None
+    """
+    root = etree.fromstring(content_types)
+    tag = f"{{{CONTENT_TYPES_NS}}}Override"
+    for override in root.iterfind(tag):
+        if override.get("PartName", "").lower() == partname.lower():
+            return None
+
+    etree.SubElement(root, tag, PartName=partname, ContentType=content_type)
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+def _encode_name(name: str) -> Tuple[bytes, int]:
+    """成员名编码和对应的标志位"""
+    try:
+        return name.encode("ascii"), 0
+    except UnicodeEncodeError:
+        return name.encode("utf-8"), _FLAG_UTF8
+
+
+def _dos_time(date_time: Tuple[int, ...]) -> Tuple[int, int]:
+    """zip 使用的 DOS 日期和时间"""
+    year, month, day, hour, minute, second = date_time[:6]
+    year = max(year, 1980)
+    return (hour << 11) | (minute << 5) | (second // 2), ((year - 1980) << 9) | (month << 5) | day
+
+
+def _headers(
+    name: str,
+    flags: int,
+    method: int,
+    date_time: Tuple[int, ...],
+    crc: int,
+    compress_size: int,
+    file_size: int,
+    info: Optional[zipfile.ZipInfo] = None
+) -> Tuple[bytes, Tuple[bytes, bytes]]:
+    """
+    生成本地文件头和中央目录项
+
+    Returns:
+        (本地文件头, (中央目录项固定部分, 成员名))，中央目录项的本地文件头偏移由调用方填写
+    """
+    name_bytes, name_flag = _encode_name(name)
+    flags = (flags & ~(_FLAG_DATA_DESCRIPTOR | _FLAG_UTF8)) | name_flag
+    dos_time, dos_date = _dos_time(date_time)
+    version = max(info.extract_version if info else 20, 20)
+
+    local = _LOCAL_HEADER.pack(
+        _LOCAL_SIGNATURE, version, flags, method, dos_time, dos_date,
+        crc, compress_size, file_size, len(name_bytes), 0
+    ) + name_bytes
+
+    create_version = (info.create_system << 8 | info.create_version) if info else (3 << 8 | 20)
+    central = _CENTRAL_HEADER.pack(
+        _CENTRAL_SIGNATURE, create_version, version, flags, method, dos_time, dos_date,
+        crc, compress_size, file_size, len(name_bytes), 0, 0, 0,
+        info.internal_attr if info else 0,
+        info.external_attr if info else 0o644 << 16
+    )
+    return local, (central, name_bytes)
+
+
+def _copy_member(source: BinaryIO, target: BinaryIO, info: zipfile.ZipInfo) -> Tuple[bytes, bytes]:
+    """
+    原样复制成员的压缩数据（本地文件头按中央目录重建，不带数据描述符）
+
+    Returns:
+        (中央目录项固定部分, 成员名)
+    """
+    source.seek(info.header_offset)
+    header = source.read(_LOCAL_HEADER.size)
+    if len(header) != _LOCAL_HEADER.size or header[:4] != _LOCAL_SIGNATURE:
+        raise UnsupportedPackageError(f"本地文件头损坏: {info.filename}")
+    name_length, extra_length = struct.unpack("<2H", header[26:30])
+    source.seek(info.header_offset + _LOCAL_HEADER.size + name_length + extra_length)
+
+    local, central = _headers(
+        info.filename, info.flag_bits, info.compress_type, info.date_time,
+        info.CRC, info.compress_size, info.file_size, info
+    )
+    target.write(local)
+
+    remaining = info.compress_size
+    while remaining > 0:
+        chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise UnsupportedPackageError(f"成员数据不完整: {info.filename}")
+        target.write(chunk)
+        remaining -= len(chunk)
+
+    return central
+
+
+def _write_member(
+    target: BinaryIO,
+    name: str,
+    data: bytes,
+    info: Optional[zipfile.ZipInfo] = None
+) -> Tuple[bytes, bytes]:
+    """
+    压缩并写入新的成员内容（替换已有成员时沿用其属性）
+
+    Returns:
+        (中央目录项固定部分, 成员名)
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -15)
+    compressed = compressor.compress(data) + compressor.flush()
+    date_time = info.date_time if info else time.localtime()[:6]
+
+    local, central = _headers(
+        name, info.flag_bits if info else 0, zipfile.ZIP_DEFLATED, date_time,
+        zlib.crc32(data) & 0xFFFFFFFF, len(compressed), len(data), info
+    )
+    if max(len(compressed), len(data)) >= _MAX_SIZE:
+        raise UnsupportedPackageError(f"成员需要 ZIP64: {name}")
+
+    target.write(local)
+    target.write(compressed)
+    return central
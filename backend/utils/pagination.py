@@ -0,0 +1,109 @@
+"""
+游标分页工具
+
+列表接口按 (排序列..., id) 降序做键集（keyset）分页：游标记录上一页最后一行的排序键，
+下一页查询用行值比较 `(col1, col2, id) < (v1, v2, v3)` 定位起点，配合复合索引，
+翻到任何一页都只需扫描一页数据，不随 OFFSET 增大而变慢。
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.sql import Select
+
+# 下一页游标的响应头
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursorError(ValueError):
+    """游标格式错误"""
+    pass
+
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    将排序键编码为游标
+
+    Args:
+        values: 最后一行的排序键
+
+    Returns:
+        URL 安全的游标字符串
+    """
+    raw = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    data = json.dumps(raw, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence) -> List[Any]:
+    """
+    解码游标，按排序列的类型还原排序键
+
+    Args:
+        cursor: 游标字符串
+        columns: 排序列
+
+    Returns:
+        排序键
+
+    Raises:
+        InvalidCursorError: 游标无法解析或与排序列不匹配
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise InvalidCursorError("游标与排序列不匹配")
+
+        values = []
+        for value, column in zip(raw, columns):
+            if value is not None and column.type.python_type is datetime:
+                value = datetime.fromisoformat(value)
+            values.append(value)
+        return values
+
+    except InvalidCursorError:
+        raise
+    except Exception as e:
+        raise InvalidCursorError(f"无效的游标: {e}")
+
+
+def paginate(query: Select, columns: Sequence, cursor: Optional[str], limit: int) -> Select:
+    """
+    为查询添加键集分页条件（按 columns 降序）
+
+    Args:
+        query: 原查询
+        columns: 排序列，最后一列必须唯一（通常为 id）
+        cursor: 上一页返回的游标，为空时从第一页开始
+        limit: 每页数量
+
+    Returns:
+        多取一行的分页查询（用于判断是否还有下一页）
+    """
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.where(tuple_(*columns) < tuple_(*values))
+
+    return query.order_by(*[column.desc() for column in columns]).limit(limit + 1)
+
+
+def split_page(rows: Sequence, keys: Sequence[str], limit: int) -> Tuple[List, Optional[str]]:
+    """
+    截取一页结果并生成下一页游标
+
+    Args:
+        rows: paginate 查询的结果（最多 limit + 1 行）
+        keys: 排序列对应的属性名
+        limit: 每页数量
+
+    Returns:
+        (本页结果, 下一页游标)，没有下一页时游标为 None
+    """
+    page = list(rows[:limit])
+    if len(rows) <= limit or not page:
+        return page, None
+
+    last = page[-1]
+    return page, encode_cursor([getattr(last, key) for key in keys])
@@ -1,9 +1,18 @@
 """
 Prompt 模板
+
+审核 Prompt 分为两部分：固定的审核说明（系统消息，含审核要点和输出格式）和用户消息
+（分段序号、上下文和合同内容）。随请求变化的内容只出现在用户消息中。
 """
+import hashlib
+
+# Prompt 版本号，修改审核 Prompt 的语义时递增，使旧的审核缓存失效
+REVIEW_PROMPT_VERSION = "2"
 
-# 合同审核主 Prompt
-CONTRACT_REVIEW_PROMPT = """你是一位专业的合同审核专家。请仔细审核以下合同内容，识别可能存在的法律风险。
+# 审核说明（系统消息）
+# 不含任何随合同、分段变化的内容，所有审核请求的系统消息逐字节相同，
+# 模型服务端的上下文缓存可以复用这部分前缀，每次调用只需处理用户消息
+REVIEW_SYSTEM_PROMPT = """你是一位专业的合同审核专家。请仔细审核用户提供的合同内容，识别可能存在的法律风险。
 
 审核要点：
 1. 违约金是否过高或约定不明确
@@ -15,65 +24,85 @@ CONTRACT_REVIEW_PROMPT = """你是一位专业的合同审核专家。请仔细
 7. 支付条款是否明确
 8. 其他可能的法律风险
 
+用户提供的可能只是合同的一部分，并可能附带该部分之前的合同内容作为上下文，只针对"合同内容"提出问题。
+original_text 必须逐字摘自合同内容，severity 取 高、中、低 之一。
+
 输出格式要求（严格按照 JSON 格式）：
-{{
+{
   "issues": [
-    {{
+    {
       "category": "违约金",
       "severity": "高",
       "location_hint": "第3条第2款",
       "original_text": "违约金比例为30%",
       "problem": "违约金过高，可能被法院认定为过分高于实际损失",
       "suggestion": "建议调整为20%以内，或明确约定损失计算方式"
-    }}
+    }
   ],
   "summary": "共发现 X 个风险点，其中高风险 Y 个，中风险 Z 个"
-}}
+}
+"""
 
-合同内容：
-{contract_text}
+# 精简的审核说明（review_prompt_style = compact）：以字段说明代替完整示例，减少每次调用的输入 Token
+REVIEW_SYSTEM_PROMPT_COMPACT = """你是合同审核专家。识别用户提供的合同内容中的法律风险（违约金、免责、争议解决、保密、知识产权、解除、支付等），不针对"上下文"提出问题。
+只输出 JSON：{"issues":[{"category":"类别","severity":"高|中|低","location_hint":"第X条第Y款","original_text":"逐字摘录的原文","problem":"问题","suggestion":"修改建议"}],"summary":"共发现 X 个风险点"}
 """
 
-# 分段审核 Prompt
-SECTION_REVIEW_PROMPT = """你是一位专业的合同审核专家。这是合同的 {section_num}/{total_sections} 部分，请审核以下内容。
+REVIEW_SYSTEM_PROMPTS = {
+    "full": REVIEW_SYSTEM_PROMPT,
+    "compact": REVIEW_SYSTEM_PROMPT_COMPACT,
+}
 
-输出格式要求（严格按照 JSON 格式）：
-{{
-  "issues": [
-    {{
-      "category": "问题类别",
-      "severity": "高/中/低",
-      "location_hint": "位置提示（如：第X条第Y款）",
-      "original_text": "原文片段",
-      "problem": "问题描述",
-      "suggestion": "修改建议"
-    }}
-  ],
-  "summary": "本部分发现 X 个风险点"
-}}
+# 合同审核（用户消息）
+CONTRACT_REVIEW_PROMPT = """合同内容：
+{contract_text}
+"""
+
+# 分段审核（用户消息）
+SECTION_REVIEW_PROMPT = """这是合同的 {section_num}/{total_sections} 部分。
 
 合同内容：
 {contract_text}
 """
 
+# 分段审核的前文上下文（分段重叠时使用）
+SECTION_CONTEXT_PROMPT = """
+上下文（本部分之前的合同内容，仅供理解，请不要针对其中的内容提出问题）：
+{context_text}
+"""
+
 # 重试时的强化提示
 RETRY_ENFORCEMENT = """
 
 重要提醒：请严格按照 JSON 格式输出，不要包含任何其他文字说明或标记。JSON 必须完全符合上述格式要求。"""
 
 
+def get_review_system_prompt(style: str = "full") -> str:
+    """获取审核说明（未知的样式按 full 处理）"""
+    return REVIEW_SYSTEM_PROMPTS.get(style, REVIEW_SYSTEM_PROMPT)
+
+
+def get_prompt_version(template: str) -> str:
+    """获取 Prompt 模板版本（版本号 + 模板内容摘要，模板文字变化时自动变化；审核说明需一并传入）"""
+    digest = hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+    return f"{REVIEW_PROMPT_VERSION}-{digest}"
+
+
 def build_contract_review_prompt(contract_text: str) -> str:
     """构建合同审核 Prompt"""
     return CONTRACT_REVIEW_PROMPT.format(contract_text=contract_text)
 
 
-def build_section_review_prompt(contract_text: str, section_num: int, total: int) -> str:
-    """构建分段审核 Prompt"""
-    return SECTION_REVIEW_PROMPT.format(
+def build_section_review_prompt(contract_text: str, section_num: int, total: int, context: str = "") -> str:
+    """构建分段审核 Prompt（context 为前文上下文，可选）"""
+    prompt = SECTION_REVIEW_PROMPT.format(
         contract_text=contract_text,
         section_num=section_num,
-        total=total
+        total_sections=total
     )
+    if context:
+        prompt += SECTION_CONTEXT_PROMPT.format(context_text=context)
+    return prompt
 
 
 def build_retry_prompt(original_prompt: str) -> str:
@@ -0,0 +1,282 @@
+"""
+审查报告渲染
+
+审查结果先整理成统一的报告结构（build_report），再由各格式的渲染函数输出：
+txt、json、csv、md、html 逐个问题生成文本片段，可以直接作为流式响应的内容，
+问题很多时也不需要先在内存中拼出完整报告；docx 需要整体打包，一次生成完整内容。
+
+报告结构或渲染结果变化时增加 REPORT_VERSION，已缓存的旧版本报告不再使用。
+"""
+import csv
+import html
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+# 报告版本（缓存文件名的一部分）
+REPORT_VERSION = 1
+
+# 格式 -> (媒体类型, 文件扩展名)
+REPORT_FORMATS = {
+    "txt": ("text/plain; charset=utf-8", "txt"),
+    "json": ("application/json", "json"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "md": ("text/markdown; charset=utf-8", "md"),
+    "html": ("text/html; charset=utf-8", "html"),
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", "docx"),
+}
+
+# 按问题输出的字段（字段名, 标题）
+ISSUE_FIELDS = [
+    ("index", "序号"),
+    ("severity", "风险等级"),
+    ("category", "问题类别"),
+    ("location_hint", "位置提示"),
+    ("location", "文档位置"),
+    ("original_text", "原文"),
+    ("problem", "问题"),
+    ("suggestion", "建议"),
+]
+
+
+def build_report(
+    issues: List[Dict],
+    locations: Optional[List[Optional[Dict]]] = None,
+    summary: str = "",
+    title: str = "",
+    review_id: Optional[str] = None,
+    completed_at: Optional[datetime] = None
+) -> Dict[str, Any]:
+    """
+    整理报告结构
+
+    Args:
+        issues: 问题列表
+        locations: 与 issues 对应的定位结果（可选）
+        summary: 审查摘要
+        title: 合同标题
+        review_id: 审查ID
+        completed_at: 审查完成时间
+
+    Returns:
+        报告结构 {review_id, title, summary, completed_at, counts, issues}
+    """
+    locations = locations or []
+    counts = {"高": 0, "中": 0, "低": 0}
+    items = []
+    for i, issue in enumerate(issues):
+        severity = _text(issue.get("severity"))
+        if severity in counts:
+            counts[severity] += 1
+        location = locations[i] if i < len(locations) else None
+        items.append({
+            "index": i + 1,
+            "severity": severity,
+            "category": _text(issue.get("category")),
+            "location_hint": _text(issue.get("location_hint")),
+            "location": describe_location(location),
+            "original_text": _text(issue.get("original_text")),
+            "problem": _text(issue.get("problem")),
+            "suggestion": _text(issue.get("suggestion")),
+        })
+
+    return {
+        "review_id": review_id,
+        "title": title,
+        "summary": summary or "",
+        "completed_at": completed_at.isoformat() if completed_at else None,
+        "counts": {
+            "total": len(items),
+            "high_risk_count": counts["高"],
+            "medium_risk_count": counts["中"],
+            "low_risk_count": counts["低"],
+        },
+        "issues": items,
+    }
+
+
+def _text(value: Any) -> str:
+    """问题字段转为文本（模型返回 null 或非字符串时也能渲染）"""
+    return "" if value is None else str(value)
+
+
+def describe_location(location: Optional[Dict]) -> str:
+    """定位结果的文字描述（未定位时为空）"""
+    if not location:
+        return ""
+    try:
+        if location.get("type") == "table_cell":
+            return (
+                f"表格{int(location['table']) + 1} "
+                f"第{int(location['row']) + 1}行第{int(location['cell']) + 1}列"
+            )
+        return f"第{int(location['index']) + 1}段"
+    except (KeyError, TypeError, ValueError):
+        return ""
+
+
+def render_txt(report: Dict[str, Any]) -> Iterator[str]:
+    """纯文本报告"""
+    separator = "=" * 60
+    yield "\n".join([separator, "合同审查报告", separator, "", report["summary"], "", separator, "问题详情", separator, ""])
+
+    for item in report["issues"]:
+        yield "\n" + "\n".join([
+            f"{item['index']}. {item['category']} - {item['severity']}风险",
+            f"   位置：{item['location_hint']}",
+            f"   原文：{item['original_text']}",
+            f"   问题：{item['problem']}",
+            f"   建议：{item['suggestion']}",
+            ""
+        ])
+
+
+def render_json(report: Dict[str, Any]) -> Iterator[str]:
+    """JSON 报告（问题数组逐项输出）"""
+    header = {key: value for key, value in report.items() if key != "issues"}
+    yield json.dumps(header, ensure_ascii=False)[:-1] + ', "issues": ['
+    for i, item in enumerate(report["issues"]):
+        yield ("," if i else "") + json.dumps(item, ensure_ascii=False)
+    yield "]}"
+
+
+def render_csv(report: Dict[str, Any]) -> Iterator[str]:
+    """CSV 报告（每个问题一行，带 BOM 以便 Excel 识别编码）"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> str:
+        text = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return text
+
+    writer.writerow([label for _, label in ISSUE_FIELDS])
+    yield "\ufeff" + flush()
+    for item in report["issues"]:
+        writer.writerow([item[key] for key, _ in ISSUE_FIELDS])
+        yield flush()
+
+
+def render_markdown(report: Dict[str, Any]) -> Iterator[str]:
+    """Markdown 报告"""
+    counts = report["counts"]
+    yield (
+        f"# 合同审查报告{'：' + _markdown_inline(report['title']) if report['title'] else ''}\n\n"
+        f"{report['summary']}\n\n"
+        f"| 高风险 | 中风险 | 低风险 | 合计 |\n| --- | --- | --- | --- |\n"
+        f"| {counts['high_risk_count']} | {counts['medium_risk_count']} | "
+        f"{counts['low_risk_count']} | {counts['total']} |\n\n"
+        "## 问题详情\n"
+    )
+    for item in report["issues"]:
+        location = " / ".join(part for part in (item["location_hint"], item["location"]) if part)
+        yield "\n".join([
+            "",
+            f"### {item['index']}. {item['category']}（{item['severity']}风险）",
+            "",
+            f"- **位置**：{location}",
+            f"- **原文**：{_markdown_inline(item['original_text'])}",
+            f"- **问题**：{_markdown_inline(item['problem'])}",
+            f"- **建议**：{_markdown_inline(item['suggestion'])}",
+            ""
+        ])
+
+
+def render_html(report: Dict[str, Any]) -> Iterator[str]:
+    """HTML 报告（独立页面，问题表格逐行输出）"""
+    counts = report["counts"]
+    title = html.escape(f"合同审查报告{'：' + report['title'] if report['title'] else ''}")
+    yield (
+        "<!DOCTYPE html>\n<html lang=\"zh-CN\">\n<head>\n<meta charset=\"utf-8\">\n"
+        f"<title>{title}</title>\n"
+        "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;width:100%}"
+        "th,td{border:1px solid #ccc;padding:6px;vertical-align:top;text-align:left}"
+        ".高{color:#c00}.中{color:#d80}.低{color:#080}</style>\n</head>\n<body>\n"
+        f"<h1>{title}</h1>\n<p>{html.escape(report['summary'])}</p>\n"
+        f"<p>高风险 {counts['high_risk_count']} 项，中风险 {counts['medium_risk_count']} 项，"
+        f"低风险 {counts['low_risk_count']} 项，共 {counts['total']} 项</p>\n"
+        "<table>\n<thead><tr>"
+        + "".join(f"<th>{label}</th>" for _, label in ISSUE_FIELDS)
+        + "</tr></thead>\n<tbody>\n"
+    )
+    for item in report["issues"]:
+        cells = []
+        for key, _ in ISSUE_FIELDS:
+            if key == "severity":
+                severity = html.escape(str(item[key] or ""))
+                cells.append(f"<td class=\"{severity}\">{severity}</td>")
+            else:
+                cells.append(f"<td>{html.escape(str(item[key]))}</td>")
+        yield "<tr>" + "".join(cells) + "</tr>\n"
+    yield "</tbody>\n</table>\n</body>\n</html>\n"
+
+
+def render_docx(report: Dict[str, Any]) -> bytes:
+    """
+    Word 报告（问题以表格列出）
+
+    Returns:
+        docx 文件内容
+    """
+    from docx import Document
+
+    doc = Document()
+    doc.add_heading(f"合同审查报告{'：' + report['title'] if report['title'] else ''}", level=1)
+    if report["summary"]:
+        doc.add_paragraph(report["summary"])
+
+    counts = report["counts"]
+    doc.add_paragraph(
+        f"高风险 {counts['high_risk_count']} 项，中风险 {counts['medium_risk_count']} 项，"
+        f"低风险 {counts['low_risk_count']} 项，共 {counts['total']} 项"
+    )
+
+    if report["issues"]:
+        doc.add_heading("问题详情", level=2)
+        table = doc.add_table(rows=1, cols=len(ISSUE_FIELDS))
+        table.style = "Table Grid"
+        for cell, (_, label) in zip(table.rows[0].cells, ISSUE_FIELDS):
+            cell.text = label
+        for item in report["issues"]:
+            for cell, (key, _) in zip(table.add_row().cells, ISSUE_FIELDS):
+                cell.text = str(item[key])
+
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# 流式渲染的格式 -> 渲染函数
+TEXT_RENDERERS = {
+    "txt": render_txt,
+    "json": render_json,
+    "csv": render_csv,
+    "md": render_markdown,
+    "html": render_html,
+}
+
+
+def render_report(report: Dict[str, Any], fmt: str) -> bytes:
+    """
+    一次渲染完整报告
+
+    Args:
+        report: build_report 的返回结果
+        fmt: 格式（REPORT_FORMATS 的键）
+
+    Returns:
+        报告内容（文本格式为 UTF-8 编码）
+    """
+    if fmt == "docx":
+        return render_docx(report)
+    return "".join(TEXT_RENDERERS[fmt](report)).encode("utf-8")
+
+
+def _markdown_inline(text: str) -> str:
+    """Markdown 列表项中的文本（换行合并为空格，转义行内标记）"""
+    text = " ".join(str(text).split())
+    for char in ("\\", "*", "_", "`", "[", "]", "<", ">", "|"):
+        text = text.replace(char, "\\" + char)
+    return text
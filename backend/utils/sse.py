@@ -0,0 +1,71 @@
+"""
+Server-Sent Events 工具
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional, Tuple
+
+# SSE 响应头：禁止缓存和反向代理缓冲，保证事件即时送达
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",
+}
+
+# 无事件时发送注释行保持连接的间隔（秒）
+KEEPALIVE_INTERVAL = 15.0
+
+
+def format_sse(event: str, data: Any, event_id: Optional[str] = None) -> str:
+    """
+    格式化一条 SSE 事件
+
+    Args:
+        event: 事件类型
+        data: 事件数据（序列化为 JSON）
+        event_id: 事件ID（可选，客户端断线重连时通过 Last-Event-ID 带回）
+
+    Returns:
+        SSE 文本
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_queue(
+    queue: asyncio.Queue,
+    terminal_events: Iterable[str] = ("done", "error"),
+    keepalive: float = KEEPALIVE_INTERVAL,
+    on_idle: Optional[Callable[[], Awaitable[Optional[Tuple[str, Any]]]]] = None
+) -> AsyncIterator[str]:
+    """
+    将队列中的 (事件类型, 数据) 转换为 SSE 文本流，收到终止事件后结束
+
+    Args:
+        queue: 事件队列
+        terminal_events: 终止事件类型
+        keepalive: 保活间隔（秒）
+        on_idle: 超过保活间隔没有事件时调用，可返回一条补充事件（如查询到的最新状态）
+
+    Yields:
+        SSE 文本
+    """
+    terminal_events = set(terminal_events)
+
+    while True:
+        try:
+            event, data = await asyncio.wait_for(queue.get(), timeout=keepalive)
+        except asyncio.TimeoutError:
+            idle_event = await on_idle() if on_idle else None
+            if idle_event is None:
+                yield ": keepalive\n\n"
+                continue
+            event, data = idle_event
+
+        yield format_sse(event, data)
+
+        if event in terminal_events:
+            return
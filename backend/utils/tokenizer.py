@@ -0,0 +1,270 @@
+"""
+Token 计数
+
+优先加载配置模型对应的本地 tokenizer 文件（需要安装 tokenizers 库），得到与模型一致的计数；
+没有 tokenizer 文件时使用按字符类别加权的估算，权重根据接口返回的实际用量持续校准。
+
+估算特征：中文字符、英文字母、数字、其他字符（标点、空白等）的个数，以及每次调用的固定开销
+（系统消息、对话模板）。每次调用用实际 prompt_tokens 更新一次最小二乘的累积量，样本足够后
+重新求解各类字符的权重；求解时向默认权重正则化，样本较少或特征单一时权重不会偏离太远。
+"""
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+from backend.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_CJK_PATTERN = re.compile(r"[\u4e00-\u9fff]+")
+_ALPHA_PATTERN = re.compile(r"[A-Za-z]+")
+_DIGIT_PATTERN = re.compile(r"[0-9]+")
+
+# 特征顺序：中文、字母、数字、其他字符、每次调用的固定开销
+FEATURES = ("cjk", "alpha", "digit", "other", "overhead")
+
+# 默认权重：中文约 1.5 字符 = 1 token，其他约 4 字符 = 1 token
+DEFAULT_COEFFICIENTS = (1 / 1.5, 0.25, 0.25, 0.25, 0.0)
+
+# 权重取值范围（每字符 Token 数；固定开销单独限制）
+_MIN_COEFFICIENT = 0.05
+_MAX_COEFFICIENT = 2.0
+_MAX_OVERHEAD = 500.0
+
+
+def character_features(text: str) -> List[int]:
+    """统计各类字符个数 [中文, 字母, 数字, 其他]（按正则整体替换计数）"""
+    cjk = len(text) - len(_CJK_PATTERN.sub("", text))
+    alpha = len(text) - len(_ALPHA_PATTERN.sub("", text))
+    digit = len(text) - len(_DIGIT_PATTERN.sub("", text))
+    return [cjk, alpha, digit, len(text) - cjk - alpha - digit]
+
+
+class TokenUsageStats:
+    """估算值与实际用量的对比统计"""
+
+    def __init__(self):
+        self.samples = 0
+        self.estimated_tokens = 0
+        self.actual_tokens = 0
+        self.absolute_error = 0.0
+        self.last_error: Optional[float] = None
+
+    def record(self, estimated: int, actual: int):
+        """记录一次调用的估算值和实际用量"""
+        if actual <= 0:
+            return
+        self.samples += 1
+        self.estimated_tokens += estimated
+        self.actual_tokens += actual
+        self.last_error = (estimated - actual) / actual
+        self.absolute_error += abs(self.last_error)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """统计结果"""
+        return {
+            "samples": self.samples,
+            "estimated_tokens": self.estimated_tokens,
+            "actual_tokens": self.actual_tokens,
+            # 总量误差（正数表示高估）与逐次误差绝对值的平均
+            "total_error": (
+                round((self.estimated_tokens - self.actual_tokens) / self.actual_tokens, 4)
+                if self.actual_tokens else None
+            ),
+            "mean_absolute_error": round(self.absolute_error / self.samples, 4) if self.samples else None,
+            "last_error": round(self.last_error, 4) if self.last_error is not None else None
+        }
+
+
+class HeuristicTokenizer:
+    """按字符类别加权估算 Token 数，权重根据实际用量校准"""
+
+    name = "heuristic"
+
+    def __init__(
+        self,
+        calibrate: bool = True,
+        min_samples: int = 5,
+        regularization: float = 1000.0
+    ):
+        """
+        Args:
+            calibrate: 是否根据实际用量校准权重
+            min_samples: 开始使用校准权重前需要的样本数
+            regularization: 各类字符权重向默认值正则化的强度（固定开销的先验只相当于一次调用）
+        """
+        self.calibrate = calibrate
+        self.min_samples = min_samples
+        self.regularization = regularization
+        self.coefficients = list(DEFAULT_COEFFICIENTS)
+        self.stats = TokenUsageStats()
+
+        size = len(FEATURES)
+        # 最小二乘的累积量 X^T X 与 X^T y
+        self._xtx = [[0.0] * size for _ in range(size)]
+        self._xty = [0.0] * size
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """估算文本的 Token 数（不含调用开销）"""
+        features = character_features(text)
+        return int(sum(weight * value for weight, value in zip(self.coefficients, features)))
+
+    def count_prompt(self, text: str) -> int:
+        """估算一次调用的 Prompt Token 数（含系统消息等固定开销）"""
+        return self.count(text) + int(self.coefficients[-1])
+
+    def observe(self, prompt: str, actual_tokens: int):
+        """
+        记录一次调用的实际用量，并更新权重
+
+        Args:
+            prompt: 发送的用户 Prompt
+            actual_tokens: 接口返回的 prompt_tokens
+        """
+        if not actual_tokens or actual_tokens <= 0:
+            return
+
+        features = character_features(prompt) + [1]
+        with self._lock:
+            self.stats.record(self.count_prompt(prompt), actual_tokens)
+            if not self.calibrate:
+                return
+
+            for i, x_i in enumerate(features):
+                self._xty[i] += x_i * actual_tokens
+                for j, x_j in enumerate(features):
+                    self._xtx[i][j] += x_i * x_j
+
+            if self.stats.samples >= self.min_samples:
+                self._solve()
+
+    def _solve(self):
+        """求解 (X^T X + λI) w = X^T y + λ w0，并限制权重范围"""
+        size = len(FEATURES)
+        priors = [self.regularization] * (size - 1) + [1.0]
+        matrix = [
+            [self._xtx[i][j] + (priors[i] if i == j else 0.0) for j in range(size)]
+            + [self._xty[i] + priors[i] * DEFAULT_COEFFICIENTS[i]]
+            for i in range(size)
+        ]
+
+        # 高斯消元（矩阵对称正定，按列选主元）
+        for col in range(size):
+            pivot = max(range(col, size), key=lambda row: abs(matrix[row][col]))
+            if abs(matrix[pivot][col]) < 1e-12:
+                return
+            matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+            for row in range(col + 1, size):
+                factor = matrix[row][col] / matrix[col][col]
+                for k in range(col, size + 1):
+                    matrix[row][k] -= factor * matrix[col][k]
+
+        solution = [0.0] * size
+        for row in range(size - 1, -1, -1):
+            rest = sum(matrix[row][k] * solution[k] for k in range(row + 1, size))
+            solution[row] = (matrix[row][size] - rest) / matrix[row][row]
+
+        self.coefficients = [
+            min(max(value, _MIN_COEFFICIENT), _MAX_COEFFICIENT) for value in solution[:-1]
+        ] + [min(max(solution[-1], 0.0), _MAX_OVERHEAD)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """估算误差和当前权重"""
+        return {
+            "backend": self.name,
+            "coefficients": {name: round(value, 4) for name, value in zip(FEATURES, self.coefficients)},
+            **self.stats.to_dict()
+        }
+
+
+class LocalTokenizer:
+    """基于本地 tokenizer 文件的精确计数（tokenizers 库）"""
+
+    name = "tokenizers"
+
+    def __init__(self, path: str):
+        from tokenizers import Tokenizer
+
+        self.path = path
+        self._tokenizer = Tokenizer.from_file(path)
+        # 系统消息、对话模板等固定开销，由实际用量估计
+        self.overhead = 0
+        self.stats = TokenUsageStats()
+        self._lock = threading.Lock()
+
+    def count(self, text: str) -> int:
+        """文本的 Token 数"""
+        return len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+
+    def count_prompt(self, text: str) -> int:
+        """一次调用的 Prompt Token 数（含固定开销）"""
+        return self.count(text) + self.overhead
+
+    def observe(self, prompt: str, actual_tokens: int):
+        """记录实际用量，固定开销取实际值与计数之差的滑动平均"""
+        if not actual_tokens or actual_tokens <= 0:
+            return
+
+        counted = self.count(prompt)
+        with self._lock:
+            self.stats.record(counted + self.overhead, actual_tokens)
+            difference = max(actual_tokens - counted, 0)
+            self.overhead = round(difference if self.stats.samples == 1 else 0.8 * self.overhead + 0.2 * difference)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """估算误差"""
+        return {
+            "backend": self.name,
+            "path": self.path,
+            "overhead": self.overhead,
+            **self.stats.to_dict()
+        }
+
+
+def find_tokenizer_file(model: str, tokenizer_dir: str) -> Optional[str]:
+    """
+    查找模型对应的本地 tokenizer 文件
+
+    依次查找 {tokenizer_dir}/{model}/tokenizer.json 和 {tokenizer_dir}/{model}.json
+    """
+    if not tokenizer_dir or not model:
+        return None
+
+    for path in (
+        os.path.join(tokenizer_dir, model, "tokenizer.json"),
+        os.path.join(tokenizer_dir, f"{model}.json"),
+    ):
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def create_tokenizer():
+    """按配置创建 Token 计数器：有本地 tokenizer 文件且已安装 tokenizers 时精确计数，否则估算"""
+    settings = get_settings()
+    path = settings.tokenizer_path or find_tokenizer_file(settings.dashscope_model, settings.tokenizer_dir)
+
+    if path:
+        try:
+            tokenizer = LocalTokenizer(path)
+            logger.info(f"使用本地 tokenizer: {path}")
+            return tokenizer
+        except ImportError:
+            logger.warning("未安装 tokenizers，使用估算方式计算 Token")
+        except Exception as e:
+            logger.warning(f"加载 tokenizer 失败，使用估算方式计算 Token: {e}")
+
+    return HeuristicTokenizer(calibrate=settings.token_calibration_enabled)
+
+
+_tokenizer = None
+
+
+def get_tokenizer():
+    """获取进程级共享的 Token 计数器（首次调用时创建）"""
+    global _tokenizer
+    if _tokenizer is None:
+        _tokenizer = create_tokenizer()
+    return _tokenizer
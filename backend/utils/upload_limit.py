@@ -0,0 +1,96 @@
+"""
+上传请求大小限制
+
+FastAPI 在调用上传接口之前就会读取并解析整个 multipart 请求体，接口内的大小检查要等请求体全部到达后
+才能执行。该中间件在读取请求体之前检查 Content-Length，超过上限时直接返回 413；没有 Content-Length
+（分块传输）时边接收边计数，超过上限时立即中止，不再继续接收，应用对中止的请求返回的响应替换为 413。
+"""
+import json
+from typing import Dict
+from backend.utils.file_utils import FileTooLargeError
+
+# multipart 请求中表单字段、分隔符等额外内容的允许大小
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class _BodyTooLarge(Exception):
+    """请求体超过上限（中间件内部使用）"""
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """按路径限制上传请求体大小的 ASGI 中间件"""
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: ASGI 应用
+            limits: 路径 -> 文件大小上限（字节），请求体上限另加 MULTIPART_OVERHEAD
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        max_size = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if max_size is None or scope.get("method") != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        limit = max_size + MULTIPART_OVERHEAD
+        for name, value in scope.get("headers", ()):
+            if name == b"content-length":
+                try:
+                    too_large = int(value) > limit
+                except ValueError:
+                    too_large = False
+                if too_large:
+                    await _reject(send, max_size)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            # 超限后应用返回的解析错误响应替换为 413
+            if exceeded:
+                if message["type"] == "http.response.start" and not response_started:
+                    response_started = True
+                    await _reject(send, max_size)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            if not response_started:
+                await _reject(send, max_size)
+
+
+async def _reject(send, max_size: int):
+    """返回 413"""
+    body = json.dumps({"detail": str(FileTooLargeError(max_size))}, ensure_ascii=False).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": 413,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"connection", b"close"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,204 @@
+"""
+审查任务 Worker
+
+从审查任务队列领取任务并执行审查流程，可独立于 API 进程部署和扩容：
+
+    python -m backend.worker --concurrency 4
+
+API 进程在 review_worker_embedded=True 时也会内置一个 Worker。
+"""
+import sys
+import asyncio
+import argparse
+import logging
+import os
+import socket
+import uuid
+from pathlib import Path
+from typing import List, Optional
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from backend.config import get_settings
+from backend.database import init_db
+from backend.services.job_queue import ReviewJobQueue
+from backend.services.progress import report_progress
+from backend.services.review_pipeline import process_review, mark_review_failed, ReviewAbortedError
+from backend.services.llm_client import close_llm_client
+from backend.utils.executor import shutdown_executor
+# 导入模型以确保表创建
+from backend.models import review, contract_writing as contract_writing_models, search as search_models
+
+logger = logging.getLogger(__name__)
+
+
+class ReviewWorker:
+    """审查任务 Worker（一个进程内运行多个并发执行槽）"""
+
+    def __init__(self, concurrency: Optional[int] = None, queue: Optional[ReviewJobQueue] = None):
+        settings = get_settings()
+        self.concurrency = max(1, concurrency or settings.review_worker_concurrency)
+        self.queue = queue or ReviewJobQueue()
+        self.poll_interval = settings.review_job_poll_interval
+        self.sweep_interval = settings.review_job_sweep_interval
+        self.heartbeat_interval = settings.review_job_heartbeat_seconds
+        self.worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._slots: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在当前事件循环中启动所有执行槽"""
+        logger.info(f"审查 Worker {self.worker_id} 启动，并发数 {self.concurrency}")
+        self._stopping.clear()
+        self._slots = [
+            asyncio.create_task(self._run_slot(f"{self.worker_id}#{i}"))
+            for i in range(self.concurrency)
+        ]
+        self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop(self):
+        """停止领取新任务并取消正在执行的任务（未完成的任务租约过期后会被重新领取）"""
+        self._stopping.set()
+        tasks = self._slots + ([self._sweeper] if self._sweeper else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._slots = []
+        self._sweeper = None
+        logger.info(f"审查 Worker {self.worker_id} 已停止")
+
+    async def run_forever(self):
+        """启动并运行直到被取消"""
+        self.start()
+        try:
+            await asyncio.gather(*self._slots)
+        finally:
+            await self.stop()
+
+    async def _run_slot(self, slot_id: str):
+        """单个执行槽：循环领取并执行任务"""
+        while not self._stopping.is_set():
+            try:
+                job = await self.queue.lease(slot_id)
+            except Exception as e:
+                logger.error(f"[{slot_id}] 领取任务失败: {e}")
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._execute(slot_id, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 更新任务或审查状态失败（如数据库被锁）时执行槽继续运行，任务租约过期后重新处理
+                logger.error(f"[{slot_id}] 任务 {job['id']} 状态更新失败: {e}", exc_info=True)
+
+    async def _run_sweeper(self):
+        """
+        定期将租约过期且重试次数用尽的任务及其审查标记为失败
+
+        每个 Worker 只运行一个，不随执行槽的轮询执行，避免空闲时每个槽每次轮询都多一次写事务。
+        """
+        while not self._stopping.is_set():
+            try:
+                for failed in await self.queue.fail_exhausted():
+                    await mark_review_failed(failed["review_id"], failed["error"])
+            except Exception as e:
+                logger.error(f"[{self.worker_id}] 清理过期任务失败: {e}")
+
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _execute(self, slot_id: str, job: dict):
+        """执行任务，执行期间定期续约，租约丢失时放弃执行"""
+        review_id = job["review_id"]
+        logger.info(f"[{slot_id}] 领取任务 {job['id']}（审查 {review_id}，第 {job['attempts']} 次）")
+
+        work = asyncio.create_task(self._process(job))
+        heartbeat = asyncio.create_task(self._heartbeat(slot_id, job["id"], work))
+
+        try:
+            await work
+            await self.queue.complete(job["id"], slot_id)
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                # Worker 停止（如部署重启）：归还任务，由其他 Worker 立即接手
+                try:
+                    await self.queue.release(job["id"], slot_id)
+                except Exception as e:
+                    logger.warning(f"[{slot_id}] 归还任务 {job['id']} 失败，等待租约过期: {e}")
+                raise
+            logger.warning(f"[{slot_id}] 任务 {job['id']} 已放弃（租约丢失）")
+            return
+        except Exception as e:
+            if work.done() and not work.cancelled() and work.exception() is None:
+                # 审查已完成，只是任务标记完成失败，交由 _run_slot 记录
+                raise
+            error_msg = str(e) or e.__class__.__name__
+            logger.error(f"[Review {review_id}] 处理异常: {error_msg}", exc_info=True)
+
+            retryable = not isinstance(e, ReviewAbortedError)
+            will_retry = await self.queue.fail(job["id"], slot_id, error_msg, retryable=retryable)
+            if will_retry:
+                report_progress(review_id, "retrying", attempts=job["attempts"], error_message=error_msg)
+            else:
+                await mark_review_failed(review_id, error_msg)
+        finally:
+            heartbeat.cancel()
+
+    async def _process(self, job: dict):
+        """执行审查流程（流程内部自行管理数据库会话）"""
+        await process_review(
+            job["review_id"],
+            job["contract_id"],
+            incremental=job["payload"].get("incremental", True)
+        )
+
+    async def _heartbeat(self, slot_id: str, job_id: str, work: asyncio.Task):
+        """定期续约，续约失败时取消任务"""
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                still_owner = await self.queue.heartbeat(job_id, slot_id)
+            except Exception as e:
+                logger.warning(f"[{slot_id}] 任务 {job_id} 续约失败: {e}")
+                continue
+
+            if not still_owner:
+                work.cancel()
+                return
+
+
+async def main(concurrency: Optional[int] = None):
+    """独立 Worker 进程入口"""
+    await init_db()
+    worker = ReviewWorker(concurrency)
+    try:
+        await worker.run_forever()
+    finally:
+        await close_llm_client()
+        shutdown_executor()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="审查任务 Worker")
+    parser.add_argument("--concurrency", type=int, default=None, help="同时处理的任务数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    try:
+        asyncio.run(main(args.concurrency))
+    except KeyboardInterrupt:
+        pass
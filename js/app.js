@@ -8,6 +8,7 @@ class App {
         this.currentContractId = null;
         this.currentReviewId = null;
         this.pollInterval = null;
+        this.reviewEvents = null;
         // 合同编写状态
         this.currentDraftId = null;
         this.isGenerating = false;
@@ -961,29 +962,24 @@ class App {
             const draft = await createResponse.json();
             this.currentDraftId = draft.id;
 
-            // Step 2: 触发 AI 生成
-            const generateResponse = await fetch(`http://127.0.0.1:8000/api/writing/drafts/${draft.id}/generate`, {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    contract_type: contractType,
-                    elements: {}
-                })
-            });
-
-            if (!generateResponse.ok) {
-                throw new Error('触发生成失败');
+            // Step 2: 流式生成，边生成边显示
+            const contractContent = document.getElementById('contractContent');
+            if (contractContent) {
+                contractContent.value = '';
             }
 
-            // Step 3: 轮询等待生成完成
-            const generatedDraft = await this.pollForGeneration(draft.id);
+            this.hideLoading();
+            const content = await this.streamGeneration(draft.id, (text) => {
+                if (contractContent) {
+                    contractContent.value += text;
+                    // 触发预览更新
+                    contractContent.dispatchEvent(new Event('input'));
+                }
+            });
 
-            // Step 4: 显示生成的内容
-            const content = generatedDraft.final_content || generatedDraft.generated_content;
-            const contractContent = document.getElementById('contractContent');
+            // Step 3: 显示完整内容
             if (contractContent) {
                 contractContent.value = content;
-                // 触发预览更新
                 contractContent.dispatchEvent(new Event('input'));
             }
 
@@ -1004,6 +1000,63 @@ class App {
         }
     }
 
+    // 流式生成（SSE），每收到一段文本回调 onDelta，返回完整内容
+    async streamGeneration(draftId, onDelta) {
+        const response = await fetch(`http://127.0.0.1:8000/api/writing/drafts/${draftId}/generate/stream`, {
+            method: 'POST',
+            headers: { 'Accept': 'text/event-stream' }
+        });
+
+        if (!response.ok || !response.body) {
+            throw new Error('触发生成失败');
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let content = '';
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) {
+                break;
+            }
+
+            buffer += decoder.decode(value, { stream: true });
+            const events = buffer.split('\n\n');
+            buffer = events.pop();
+
+            for (const raw of events) {
+                let event = 'message';
+                let data = '';
+                for (const line of raw.split('\n')) {
+                    if (line.startsWith('event: ')) {
+                        event = line.slice(7);
+                    } else if (line.startsWith('data: ')) {
+                        data += line.slice(6);
+                    }
+                }
+                if (!data) {
+                    continue;
+                }
+
+                const payload = JSON.parse(data);
+                if (event === 'delta') {
+                    content += payload.text;
+                    onDelta(payload.text);
+                } else if (event === 'done') {
+                    return content;
+                } else if (event === 'error') {
+                    throw new Error(payload.message || '合同生成失败');
+                }
+            }
+        }
+
+        // 连接意外中断：生成仍在服务端继续，回退为查询草稿状态
+        const generatedDraft = await this.pollForGeneration(draftId);
+        return generatedDraft.final_content || generatedDraft.generated_content;
+    }
+
     // 轮询等待生成完成
     async pollForGeneration(draftId, maxAttempts = 30) {
         for (let i = 0; i < maxAttempts; i++) {
@@ -1304,9 +1357,9 @@ class App {
         const viewReviewBtn = document.getElementById('viewReviewBtn');
         if (viewReviewBtn) {
             viewReviewBtn.addEventListener('click', () => {
-                // 如果有正在进行的审查，轮询结果
+                // 如果有正在进行的审查，订阅审查进度
                 if (this.currentReviewId) {
-                    this.pollReviewResult();
+                    this.watchReviewProgress();
                     return;
                 }
 
@@ -1371,11 +1424,15 @@ class App {
         // 重置预览区
         this.resetPreview();
 
-        // 停止轮询
+        // 停止轮询和进度订阅
         if (this.pollInterval) {
             clearInterval(this.pollInterval);
             this.pollInterval = null;
         }
+        if (this.reviewEvents) {
+            this.reviewEvents.close();
+            this.reviewEvents = null;
+        }
     }
 
     // 更新合同预览
@@ -2316,8 +2373,8 @@ class App {
                 this.currentReviewId = data.id;
                 this.showToast('审查已开始', 'success');
 
-                // 轮询审查结果
-                this.pollReviewResult();
+                // 订阅审查进度
+                this.watchReviewProgress();
             } else {
                 throw new Error('启动审查失败');
             }
@@ -2329,6 +2386,72 @@ class App {
         }
     }
 
+    // 订阅审查进度（SSE），完成后获取一次完整结果；浏览器不支持或连接失败时退回轮询
+    watchReviewProgress() {
+        if (!this.currentReviewId) return;
+
+        if (typeof EventSource === 'undefined') {
+            this.pollReviewResult();
+            return;
+        }
+
+        if (this.reviewEvents) {
+            this.reviewEvents.close();
+        }
+
+        const reviewId = this.currentReviewId;
+        const events = new EventSource(`${this.API_BASE}/${reviewId}/events`);
+        this.reviewEvents = events;
+
+        const finish = () => {
+            events.close();
+            if (this.reviewEvents === events) {
+                this.reviewEvents = null;
+            }
+        };
+
+        events.addEventListener('progress', (e) => {
+            const data = JSON.parse(e.data);
+            console.log('审查进度:', data.stage, data.percent);
+
+            const buttonEl = document.getElementById('startReviewBtn');
+            if (buttonEl) {
+                buttonEl.textContent = `审查中 ${data.percent}%`;
+            }
+        });
+
+        events.addEventListener('completed', async () => {
+            finish();
+            try {
+                const response = await fetch(`${this.API_BASE}/${reviewId}`);
+                const data = await response.json();
+                console.log('审查完成，结果:', data);
+                this.displayReviewResult(data);
+            } catch (error) {
+                console.error('获取审查结果失败:', error);
+                this.showToast('获取审查结果失败', 'error');
+                this.resetReviewButton();
+            }
+        });
+
+        events.addEventListener('failed', (e) => {
+            finish();
+            const data = JSON.parse(e.data);
+            console.error('审查失败:', data.error_message);
+            this.showToast('审查失败: ' + (data.error_message || '未知错误'), 'error');
+            this.resetReviewButton();
+        });
+
+        events.onerror = () => {
+            // 连接断开（如服务重启）：停止订阅，改为轮询
+            if (this.reviewEvents === events) {
+                console.warn('审查进度连接中断，改为轮询');
+                finish();
+                this.pollReviewResult();
+            }
+        };
+    }
+
     // 轮询审查结果
     pollReviewResult() {
         if (!this.currentReviewId) return;